@@ -0,0 +1,28 @@
+"""Shared fixtures for unit tests of the build tools in tools/."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# tools/ scripts import each other as top-level modules (they run as
+# `python tools/<name>.py`), so expose the directory the same way here.
+sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+
+
+@pytest.fixture
+def write_shard(tmp_path):
+    """Return a helper that writes reference records to a shard file."""
+
+    def _write(relpath: str, records: list[dict]) -> Path:
+        path = tmp_path / "shards" / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return path
+
+    return _write
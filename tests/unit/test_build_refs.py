@@ -0,0 +1,139 @@
+"""Tests for tools/build_refs.py."""
+
+import json
+
+import build_refs
+import pytest
+
+pytestmark = pytest.mark.unit
+
+SAMPLE = {
+    "id": "sample-2025-test",
+    "type": "web",
+    "title": "Sample Reference",
+    "url": "https://example.com",
+    "authors": ["Doe, J."],
+    "year": 2025,
+}
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch, write_shard):
+    """Run the builder inside a scratch repo with two shards."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(build_refs, "REFS_DIR", tmp_path / "shards")
+    write_shard("00/a.jsonl", [SAMPLE])
+    write_shard("01/a.jsonl", [{"id": "b", "title": "B", "url": "https://b.org"}])
+    return tmp_path
+
+
+def read_outputs(repo):
+    derived = repo / "data" / "derived"
+    return (
+        (derived / "references.csl.json").read_text(encoding="utf-8"),
+        (derived / "references.bib").read_text(encoding="utf-8"),
+    )
+
+
+def test_csl_output_matches_json_dump(repo):
+    """Spliced CSL output is byte-identical to dumping the full list."""
+    assert build_refs.main([]) == 0
+
+    csl, _ = read_outputs(repo)
+    expected = [
+        build_refs.convert_csl(SAMPLE),
+        build_refs.convert_csl({"id": "b", "title": "B", "url": "https://b.org"}),
+    ]
+    assert csl == json.dumps(expected, indent=2)
+
+
+def test_incremental_rebuild_only_touches_changed_shards(repo, write_shard, capsys):
+    """A second build reuses the cache; edits rebuild just that shard."""
+    build_refs.main([])
+    full = read_outputs(repo)
+
+    build_refs.main([])
+    assert "(0 of 2 shards rebuilt)" in capsys.readouterr().out
+    assert read_outputs(repo) == full
+
+    write_shard("01/a.jsonl", [{"id": "c", "title": "C", "url": "https://c.org"}])
+    build_refs.main([])
+    assert "(1 of 2 shards rebuilt)" in capsys.readouterr().out
+
+    incremental = read_outputs(repo)
+    build_refs.main(["--no-cache"])
+    assert read_outputs(repo) == incremental
+    assert '"id": "c"' in incremental[0]
+
+
+def test_unchanged_outputs_are_not_rewritten(repo, write_shard, capsys):
+    """Outputs with identical content keep their mtime."""
+    build_refs.main([])
+    csl = repo / "data" / "derived" / "references.csl.json"
+    mtime = csl.stat().st_mtime_ns
+    capsys.readouterr()
+
+    build_refs.main(["--no-cache"])
+    assert csl.stat().st_mtime_ns == mtime
+    assert "0 written, 2 unchanged" in capsys.readouterr().out
+
+    write_shard("01/a.jsonl", [{"id": "c", "title": "C", "url": "https://c.org"}])
+    build_refs.main([])
+    assert "2 written, 0 unchanged" in capsys.readouterr().out
+
+
+def test_build_csl_json_streams_from_generator(repo):
+    """Records pulled lazily from the shards produce a valid JSON array."""
+    from refs_io import find_shards, iter_records
+
+    output = repo / "out.csl.json"
+    count = build_refs.build_csl_json(
+        iter_records(find_shards(repo / "shards")), output
+    )
+
+    assert count == 2
+    assert [item["id"] for item in json.loads(output.read_text())] == [
+        "sample-2025-test",
+        "b",
+    ]
+    assert build_refs.build_csl_json(iter([]), output) == 0
+    assert output.read_text() == "[]"
+
+
+def test_emit_feeds_every_emitter_in_one_pass(tmp_path):
+    """One traversal of a generator drives all emitters, including new ones."""
+
+    class IdListEmitter(build_refs.Emitter):
+        name = "ids"
+        filename = "ids.txt"
+
+        def render(self, ref):
+            return ref["id"] + "\n"
+
+    refs = iter([SAMPLE, {"id": "b", "title": "B", "url": "https://b.org"}])
+    emitters = [
+        build_refs.CslJsonEmitter(tmp_path / "refs.csl.json"),
+        build_refs.BibtexEmitter(tmp_path / "refs.bib"),
+        IdListEmitter(tmp_path / "ids.txt"),
+    ]
+
+    assert build_refs.emit(refs, emitters) == 2
+    assert (tmp_path / "ids.txt").read_text() == "sample-2025-test\nb\n"
+    assert len(json.loads((tmp_path / "refs.csl.json").read_text())) == 2
+    assert (tmp_path / "refs.bib").read_text().count("@") == 2
+
+
+def test_bibtex_escapes_latex_specials():
+    """Titles, authors and URLs are escaped so the .bib file stays parseable."""
+    entry = build_refs.render_bibtex(
+        {
+            "id": "odd",
+            "title": "R&D: 50% of {C} costs $5_000",
+            "url": "https://e.com/a{b}?q=1%20",
+            "authors": ["Doe,  J.", "Johnson and Johnson"],
+        }
+    )
+
+    assert r"title = {R\&D: 50\% of \{C\} costs \$5\_000}," in entry
+    assert "url = {https://e.com/a%7Bb%7D?q=1%20}," in entry
+    assert "author = {Doe, J. and {Johnson and Johnson}}," in entry
@@ -0,0 +1,73 @@
+"""Tests for tools/dedup_refs.py."""
+
+import pytest
+from dedup_refs import find_duplicates, normalize_title
+from refs_io import normalize_url
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/post",
+        "http://www.example.com/post/",
+        "https://EXAMPLE.com:443/post#section",
+        "https://example.com/post?utm_source=feed&fbclid=abc",
+    ],
+)
+def test_normalize_url_equivalents(url):
+    assert normalize_url(url) == "example.com/post"
+
+
+def test_normalize_url_keeps_meaningful_differences():
+    assert (
+        normalize_url("https://example.com/post?b=2&a=1") == "example.com/post?a=1&b=2"
+    )
+    assert normalize_url("https://example.com:8080/post") == "example.com:8080/post"
+    assert normalize_url("https://example.com/Post") != normalize_url(
+        "https://example.com/post"
+    )
+    assert normalize_url("doi:10.1000/182") == "doi:10.1000/182"
+    # Generic parameter names select content, so they are never stripped
+    assert normalize_url("https://github.com/x/y?ref=main") != normalize_url(
+        "https://github.com/x/y?ref=dev"
+    )
+    assert normalize_url("https://example.com/post?si=2") == "example.com/post?si=2"
+
+
+def test_normalize_title():
+    assert normalize_title("  The Rust  Book: 2nd Ed. ") == "the rust book 2nd ed"
+    assert normalize_title("ＵＮＩＣＯＤＥ—Title") == "unicode title"
+
+
+def test_find_duplicates_across_shards(write_shard, tmp_path):
+    a = write_shard(
+        "00/a.jsonl",
+        [
+            {"id": "a1", "title": "Post", "url": "https://example.com/post"},
+            {"id": "a2", "title": "Guide", "url": "https://example.com/guide"},
+        ],
+    )
+    b = write_shard(
+        "01/b.jsonl",
+        [
+            {
+                "id": "b1",
+                "title": "Other",
+                "url": "http://www.example.com/post/?utm_medium=x",
+            },
+            {"id": "b2", "title": "GUIDE!", "url": "https://example.com/guide/v2"},
+            {"id": "b3", "title": "Guide", "url": "https://elsewhere.org/guide"},
+        ],
+    )
+
+    groups = find_duplicates([a, b], partitions=4, spill_dir=tmp_path)
+
+    assert [(g.kind, g.key, [m[2] for m in g.members]) for g in groups] == [
+        ("url", "example.com/post", ["a1", "b1"]),
+        ("title", "example.com guide", ["a2", "b2"]),
+    ]
+    assert groups[0].members[1] == (b, 1, "b1")
+    # Spill files are cleaned up
+    assert [p for p in tmp_path.iterdir() if p.name.startswith("dedup-")] == []
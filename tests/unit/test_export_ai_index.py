@@ -0,0 +1,185 @@
+"""Tests for tools/export_ai_index.py."""
+
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+from export_ai_index import (
+    collect_site,
+    excerpt,
+    export_index,
+    export_sharded,
+    parse_note,
+)
+from refs_citations import scan_notes
+from refs_io import shard_bucket
+from refs_schema import compile_validator
+
+pytestmark = pytest.mark.unit
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+NOTE = """---
+id: rust-notes
+title: "Rust Notes"
+date: 2025-02-03
+tags:
+  - rust
+  - perf
+---
+
+# Rust Notes
+
+## Intro
+
+Rust is fast, see [@smith2024-rust] and [[Go Programming|Go]].
+
+```
+[@not-a-citation] [[not-a-link]]
+```
+
+Second paragraph.
+"""
+
+
+def collect(site, jobs=1):
+    return collect_site(
+        site / "docs",
+        site / "shards",
+        jobs=jobs,
+        mkdocs_file=site / "mkdocs.yml",
+        cache_file=site / "cache.json",
+    )
+
+
+@pytest.fixture
+def site(tmp_path, write_shard):
+    docs = tmp_path / "docs"
+    (docs / "notes" / "blog" / "posts").mkdir(parents=True)
+    (docs / "references").mkdir()
+    (docs / "notes" / "rust.md").write_text(NOTE)
+    (docs / "notes" / "blog" / "posts" / "hello.md").write_text(
+        "---\ntitle: Hello\ntags: [meta]\n---\nHi [@smith2024-rust].\n"
+    )
+    (docs / "references" / "smith2024-rust.md").write_text("# generated\n")
+    write_shard(
+        "00/refs.jsonl",
+        [
+            {
+                "id": "smith2024-rust",
+                "type": "web",
+                "title": "Rust",
+                "url": "https://example.com",
+                "tags": ["rust", "web"],
+                "extra": "not exported",
+            },
+            {"id": "smith2024-rust", "title": "Duplicate", "url": "https://dup"},
+        ],
+    )
+    (tmp_path / "mkdocs.yml").write_text("site_name: Test Site  # comment\n")
+    return tmp_path
+
+
+def test_export_index_matches_schema(site, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    output = site / "ai" / "site-index.json"
+
+    stats, writes = export_index(collect(site, jobs=2), output)
+
+    assert writes.written == 1
+    index = json.loads(output.read_text())
+    schema = json.loads((PROJECT_ROOT / "ai" / "site-index.schema.json").read_text())
+    assert compile_validator(schema)(index) == []
+    assert index["generated"] == "2023-11-14T22:13:20Z"
+    assert index["site_title"] == "Test Site"
+    assert stats == {
+        "note_count": 1,
+        "blog_count": 1,
+        "reference_count": 1,
+        "tag_count": 4,
+    }
+    assert index["tags"] == ["meta", "perf", "rust", "web"]
+
+    post, note = index["notes"]
+    assert post["id"] == "notes/blog/posts/hello"
+    assert note == {
+        "id": "rust-notes",
+        "title": "Rust Notes",
+        "path": "notes/rust.md",
+        "date": "2025-02-03",
+        "tags": ["rust", "perf"],
+        "excerpt": "Rust is fast, see [@smith2024-rust] and [[Go Programming|Go]].",
+        "word_count": 14,
+        "outbound_links": ["Go Programming"],
+        "citations": ["smith2024-rust"],
+    }
+    (ref,) = index["references"]
+    assert ref["title"] == "Rust"
+    assert "extra" not in ref
+    assert ref["cited_by"] == ["notes/blog/posts/hello", "rust-notes"]
+
+    # Same inputs, same bytes: the file is left alone
+    assert export_index(collect(site), output)[1].unchanged == 1
+
+
+def test_export_sharded_writes_manifest_and_hashed_chunks(site, write_shard):
+    write_shard("01/refs.jsonl", [{"id": f"r{i}", "title": "T"} for i in range(50)])
+    output = site / "ai" / "site-index"
+
+    stats, writes = export_sharded(collect(site), output)
+
+    manifest = json.loads((output / "index.json").read_text())
+    assert manifest["stats"] == stats
+    assert stats["reference_count"] == 51
+    refs = manifest["sections"]["references"]
+    assert refs["key"] == "sha256(id)[:2]"
+    assert sum(chunk["count"] for chunk in refs["chunks"]) == 51
+    for chunk in refs["chunks"] + manifest["sections"]["notes"]["chunks"]:
+        data = (output / chunk["path"]).read_bytes()
+        assert hashlib.sha256(data).hexdigest() == chunk["sha256"]
+        assert len(data) == chunk["bytes"]
+        assert len(data.splitlines()) == chunk["count"]
+    bucket = shard_bucket("r7")
+    lines = (output / "references" / f"{bucket}.ndjson").read_text().splitlines()
+    assert {"id": "r7", "title": "T"} in map(json.loads, lines)
+    assert writes.written == len(refs["chunks"]) + 2 + 1  # + notes chunks, manifest
+
+    # Dropping r7 rewrites only its chunk (and the manifest)
+    write_shard(
+        "01/refs.jsonl", [{"id": f"r{i}", "title": "T"} for i in range(50) if i != 7]
+    )
+    _, writes = export_sharded(collect(site), output)
+    emptied = len(lines) == 1
+    assert (writes.written, writes.removed) == ((1, 1) if emptied else (2, 0))
+
+
+def test_collect_site_only_parses_changed_notes(site):
+    assert collect(site).parsed == 2
+    assert collect(site).parsed == 0
+
+    rust = site / "docs" / "notes" / "rust.md"
+    rust.write_text(NOTE.replace("Second paragraph.", "[@new-ref]"))
+    (site / "docs" / "notes" / "blog" / "posts" / "hello.md").touch()
+    again = collect(site)
+
+    assert again.parsed == 1
+    assert again.notes[1]["citations"] == ["smith2024-rust", "new-ref"]
+    assert again.cited_by["new-ref"] == ["rust-notes"]
+    # Same citations and note IDs as the reference page backlinks
+    citations, _ = scan_notes(site / "docs" / "notes", cache_file=None)
+    assert again.cited_by == citations.cited_by
+
+
+def test_excerpt_skips_headings_and_lists():
+    assert excerpt("# Title\n\n- item\n\n" + "word " * 100).endswith("word…")
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2024-05-01", "2024-05-01 10:00", "2024-05-01 10:00:00", "2024-05-01T10:00Z"],
+)
+def test_note_dates_drop_the_time_of_day(tmp_path, value):
+    note = tmp_path / "note.md"
+    note.write_text(f"---\ntitle: T\ndate: {value}\n---\nText.\n")
+    assert parse_note(note, tmp_path)["date"] == "2024-05-01"
@@ -0,0 +1,146 @@
+"""Tests for tools/export_chunks.py."""
+
+import hashlib
+import json
+import shutil
+
+import pytest
+from export_chunks import (
+    chunk_note,
+    collect_chunks,
+    export_chunks,
+    heading_anchor,
+    pack_paragraphs,
+)
+
+pytestmark = pytest.mark.unit
+
+NOTE = """---
+id: rust-notes
+title: Rust Notes
+---
+
+Lead paragraph.
+
+# Rust Notes
+
+## Ownership
+
+Moves and borrows.
+
+```rust
+# not a heading
+let x = 1;
+
+let y = x;
+```
+
+### Lifetimes
+
+#### Elision
+
+Rules.
+
+## Setup
+
+## Ownership
+
+Again.
+"""
+
+
+@pytest.fixture
+def docs(tmp_path):
+    notes = tmp_path / "docs" / "notes"
+    notes.mkdir(parents=True)
+    (notes / "rust.md").write_text(NOTE)
+    (notes / "plain.md").write_text("No headings at all.\n")
+    return tmp_path / "docs"
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_chunks_follow_headings_and_mkdocs_anchors(docs):
+    chunks = chunk_note(docs / "notes" / "rust.md", docs)
+    assert [c["id"] for c in chunks] == [
+        "rust-notes",
+        "rust-notes#ownership",
+        "rust-notes#lifetimes",
+        "rust-notes#ownership_1",
+    ]
+    ownership = chunks[1]
+    assert ownership["headings"] == ["Rust Notes", "Ownership"]
+    assert ownership["path"] == "notes/rust.md"
+    assert ownership["text"].startswith("## Ownership\n\nMoves and borrows.\n\n```")
+    assert "let x = 1;\n\nlet y = x;\n```" in ownership["text"]
+    assert chunks[2]["headings"] == ["Rust Notes", "Ownership", "Lifetimes"]
+    assert chunks[2]["text"] == "### Lifetimes\n\n#### Elision\n\nRules."
+
+    record = {k: v for k, v in ownership.items() if k != "sha256"}
+    encoded = json.dumps(record, ensure_ascii=False).encode()
+    assert ownership["sha256"] == hashlib.sha256(encoded).hexdigest()
+
+
+def test_long_sections_split_between_paragraphs():
+    assert heading_anchor("Café & [Links](https://x) `code`!") == "cafe-links-code"
+    assert pack_paragraphs(["a" * 6, "b" * 6, "c" * 20], max_chars=16) == [
+        "aaaaaa\n\nbbbbbb",
+        "c" * 20,
+    ]
+
+
+def test_export_writes_only_changes_since_previous_snapshot(docs, tmp_path):
+    out = tmp_path / "chunks"
+    cache = tmp_path / "cache.json"
+    paths, chunks, split = collect_chunks(docs, cache_file=cache)
+    assert split == 2
+    first, writes = export_chunks(chunks, out, "2025-01-01T00:00:00Z")
+    assert (writes.written, first["base"], first["chunk_count"]) == (3, None, 5)
+    assert first["note_count"] == 2
+    assert first["changes"] == {"upserted": 5, "deleted": 0}
+    snapshot = (out / "chunks.ndjson").read_bytes()
+    assert first["state"] == hashlib.sha256(snapshot).hexdigest()
+    assert [c["op"] for c in read_lines(out / "changes.ndjson")] == ["upsert"] * 5
+
+    # Nothing changed: nothing is rewritten and the last delta stays
+    _, chunks, split = collect_chunks(docs, cache_file=cache)
+    index, writes = export_chunks(chunks, out, "2025-01-02T00:00:00Z")
+    assert (split, writes.written, writes.unchanged) == (0, 0, 3)
+    assert index == first
+
+    rust = docs / "notes" / "rust.md"
+    rust.write_text(NOTE.replace("Rules.", "New rules.").replace("## Setup\n", ""))
+    rust.write_text(rust.read_text().replace("## Ownership\n\nAgain.\n", ""))
+    _, chunks, split = collect_chunks(docs, cache_file=cache)
+    index, writes = export_chunks(chunks, out, "2025-01-03T00:00:00Z")
+    assert split == 1
+    assert index["base"] == first["state"]
+    assert index["changes"] == {"upserted": 1, "deleted": 1}
+    changes = read_lines(out / "changes.ndjson")
+    assert [(c["op"], c["id"]) for c in changes] == [
+        ("upsert", "rust-notes#lifetimes"),
+        ("delete", "rust-notes#ownership_1"),
+    ]
+    assert "New rules." in changes[0]["text"]
+
+
+def test_clean_tree_diffs_against_the_restored_snapshot(docs, tmp_path):
+    published = tmp_path / "published"
+    _, chunks, _ = collect_chunks(docs, cache_file=tmp_path / "cache.json")
+    first, _ = export_chunks(chunks, published, "2025-01-01T00:00:00Z")
+
+    # A clean checkout has no cache; the previous export is fetched into place
+    out = tmp_path / "clean" / "chunks"
+    shutil.copytree(published, out)
+    _, chunks, _ = collect_chunks(docs, cache_file=None)
+    index, writes = export_chunks(chunks, out, "2025-01-02T00:00:00Z")
+    assert (writes.written, index) == (0, first)
+
+    (docs / "notes" / "plain.md").write_text("Edited.\n")
+    _, chunks, _ = collect_chunks(docs, cache_file=None)
+    index, _ = export_chunks(chunks, out, "2025-01-03T00:00:00Z")
+    assert index["base"] == first["state"]
+    assert index["changes"] == {"upserted": 1, "deleted": 0}
+    assert [c["id"] for c in read_lines(out / "changes.ndjson")] == ["notes/plain"]
@@ -0,0 +1,248 @@
+"""Tests for tools/import_refs.py."""
+
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+from import_refs import (
+    ANCHOR,
+    Importer,
+    base_id,
+    detect_format,
+    iter_json_array,
+    main,
+    read_chrome,
+    read_firefox,
+    read_netscape,
+    read_zotero,
+)
+from refs_io import find_shards, shard_bucket
+from refs_store import open_store
+from refs_tags import TagVocabulary
+
+pytestmark = pytest.mark.unit
+
+NETSCAPE = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<TITLE>Bookmarks</TITLE>
+<DL><p>
+    <DT><H3>Folder</H3>
+    <DL><p>
+        <DT><A HREF="https://example.com/a?utm_source=x" ADD_DATE="1700000000"
+               TAGS="Python,Unknown Tag">Tom &amp; Jerry</A>
+        <DT><A HREF="javascript:void(0)">Bookmarklet</A>
+    </DL><p>
+</DL><p>
+"""
+
+
+def test_read_netscape_streams_across_chunks(tmp_path, monkeypatch):
+    export = tmp_path / "bookmarks.html"
+    export.write_text(NETSCAPE)
+    monkeypatch.setattr("import_refs.CHUNK_SIZE", 7)
+
+    bookmarks = list(read_netscape(export))
+
+    assert [(b.url, b.title) for b in bookmarks] == [
+        ("https://example.com/a?utm_source=x", "Tom & Jerry"),
+        ("javascript:void(0)", "Bookmarklet"),
+    ]
+    assert bookmarks[0].tags == ["Python", "Unknown Tag"]
+    assert bookmarks[0].added.isoformat() == "2023-11-14"
+    assert detect_format(export) == "netscape"
+
+
+def test_read_netscape_carries_only_a_bounded_unfinished_anchor(tmp_path, monkeypatch):
+    export = tmp_path / "bookmarks.html"
+    export.write_text(
+        '<DT><A HREF="https://a.org">A</A>\n'
+        '<DD>An <abbr>abbr</abbr>, an <address>, an unclosed <a href="x"> and '
+        + "more description " * 30
+        + '\n<DT><A HREF="https://b.org">B</A>\n'
+    )
+    monkeypatch.setattr("import_refs.CHUNK_SIZE", 7)
+    monkeypatch.setattr("import_refs.MAX_ANCHOR", 50)
+    scanned = []
+
+    class RecordingAnchor:
+        def finditer(self, text):
+            scanned.append(len(text))
+            return ANCHOR.finditer(text)
+
+    monkeypatch.setattr("import_refs.ANCHOR", RecordingAnchor())
+
+    bookmarks = list(read_netscape(export))
+
+    assert [(b.url, b.title) for b in bookmarks] == [
+        ("https://a.org", "A"),
+        ("https://b.org", "B"),
+    ]
+    assert max(scanned) <= 50 + 7
+
+
+def test_read_chrome(tmp_path):
+    export = tmp_path / "Bookmarks"
+    folder = {
+        "type": "folder",
+        "children": [
+            {"type": "url", "name": "B", "url": "https://b.org"},
+            {"type": "url", "name": "C", "url": "https://c.org", "date_added": "0"},
+        ],
+    }
+    bar = {
+        "type": "folder",
+        "children": [
+            {
+                "type": "url",
+                "name": "A",
+                "url": "https://a.org",
+                "date_added": "13345000000000000",
+            },
+            folder,
+        ],
+    }
+    export.write_text(json.dumps({"roots": {"bookmark_bar": bar}}))
+
+    bookmarks = list(read_chrome(export))
+
+    assert [(b.url, b.title) for b in bookmarks] == [
+        ("https://a.org", "A"),
+        ("https://b.org", "B"),
+        ("https://c.org", "C"),
+    ]
+    assert bookmarks[0].added.isoformat() == "2023-11-21"
+    assert [b.added for b in bookmarks[1:]] == [None, None]
+    assert detect_format(export) == "chrome"
+
+
+def test_read_firefox_with_tags(tmp_path):
+    export = tmp_path / "places.sqlite"
+    conn = sqlite3.connect(export)
+    conn.executescript(
+        """
+        CREATE TABLE moz_places (id INTEGER PRIMARY KEY, url TEXT, title TEXT);
+        CREATE TABLE moz_bookmarks (id INTEGER PRIMARY KEY, type INTEGER, fk INTEGER,
+            parent INTEGER, title TEXT, dateAdded INTEGER, guid TEXT);
+        INSERT INTO moz_places VALUES (1, 'https://a.org/', 'Page A');
+        INSERT INTO moz_bookmarks VALUES (1, 2, NULL, 0, 'root', 0, 'root________');
+        INSERT INTO moz_bookmarks VALUES (2, 2, NULL, 1, 'tags', 0, 'tags________');
+        INSERT INTO moz_bookmarks VALUES (3, 2, NULL, 2, 'rust', 0, 'tag-rust');
+        INSERT INTO moz_bookmarks VALUES (4, 1, 1, 1, NULL, 1700000000000000, 'b1');
+        INSERT INTO moz_bookmarks VALUES (5, 1, 1, 3, NULL, 0, 'b1-tag');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    bookmarks = list(read_firefox(export))
+
+    assert [(b.url, b.title, b.tags) for b in bookmarks] == [
+        ("https://a.org/", "Page A", ["rust"])
+    ]
+    assert detect_format(export) == "firefox"
+
+
+def test_read_zotero_csl_json(tmp_path):
+    export = tmp_path / "zotero.json"
+    item = {
+        "type": "article-journal",
+        "title": "SQL Injection Attacks",
+        "DOI": "10.1000/xyz",
+        "author": [{"family": "Smith", "given": "John Q"}, {"literal": "ACME"}],
+        "issued": {"date-parts": [[2021, 5]]},
+        "accessed": {"date-parts": [[2025, 1, 2]]},
+        "keyword": "security, sql",
+    }
+    export.write_text(json.dumps([item, {"title": "No URL"}]))
+
+    first, second = read_zotero(export)
+
+    assert first.url == "https://doi.org/10.1000/xyz"
+    assert first.authors == ["Smith, J. Q.", "ACME"]
+    assert (first.year, first.type, first.added.isoformat()) == (
+        2021,
+        "paper",
+        "2025-01-02",
+    )
+    assert base_id(first, "") == "smith2021-sql-injection-attacks"
+    assert second.url == ""
+
+
+def test_iter_json_array_small_chunks():
+    items = [{"a": 1}, [2, 3], "x,]", 12345, None]
+    text = " \n" + json.dumps(items, indent=1)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=3)) == items
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO('[{"a": 1}, {"b"'), chunk_size=4))
+
+
+def test_importer_dedupes_and_appends_to_buckets(tmp_path, write_shard):
+    write_shard("00/refs.jsonl", [{"id": "a", "title": "A", "url": "https://a.org"}])
+    refs_dir = tmp_path / "shards"
+    export = tmp_path / "bookmarks.html"
+    export.write_text(
+        NETSCAPE
+        + '<DT><A HREF="http://www.a.org/">Existing</A>\n'
+        + '<DT><A HREF="https://example.com/b">Tom &amp; Jerry</A>\n'
+    )
+
+    with open_store(refs_dir, tmp_path / "refs.sqlite") as store:
+        vocabulary = TagVocabulary(["python", "imported"])
+        importer = Importer(store, refs_dir, vocabulary, ["Imported"], batch_size=1)
+        for bookmark in read_netscape(export):
+            importer.add(bookmark)
+        importer.flush()
+
+    assert (importer.imported, importer.duplicates, importer.skipped) == (2, 1, 1)
+    assert importer.dropped_tags == 1
+    records = {}
+    for shard in find_shards(refs_dir):
+        for line in shard.read_text().splitlines():
+            record = json.loads(line)
+            records[record["id"]] = (record, shard.relative_to(refs_dir).parts[0])
+
+    first, bucket = records["tom-jerry"]
+    assert first["url"] == "https://example.com/a?utm_source=x"
+    assert first["tags"] == ["python", "imported"]
+    assert first["accessed"] == "2023-11-14"
+    assert bucket == Path(importer.target("tom-jerry")).parent.name
+    # Same title, different URL: the ID gets a URL hash suffix
+    assert [ref_id for ref_id in records if ref_id.startswith("tom-jerry-")]
+
+
+def test_importer_rejects_unknown_extra_tags(tmp_path):
+    with open_store(tmp_path / "shards", tmp_path / "refs.sqlite") as store:
+        with pytest.raises(ValueError, match="'pyhton' \\(did you mean 'python'"):
+            Importer(store, vocabulary=TagVocabulary(["python"]), extra_tags=["pyhton"])
+
+
+def test_main_rolls_back_a_failed_import(tmp_path, monkeypatch):
+    # post-0 is appended to an existing shard, the others create new ones
+    shard = tmp_path / "data/refs/shards" / shard_bucket("post-0") / "refs.jsonl"
+    shard.parent.mkdir(parents=True)
+    shard.write_text('{"id": "a", "title": "A", "url": "u"}')
+    export = tmp_path / "zotero.json"
+    items = [{"URL": f"https://x.org/{n}", "title": f"Post {n}"} for n in range(5)]
+    export.write_text(json.dumps(items)[:-1] + ", {oops")
+    monkeypatch.chdir(tmp_path)
+
+    assert main([str(export), "--format", "zotero", "--batch-size", "1"]) == 1
+    assert find_shards(tmp_path / "data/refs/shards") == [shard]
+    assert shard.read_text() == '{"id": "a", "title": "A", "url": "u"}'
+
+
+def test_main_rolls_back_on_unexpected_errors(tmp_path, monkeypatch):
+    # The second folder's children are not a list, so the reader fails
+    # after the first bookmark has been appended
+    export = tmp_path / "Bookmarks"
+    children = [
+        {"type": "url", "name": "A", "url": "https://a.org"},
+        {"type": "folder", "children": 5},
+    ]
+    export.write_text(json.dumps({"roots": {"bar": {"children": children}}}))
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(TypeError):
+        main([str(export), "--format", "chrome", "--batch-size", "1"])
+    assert find_shards(tmp_path / "data/refs/shards") == []
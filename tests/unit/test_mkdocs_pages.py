@@ -0,0 +1,160 @@
+"""Tests for tools/mkdocs_pages.py."""
+
+import pytest
+from mkdocs_pages import (
+    escape_markdown,
+    generate_pages,
+    page_name,
+    tag_page_name,
+    title_bucket,
+)
+from refs_citations import scan_notes
+
+pytestmark = pytest.mark.unit
+
+
+def test_generate_pages_writes_index_tag_and_reference_pages(write_shard, tmp_path):
+    write_shard(
+        "00/refs.jsonl",
+        [
+            {
+                "id": "smith2024-rust",
+                "title": "Rust *Fast*",
+                "year": 2024,
+                "authors": ["Smith, J."],
+                "url": "https://example.com/rust",
+                "tags": ["rust", "perf"],
+            },
+            {"id": "index", "title": "An index", "tags": ["perf"]},
+        ],
+    )
+    write_shard("01/refs.jsonl", [{"id": "smith2024-rust", "title": "Duplicate"}])
+    pages = tmp_path / "pages"
+
+    total, _, _ = generate_pages(tmp_path / "shards", pages, jobs=2)
+
+    assert total == 2
+
+    page = (pages / "smith2024-rust.md").read_text()
+    assert page.startswith("# Rust \\*Fast\\*\n")  # first record wins
+    assert "- **Authors:** Smith, J." in page
+    assert "[rust](tags/rust.md), [perf](tags/perf.md)" in page
+    assert (pages / f"{page_name('index')}.md").exists()
+
+    perf = (pages / "tags" / "perf.md").read_text().splitlines()
+    assert perf[2:4] == [
+        f"- [An index](../{page_name('index')}.md)",
+        "- [Rust \\*Fast\\*](../smith2024-rust.md) (2024)",
+    ]
+    index = (pages / "index.md").read_text()
+    assert "- [perf](tags/perf.md) (2)" in index
+    assert "- [rust](tags/rust.md) (1)" in index
+
+
+def test_generate_pages_only_rewrites_changed_pages(write_shard, tmp_path):
+    write_shard("00/refs.jsonl", [{"id": "a", "title": "A", "tags": ["x"]}])
+    pages = tmp_path / "pages"
+    generate_pages(tmp_path / "shards", pages)
+
+    _, stats, _ = generate_pages(tmp_path / "shards", pages)
+    assert stats.written == 0
+
+    write_shard("00/refs.jsonl", [{"id": "a", "title": "A", "tags": ["y"]}])
+    # Reference page, new tag page and index change; tag x is retired
+    _, stats, _ = generate_pages(tmp_path / "shards", pages)
+    assert (stats.written, stats.unchanged, stats.removed) == (3, 3, 1)
+    assert not (pages / "tags" / "x.md").exists()
+    assert "[y](tags/y.md)" in (pages / "a.md").read_text()
+
+
+def test_reference_pages_link_back_to_citing_notes(write_shard, tmp_path):
+    write_shard("00/refs.jsonl", [{"id": "a", "title": "A"}, {"id": "b"}])
+    notes = tmp_path / "docs" / "notes"
+    notes.mkdir(parents=True)
+    (notes / "one.md").write_text("---\nid: one\ntitle: One\n---\nSee [@a; @nope].\n")
+    citations, _ = scan_notes(notes, cache_file=None)
+    pages = tmp_path / "docs" / "references"
+
+    _, _, missing = generate_pages(tmp_path / "shards", pages, citations=citations)
+
+    assert missing == ["nope"]
+    page = (pages / "a.md").read_text()
+    assert page.endswith("## Cited By\n\n- [One](../notes/one.md)\n")
+    assert "Cited By" not in (pages / "b.md").read_text()
+
+
+def test_listings_are_paginated_with_stable_first_page(write_shard, tmp_path):
+    write_shard(
+        "00/refs.jsonl",
+        [{"id": f"r{i}", "title": f"Title {i:02d}", "year": 2020} for i in range(5)]
+        + [{"id": "n", "title": "42 things"}],
+    )
+    pages = tmp_path / "pages"
+
+    generate_pages(tmp_path / "shards", pages, page_size=2)
+
+    by_title = sorted(p.name for p in (pages / "by-title").iterdir())
+    assert by_title == ["0-9.md", "t-p2.md", "t-p3.md", "t.md"]
+    first = (pages / "by-title" / "t.md").read_text().splitlines()
+    assert first[2] == "Page 1 of 3 · [Next →](t-p2.md)"
+    assert first[4:6] == [
+        "- [Title 00](../r0.md) (2020)",
+        "- [Title 01](../r1.md) (2020)",
+    ]
+    last = (pages / "by-title" / "t-p3.md").read_text()
+    assert "[← Previous](t-p2.md) · Page 3 of 3\n" in last
+    assert (pages / "by-year" / "2020-p3.md").exists()
+    assert (pages / "by-year" / "undated.md").exists()
+
+    index = (pages / "index.md").read_text()
+    assert "[0-9](by-title/0-9.md) (1) · [t](by-title/t.md) (5)" in index
+    assert "[2020](by-year/2020.md) (5) · [undated](by-year/undated.md) (1)" in index
+
+
+def test_stale_pages_are_removed_but_hand_written_files_kept(write_shard, tmp_path):
+    write_shard("00/refs.jsonl", [{"id": "a", "tags": ["x"]}, {"id": "b"}])
+    pages = tmp_path / "pages"
+    generate_pages(tmp_path / "shards", pages)
+    (pages / "notes.md").write_text("hand-written\n")
+
+    write_shard("00/refs.jsonl", [{"id": "b"}])
+    _, stats, _ = generate_pages(tmp_path / "shards", pages)
+
+    assert stats.removed == 3  # a.md, tags/x.md, by-title/a.md
+    assert not (pages / "a.md").exists()
+    assert not (pages / "tags").exists()
+    assert (pages / "b.md").exists()
+    assert (pages / "notes.md").exists()
+    assert "a.md" not in (pages / ".manifest").read_text().splitlines()
+
+
+def test_page_names_and_escaping():
+    assert page_name("doe-2020-a") == "doe-2020-a"
+    assert page_name("doe/2020 a").startswith("doe-2020-a-")
+    assert page_name("tags").startswith("tags-")
+    assert tag_page_name("c-p2").startswith("c-p2-")
+    assert [title_bucket(t) for t in ("Émile", "3 ways", "¿Qué?")] == [
+        "e",
+        "0-9",
+        "other",
+    ]
+    assert escape_markdown("a [b]\n  c_d") == "a \\[b\\] c\\_d"
+
+
+def test_lossy_names_never_share_a_page(write_shard, tmp_path):
+    ids = ["doe-2020-a", "doe/2020 a", "Doe-2020-A", "index"]
+    tags = ["c", "c-p2", "c++", "C#", "C"]
+    write_shard("00/refs.jsonl", [{"id": i, "title": i, "tags": tags} for i in ids])
+    pages = tmp_path / "pages"
+
+    generate_pages(tmp_path / "shards", pages, page_size=1)
+
+    assert len({page_name(ref_id) for ref_id in ids}) == len(ids)
+    for ref_id in ids:
+        assert f"`{ref_id}`" in (pages / f"{page_name(ref_id)}.md").read_text()
+    # Tag c has a page per reference; c-p2 is another tag with its own listing
+    names = {tag_page_name(tag) for tag in tags} | {"c-p2", "c-p3", "c-p4"}
+    assert len(names) == len(tags) + 3
+    for tag in tags:
+        listing = (pages / "tags" / f"{tag_page_name(tag)}.md").read_text()
+        assert listing.startswith(f"# Tag: {escape_markdown(tag)}\n")
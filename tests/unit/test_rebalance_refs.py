@@ -0,0 +1,86 @@
+"""Tests for tools/rebalance_refs.py."""
+
+from pathlib import Path
+
+import pytest
+from rebalance_refs import main, plan_layout
+from refs_io import find_shards, shard_bucket
+
+pytestmark = pytest.mark.unit
+
+
+def refs(*ids: str) -> list[dict]:
+    return [{"id": ref_id, "title": ref_id.upper(), "url": "u"} for ref_id in ids]
+
+
+def test_plan_layout_buckets_sorts_and_splits(write_shard, tmp_path):
+    ids = [f"ref-{i:03d}" for i in range(300)]
+    write_shard("00/a.jsonl", refs(*ids[::2]))
+    write_shard("zz/b.jsonl", refs(*ids[1::2]))
+    shards = find_shards(tmp_path / "shards")
+
+    layout = plan_layout(shards, max_records=3)
+
+    seen = []
+    for path, content in layout.items():
+        lines = content.decode().splitlines()
+        line_ids = [line.split('"')[3] for line in lines]
+        assert {shard_bucket(ref_id) for ref_id in line_ids} == {path.parts[0]}
+        assert line_ids == sorted(line_ids)
+        assert 1 <= len(lines) <= 3
+        seen.extend(line_ids)
+    assert sorted(seen) == ids
+
+    # Below the limit every bucket is a single refs.jsonl
+    assert {path.name for path in plan_layout(shards, 1000)} == {"refs.jsonl"}
+
+
+def test_plan_layout_rejects_unbucketable_records(write_shard):
+    shard = write_shard("00/a.jsonl", [{"title": "no id"}])
+    with pytest.raises(ValueError, match=r"a.jsonl:1 Record has no string 'id'"):
+        plan_layout([shard], 10)
+
+
+def test_main_rewrites_once_and_keeps_unchanged_shards(tmp_path, monkeypatch):
+    refs_dir = tmp_path / "data/refs/shards"
+    (refs_dir / "00").mkdir(parents=True)
+    (refs_dir / "00/sample.jsonl").write_text(
+        '{"id": "b", "title": "B", "url": "u"}\n{"id":"a","title":"A","url":"u"}\n\n'
+    )
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["--check"]) == 1
+    assert main([]) == 0
+    shards = find_shards(Path("data/refs/shards"))
+    assert [s.relative_to("data/refs/shards").parts[0] for s in shards] == sorted(
+        {shard_bucket("a"), shard_bucket("b")}
+    )
+    # Record lines are kept byte-for-byte
+    content = "".join(s.read_text() for s in shards)
+    assert '{"id":"a","title":"A","url":"u"}\n' in content
+    assert not Path("data/refs/.shards.new").exists()
+
+    mtimes = [s.stat().st_mtime_ns for s in shards]
+    assert main(["--check"]) == 0
+    assert main([]) == 0
+    assert [
+        s.stat().st_mtime_ns for s in find_shards(Path("data/refs/shards"))
+    ] == mtimes
+
+
+def test_main_keeps_files_that_are_not_shards(tmp_path, monkeypatch):
+    refs_dir = tmp_path / "data/refs/shards"
+    (refs_dir / "zz").mkdir(parents=True)
+    (refs_dir / "zz/old.jsonl").write_text('{"id": "a", "title": "A", "url": "u"}\n')
+    (refs_dir / "README.md").write_text("Shards live here.\n")
+    (refs_dir / "zz/.gitkeep").touch()
+    monkeypatch.chdir(tmp_path)
+
+    assert main([]) == 0
+    refs_dir = Path("data/refs/shards")
+    assert (refs_dir / "README.md").read_text() == "Shards live here.\n"
+    assert (refs_dir / "zz/.gitkeep").exists()
+    assert not (refs_dir / "zz/old.jsonl").exists()
+    assert [s.relative_to(refs_dir) for s in find_shards(refs_dir)] == [
+        Path(shard_bucket("a")) / "refs.jsonl"
+    ]
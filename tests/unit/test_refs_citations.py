@@ -0,0 +1,49 @@
+"""Tests for tools/refs_citations.py."""
+
+import pytest
+from refs_citations import scan_notes, scan_text
+
+pytestmark = pytest.mark.unit
+
+
+def test_scan_text_finds_pandoc_citations_outside_code():
+    text = (
+        "See [@a] and [see @b-c, p. 3; -@d.] but not [me@example.com].\n"
+        "Inline `[@code]` is skipped.\n"
+        "```\n[@fenced]\n```\n"
+        "Again [@a], then [@e;@f].\n"
+    )
+    assert scan_text(text) == ["a", "b-c", "d", "e", "f"]
+
+
+def test_scan_notes_builds_bidirectional_map(tmp_path):
+    notes = tmp_path / "notes"
+    (notes / "blog").mkdir(parents=True)
+    (notes / "one.md").write_text("---\nid: one\ntitle: 'One'\n---\n[@x] [@y]\n")
+    (notes / "blog" / "post.md").write_text(
+        "---\ndate: 2025-01-01\n---\n# Post\n[@x]\n"
+    )
+
+    citation_map, scanned = scan_notes(notes, cache_file=None)
+
+    assert scanned == 2
+    assert citation_map.citations("one") == ("x", "y")
+    assert citation_map.cited_by == {"x": ["notes/blog/post", "one"], "y": ["one"]}
+    assert [note.title for note in citation_map.backlinks("x")] == ["Post", "One"]
+
+
+def test_scan_notes_reuses_cached_results(tmp_path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "a.md").write_text("[@x]\n")
+    (notes / "b.md").write_text("[@y]\n")
+    cache_file = tmp_path / "cache.json"
+
+    assert scan_notes(notes, cache_file=cache_file)[1] == 2
+    assert scan_notes(notes, cache_file=cache_file)[1] == 0
+
+    (notes / "b.md").write_text("[@z]\n")
+    (notes / "a.md").touch()  # new mtime, same content: not rescanned
+    citation_map, scanned = scan_notes(notes, jobs=2, cache_file=cache_file)
+    assert scanned == 1
+    assert citation_map.cited_by == {"x": ["notes/a"], "z": ["notes/b"]}
@@ -0,0 +1,75 @@
+"""Tests for shard discovery and parallel parsing in tools/refs_io.py."""
+
+import pytest
+from refs_io import find_shards, iter_shard_results, parse_shard
+
+pytestmark = pytest.mark.unit
+
+
+def make_ref(ref_id: str) -> dict:
+    return {"id": ref_id, "title": ref_id.title(), "url": f"https://e.com/{ref_id}"}
+
+
+def test_find_shards_is_sorted(tmp_path, write_shard):
+    """Shards are returned in path order regardless of creation order."""
+    write_shard("ff/b.jsonl", [make_ref("z")])
+    write_shard("00/a.jsonl", [make_ref("a")])
+    write_shard("0a/a.jsonl", [make_ref("m")])
+
+    shards = find_shards(tmp_path / "shards")
+
+    assert [p.parent.name for p in shards] == ["00", "0a", "ff"]
+
+
+def test_parse_shard_reports_line_numbers(write_shard):
+    """Blank lines are skipped and bad JSON is reported with its line."""
+    path = write_shard("00/a.jsonl", [make_ref("a")])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n{not json}\n")
+
+    result = parse_shard(path)
+
+    assert [line for line, _ in result.records] == [1]
+    assert result.errors[0][0] == 3
+    assert result.errors[0][1].startswith("Invalid JSON")
+
+
+def test_parallel_matches_serial(tmp_path, write_shard):
+    """Pool mode yields exactly the serial results in shard order."""
+    for bucket in range(6):
+        write_shard(
+            f"{bucket:02x}/refs.jsonl",
+            [make_ref(f"ref-{bucket}-{i}") for i in range(5)],
+        )
+    shards = find_shards(tmp_path / "shards")
+
+    serial = list(iter_shard_results(shards, jobs=1))
+    parallel = list(iter_shard_results(shards, jobs=3))
+
+    assert serial == parallel
+
+
+def test_json_backends_agree(write_shard, monkeypatch):
+    """Every installed decoding backend yields the same records and errors."""
+    import refs_io
+    from refs_json import BACKENDS, select_backend
+
+    path = write_shard("00/a.jsonl", [make_ref("a"), make_ref("ünï")])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("{oops\n")
+
+    results = []
+    for name in BACKENDS:
+        try:
+            _, loads, errors = select_backend(name)
+        except ImportError:
+            continue
+        monkeypatch.setattr(refs_io, "loads", loads)
+        monkeypatch.setattr(refs_io, "DECODE_ERRORS", errors)
+        result = parse_shard(path)
+        results.append((result.records, result.spans, [e[0] for e in result.errors]))
+
+    assert results
+    assert all(result == results[0] for result in results)
+    with pytest.raises(ValueError, match="expected one of: msgspec, orjson, json"):
+        select_backend("simdjson")
@@ -0,0 +1,78 @@
+"""Tests for tools/refs_notes.py."""
+
+import pytest
+import refs_notes
+from refs_notes import (
+    find_notes,
+    generated_timestamp,
+    iter_references,
+    parse_front_matter,
+)
+
+pytestmark = pytest.mark.unit
+
+NOTE = """---
+id: rust-notes
+title: "Rust Notes"
+tags:
+  - rust
+  - perf
+---
+
+# Rust Notes
+"""
+
+
+def test_find_notes_skips_generated_reference_pages(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "notes" / "blog").mkdir(parents=True)
+    (docs / "references").mkdir()
+    (docs / "notes" / "rust.md").write_text(NOTE)
+    (docs / "notes" / "blog" / "hello.md").write_text("# Hello\n")
+    (docs / "notes" / "image.png").write_bytes(b"")
+    (docs / "references" / "ref.md").write_text("# generated\n")
+
+    assert [p.relative_to(docs).as_posix() for p in find_notes(docs)] == [
+        "notes/blog/hello.md",
+        "notes/rust.md",
+    ]
+
+
+@pytest.mark.parametrize("use_yaml", [True, False])
+def test_parse_front_matter(use_yaml, monkeypatch):
+    if not use_yaml:
+        monkeypatch.setattr(refs_notes, "yaml", None)
+    elif refs_notes.yaml is None:
+        pytest.skip("PyYAML is not installed")
+
+    fields, body = parse_front_matter(NOTE)
+    assert fields == {
+        "id": "rust-notes",
+        "title": "Rust Notes",
+        "tags": ["rust", "perf"],
+    }
+    assert body == "\n# Rust Notes\n"
+    assert parse_front_matter("# No front matter\n") == ({}, "# No front matter\n")
+
+
+def test_iter_references_keeps_first_of_each_id(write_shard):
+    shard = write_shard(
+        "00/refs.jsonl",
+        [
+            {"id": "a", "title": "A", "extra": "not exported"},
+            {"title": "no id"},
+            {"id": "a", "title": "Duplicate"},
+            {"id": "b", "title": "B"},
+        ],
+    )
+    assert list(iter_references([shard], {"b": ["note"]})) == [
+        {"id": "a", "title": "A"},
+        {"id": "b", "title": "B", "cited_by": ["note"]},
+    ]
+
+
+def test_generated_timestamp(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    assert generated_timestamp([]) == "2023-11-14T22:13:20Z"
+    monkeypatch.delenv("SOURCE_DATE_EPOCH")
+    assert generated_timestamp([]) == "1970-01-01T00:00:00Z"
@@ -0,0 +1,50 @@
+"""Tests for tools/refs_output.py."""
+
+import pytest
+from refs_output import OutputFile, WriteStats, write_if_changed
+
+pytestmark = pytest.mark.unit
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = tmp_path / "out" / "page.md"
+
+    assert write_if_changed(path, "# Page\n")
+    plain = tmp_path / "plain.md"
+    plain.write_text("")
+    assert path.stat().st_mode & 0o777 == plain.stat().st_mode & 0o777
+    mtime = path.stat().st_mtime_ns
+    assert not write_if_changed(path, b"# Page\n")
+    assert path.stat().st_mtime_ns == mtime
+    assert write_if_changed(path, "# Page 2\n")
+    assert path.read_text() == "# Page 2\n"
+    assert [p.name for p in path.parent.iterdir()] == ["page.md"]
+
+
+def test_output_file_replaces_only_on_change_and_discards_on_error(tmp_path):
+    path = tmp_path / "refs.bib"
+    path.write_text("old")
+
+    with OutputFile(path) as f:
+        f.write("ol")
+        f.write("d")
+    assert not f.changed
+
+    with pytest.raises(RuntimeError), OutputFile(path) as f:
+        f.write("partial")
+        raise RuntimeError
+    assert path.read_text() == "old"
+
+    with OutputFile(path) as f:
+        f.write("new")
+    assert f.changed
+    assert path.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["refs.bib"]
+
+
+def test_write_stats_counts_and_merges():
+    stats = WriteStats()
+    stats.record(True)
+    other = WriteStats(unchanged=2)
+    stats.merge(other)
+    assert str(stats) == "1 written, 2 unchanged"
@@ -0,0 +1,78 @@
+"""Tests for the compiled JSON Schema validator in tools/refs_schema.py."""
+
+from pathlib import Path
+
+import pytest
+from refs_schema import compile_predicate, compile_validator, reference_checker
+
+pytestmark = pytest.mark.unit
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+VALID = {
+    "id": "smith2021-sql-inj",
+    "type": "web",
+    "title": "SQL injection",
+    "url": "https://example.com/sqli",
+    "authors": ["Smith, J."],
+    "year": 2021,
+    "tags": ["security"],
+    "accessed": "2025-10-19",
+}
+
+
+@pytest.fixture(scope="module")
+def validate():
+    return reference_checker(PROJECT_ROOT / "ai" / "site-index.schema.json")
+
+
+def test_valid_reference_has_no_errors(validate):
+    assert validate(VALID) == []
+
+
+def test_reports_every_violation(validate):
+    """All violations in a record are reported, not just the first."""
+    bad = {
+        "id": 7,
+        "type": "blog",
+        "url": "not a url",
+        "year": True,
+        "tags": ["ok", 3],
+        "accessed": "2025-13-01",
+    }
+
+    errors = validate(bad)
+
+    assert errors == [
+        "Missing required field 'title'",
+        "Field 'id': expected string, got integer",
+        'Field \'type\': "blog" is not one of "web", "paper", "book", "video", "misc"',
+        "Field 'url': 'not a url' is not a valid uri",
+        "Field 'year': expected integer, got boolean",
+        "Field 'tags[1]': expected string, got integer",
+        "Field 'accessed': '2025-13-01' is not a valid date",
+    ]
+    assert validate(["not", "an", "object"]) == ["Record: expected object, got array"]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [VALID, {}, [], {"id": "a", "title": "t", "url": "x:y", "tags": "web"}, None],
+)
+def test_generated_predicate_agrees_with_checks(value):
+    """The fast predicate accepts exactly the values with no violations."""
+    schema = {
+        "type": "object",
+        "required": ["id", "title", "url"],
+        "properties": {
+            "id": {"type": "string", "pattern": "^[a-z]"},
+            "url": {"type": "string", "format": "uri"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+        },
+    }
+    assert compile_predicate(schema)(value) == (compile_validator(schema)(value) == [])
+
+
+def test_unsupported_keywords_fail_at_compile_time():
+    with pytest.raises(ValueError, match="minLength"):
+        compile_validator({"type": "string", "minLength": 1})
@@ -0,0 +1,88 @@
+"""Tests for the compiled SQLite reference store in tools/refs_store.py."""
+
+import os
+
+import pytest
+from refs_store import open_store
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def store_paths(tmp_path, write_shard):
+    write_shard(
+        "00/a.jsonl",
+        [
+            {"id": "a", "title": "A", "url": "https://a.org", "tags": ["web"]},
+            {"id": "b", "title": "B", "url": "https://b.org", "year": 2021},
+        ],
+    )
+    write_shard("01/a.jsonl", [{"id": "c", "title": "C", "url": "https://c.org"}])
+    return tmp_path / "shards", tmp_path / "derived" / "refs.sqlite"
+
+
+def test_lazy_lookups(store_paths):
+    """Records and single fields are read by ID."""
+    with open_store(*store_paths) as store:
+        assert len(store) == 3
+        assert list(store.ids()) == ["a", "b", "c"]
+        assert store.get("c")["url"] == "https://c.org"
+        assert store.get("missing") is None
+        assert store.get_field("a", "tags") == ["web"]
+        assert store.get_field("b", "year") == 2021
+        assert store.get_field("b", "tags", []) == []
+        assert "b" in store
+
+
+def test_refresh_reloads_only_changed_shards(store_paths, write_shard):
+    """Untouched shards are skipped; edited and deleted shards are synced."""
+    refs_dir, store_file = store_paths
+    open_store(refs_dir, store_file).close()
+
+    with open_store(refs_dir, store_file, refresh=False) as store:
+        assert store.refresh() == 0
+
+    # Same content with a new mtime is re-hashed but not reloaded
+    shard = refs_dir / "00" / "a.jsonl"
+    os.utime(shard, ns=(0, 0))
+    with open_store(refs_dir, store_file, refresh=False) as store:
+        assert store.refresh() == 0
+
+    write_shard("01/a.jsonl", [{"id": "d", "title": "D", "url": "https://d.org"}])
+    (refs_dir / "00" / "a.jsonl").unlink()
+    with open_store(refs_dir, store_file, refresh=False) as store:
+        assert store.refresh() == 1
+        assert list(store.ids()) == ["d"]
+
+
+def test_index_queries_follow_shard_updates(store_paths, write_shard):
+    """Tag/year/author/URL indexes answer queries and track reloaded shards."""
+    from refs_index import ReferenceIndex
+
+    refs_dir, store_file = store_paths
+    with open_store(refs_dir, store_file) as store:
+        index = ReferenceIndex(store)
+        assert index.by_tag("WEB") == ["a"]
+        assert index.by_year(2021) == ["b"]
+        assert index.by_url("http://www.a.org/?utm_source=feed") == ["a"]
+        assert index.locate("c") == (str(refs_dir / "01" / "a.jsonl"), 1)
+        assert index.locate("missing") is None
+
+    write_shard(
+        "01/a.jsonl",
+        [
+            {
+                "id": "c",
+                "title": "C",
+                "url": "u",
+                "tags": ["web"],
+                "authors": ["Doe, J."],
+            }
+        ],
+    )
+    with open_store(refs_dir, store_file) as store:
+        index = ReferenceIndex(store)
+        assert index.by_tag("web") == ["a", "c"]
+        assert index.by_author("doe, j.") == ["c"]
+        assert index.tag_counts() == {"web": 2}
+        assert index.year_counts() == {2021: 1}
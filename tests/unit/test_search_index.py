@@ -0,0 +1,125 @@
+"""Tests for tools/search_index.py."""
+
+import heapq
+import random
+
+import pytest
+import search_index
+from search_index import (
+    SearchIndex,
+    analyze,
+    build_index,
+    document_terms,
+    iter_documents,
+    stem,
+)
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def index_file(tmp_path, write_shard):
+    notes = tmp_path / "docs" / "notes"
+    notes.mkdir(parents=True)
+    (notes / "caching.md").write_text(
+        "---\nid: caching\ntitle: Caching Strategies\n---\n"
+        "Caches keep hot data close. A write-through cache updates the store.\n\n"
+        "```\nsearchable_only_in_code = 1\n```\n"
+    )
+    (notes / "queues.md").write_text(
+        "# Message Queues\n\nQueues decouple producers from consumers; "
+        "a cache in front of the queue is rarely useful.\n"
+    )
+    write_shard(
+        "00/refs.jsonl",
+        [
+            {"id": "lru", "title": "The LRU Cache Policy", "url": "https://x/lru"},
+            {"id": "lru", "title": "Duplicate Queue Title"},
+            {"id": "kafka", "title": "Kafka: a Distributed Messaging System"},
+        ],
+    )
+    documents = iter_documents(
+        tmp_path / "docs", tmp_path / "shards", cache_file=tmp_path / "cache.json"
+    )
+    data, count = build_index(documents)
+    assert count == 4
+    path = tmp_path / "search-index.bin"
+    path.write_bytes(data)
+    return path
+
+
+def ids(hits):
+    return [hit.document["id"] for hit in hits]
+
+
+def test_analyze_stems_folds_and_keeps_stop_word_positions():
+    assert analyze("The Cafés are CACHING queries") == ["", "cafe", "", "cach", "queri"]
+    assert [stem(w) for w in ("caches", "cached", "caching")] == ["cach"] * 3
+    assert stem("indexes") == stem("index") == "index"
+    assert document_terms("A Title", "body title") == {
+        "titl": [1, 3],
+        "bodi": [3],
+    }
+
+
+def test_search_ranks_notes_and_reference_titles(index_file):
+    with SearchIndex(index_file) as index:
+        assert index.document_count == 4
+        hits = index.search("cache")
+        assert ids(hits) == ["caching", "lru", "notes/queues"]
+        assert hits[0].score > hits[1].score > hits[2].score > 0
+        assert hits[1].document == {
+            "kind": "reference",
+            "id": "lru",
+            "title": "The LRU Cache Policy",
+            "url": "https://x/lru",
+        }
+        assert ids(index.search("Messaging")) == ["kafka", "notes/queues"]
+        assert ids(index.search("message queue", limit=1)) == ["notes/queues"]
+        assert index.search("searchable_only_in_code") == []
+        assert index.search("duplicate") == []
+        assert index.search("the of") == []
+
+
+def test_phrase_queries_need_words_in_sequence(index_file):
+    with SearchIndex(index_file) as index:
+        assert ids(index.search('"write-through cache"')) == ["caching"]
+        assert ids(index.search('"cache write"')) == []
+        # Stop words keep their place: "in front of the queue"
+        assert ids(index.search('"front of a queue"')) == ["notes/queues"]
+        assert ids(index.search('hot "cache in front"')) == ["notes/queues"]
+        assert index.search('"unknown cache"') == []
+
+
+def test_pruned_search_matches_exhaustive_scoring(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_index, "CHAMPIONS", 4)
+    rng = random.Random(7)  # noqa: S311 - synthetic data, not security
+    words = [f"w{i}" for i in range(12)]
+    documents = []
+    for n in range(300):
+        text = " ".join(rng.choices(words, weights=range(12, 0, -1), k=8))
+        documents.append(({"kind": "reference", "id": str(n)}, document_terms(text)))
+    path = tmp_path / "search-index.bin"
+    path.write_bytes(build_index(documents)[0])
+
+    with SearchIndex(path) as index:
+        for query in ("w0", "w11", "w0 w1", "w2 w5 w9", "w0 w3 w6 w10"):
+            scores: dict[int, int] = {}
+            for term in analyze(query):
+                plist = index.postings(term)
+                for doc, impact in zip(plist.docs, plist.impacts, strict=True):
+                    scores[doc] = scores.get(doc, 0) + impact
+            for limit in (3, 7):
+                expected = heapq.nlargest(limit, scores.values())
+                hits = index.search(query, limit=limit)
+                scores_found = [round(h.score * index.impact_scale) for h in hits]
+                assert scores_found == expected
+
+
+def test_build_is_deterministic_and_rejects_other_files(tmp_path):
+    documents = [({"id": "a"}, document_terms("alpha beta")), ({"id": "b"}, {})]
+    assert build_index(documents) == build_index(documents)
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not an index")
+    with pytest.raises(ValueError, match="not a search index"):
+        SearchIndex(path)
@@ -0,0 +1,124 @@
+"""Tests for tools/validate_refs.py and its tag vocabulary (tools/refs_tags.py)."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+import refs_tags
+from refs_schema import compile_validator
+from refs_tags import TagVocabulary, load_vocabulary, parse_tags_yaml
+from validate_refs import FALLBACK_SCHEMA, main, validate_reference
+
+pytestmark = pytest.mark.unit
+
+TAGS_YAML = """\
+# Controlled vocabulary
+allowed_tags:
+  - python
+  - rust
+  - security
+"""
+
+
+@pytest.mark.parametrize("with_pyyaml", [True, False])
+def test_parse_tags_yaml(monkeypatch, with_pyyaml):
+    """PyYAML and the built-in fallback parser read the same vocabulary."""
+    if not with_pyyaml:
+        monkeypatch.setattr(refs_tags, "yaml", None)
+    elif refs_tags.yaml is None:
+        pytest.skip("PyYAML not installed")
+
+    assert parse_tags_yaml(TAGS_YAML) == ["python", "rust", "security"]
+    assert parse_tags_yaml("allowed_tags: [a, 'b']\n") == ["a", "b"]
+
+
+def test_vocabulary_is_cached_until_file_changes(tmp_path):
+    tags_file = tmp_path / "tags.yaml"
+    tags_file.write_text(TAGS_YAML)
+
+    first = load_vocabulary(tags_file)
+    assert load_vocabulary(tags_file) is first
+
+    tags_file.write_text(TAGS_YAML + "  - bash\n")
+    os.utime(tags_file, ns=(0, 10**9))
+    assert "bash" in load_vocabulary(tags_file)
+
+
+def test_suggestions_for_typos():
+    vocabulary = TagVocabulary(["python", "rust", "security", "test"])
+
+    assert vocabulary.suggest("pyhton") == ("python",)
+    assert vocabulary.suggest("Rust") == ("rust",)
+    assert vocabulary.suggest("tests") == ("test",)
+    assert vocabulary.suggest("zzz") == ()
+
+
+def test_validate_reference_reports_tags_and_duplicates():
+    check = compile_validator(FALLBACK_SCHEMA)
+    vocabulary = TagVocabulary(["security"])
+    seen: set[str] = set()
+    ref = {"id": "a", "title": "A", "url": "https://a.org", "tags": ["secruity"]}
+
+    assert validate_reference(ref, vocabulary, seen, check) == [
+        "Unknown tag 'secruity' in a (did you mean 'security'?)"
+    ]
+    assert validate_reference(ref, None, seen, check) == ["Duplicate ID: a"]
+    assert validate_reference({"id": "b"}, None, seen, check) == [
+        "Missing required field 'title' in b",
+        "Missing required field 'url' in b",
+    ]
+    # Without a schema check, the required fields are still checked
+    assert validate_reference({"id": "c", "title": "C"}, None, seen) == [
+        "Missing required field 'url' in c"
+    ]
+
+
+def test_main_streams_jsonl_and_sarif(tmp_path, monkeypatch, capsys):
+    shard = tmp_path / "data/refs/shards/00/a.jsonl"
+    shard.parent.mkdir(parents=True)
+    shard.write_text(
+        '{"id": "a", "title": "A", "url": "https://a.org"}\n{bad\n{"id": "a"}\n'
+    )
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["--jsonl", "out.jsonl", "--sarif", "out.sarif"]) == 1
+
+    rows = [json.loads(line) for line in Path("out.jsonl").read_text().splitlines()]
+    assert [(row["line"], row["rule"]) for row in rows] == [
+        (2, "invalid-json"),
+        (3, "schema"),
+        (3, "schema"),
+        (3, "duplicate-id"),
+    ]
+    sarif = json.loads(Path("out.sarif").read_text())
+    results = sarif["runs"][0]["results"]
+    assert sarif["version"] == "2.1.0"
+    assert [r["ruleId"] for r in results] == [row["rule"] for row in rows]
+    assert results[0]["locations"][0]["physicalLocation"] == {
+        "artifactLocation": {"uri": "data/refs/shards/00/a.jsonl"},
+        "region": {"startLine": 2},
+    }
+    assert "failed with 4 errors" in capsys.readouterr().err
+
+    assert main(["--max-errors", "2", "--jsonl", "out.jsonl"]) == 1
+    assert len(Path("out.jsonl").read_text().splitlines()) == 2
+    assert "stopped after 2 errors" in capsys.readouterr().err
+
+
+def test_main_keeps_stdout_clean_for_jsonl(tmp_path, monkeypatch, capsys):
+    shard = tmp_path / "data/refs/shards/00/a.jsonl"
+    shard.parent.mkdir(parents=True)
+    shard.write_text('{"id": "a", "title": "A", "url": "https://a.org"}\n{"id": 1}\n')
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["--jsonl", "-"]) == 1
+    out, err = capsys.readouterr()
+    assert [json.loads(line)["rule"] for line in out.splitlines()] == ["schema"] * 2
+    assert "⚠ Warning: tags.yaml not found" in err
+
+    shard.write_text('{"id": "a", "title": "A", "url": "https://a.org"}\n')
+    assert main(["--jsonl", "-"]) == 0
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "✓ Validated 1 references" in err
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Reference Tooling Benchmarks
+
+Measures throughput of the reference pipeline on a synthetic corpus:
+- bibtex: legacy per-field BibTeX writes vs the batched BibtexEmitter
+- decode: stdlib json vs accelerated refs_json backends on shard lines
+- schema: compiled $defs.reference validator (run from the repo root)
+
+Usage: python tools/bench_refs.py {bibtex,decode,schema} [--records N]
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from build_refs import BibtexEmitter, emit, escape_latex, format_bibtex_author
+from refs_io import parse_shard
+from refs_json import BACKENDS, select_backend
+from refs_schema import SCHEMA_FILE, reference_checker
+
+TAGS = ["python", "rust", "bash", "web", "security", "test"]
+WORDS = "a guide to fast json parsing in python rust and bash for web security".split()
+# Titles that need LaTeX escaping, mixed in at roughly one in ten records
+ODD_TITLES = ["R&D at 50% scale", "Using {braces} in C#", "snake_case vs $vars"]
+
+
+def synthetic_refs(count: int, seed: int = 0) -> Iterator[dict]:
+    """Yield count deterministic reference records resembling real bookmarks."""
+    rng = random.Random(seed)  # noqa: S311 - synthetic data, not security
+    for i in range(count):
+        if rng.random() < 0.1:
+            title = rng.choice(ODD_TITLES)
+        else:
+            title = " ".join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize()
+        yield {
+            "id": f"bench-{i:06d}",
+            "type": "web",
+            "title": title,
+            "url": f"https://example.com/{i // 1000}/{i}",
+            "authors": [f"Author{rng.randint(1, 5000)}, A."] * rng.randint(1, 3),
+            "year": rng.randint(1990, 2025),
+            "tags": rng.sample(TAGS, 2),
+            "accessed": "2025-01-01",
+        }
+
+
+def legacy_build_bibtex(refs: list[dict], output_file: Path, escape: bool = False):
+    """
+    The original build_refs.build_bibtex: several small writes per record.
+
+    With escape=True the same escaping as BibtexEmitter is applied, isolating
+    the cost of the write pattern from the cost of escaping.
+    """
+    with open(output_file, "w", encoding="utf-8") as f:
+        for ref in refs:
+            title = escape_latex(ref["title"]) if escape else ref["title"]
+            f.write(f"@{ref.get('type', 'misc')}{{{ref['id']},\n")
+            f.write(f"  title = {{{title}}},\n")
+            f.write(f"  url = {{{ref['url']}}},\n")
+            if "authors" in ref:
+                names = ref["authors"]
+                if escape:
+                    names = map(format_bibtex_author, names)
+                authors = " and ".join(names)
+                f.write(f"  author = {{{authors}}},\n")
+            if "year" in ref:
+                f.write(f"  year = {{{ref['year']}}},\n")
+            f.write("}\n\n")
+
+
+def measure(label: str, count: int, func: Callable[[], object]) -> float:
+    """Run func once (with GC paused, as timeit does) and print records/sec."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"  {label:<28} {elapsed:8.3f}s  {rate:12,.0f} records/sec")
+    return rate
+
+
+def bench_bibtex(count: int):
+    """Compare legacy and batched BibTeX writers."""
+    refs = list(synthetic_refs(count))
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "references.bib"
+        print(f"BibTeX encoding, {count:,} records")
+        before = measure(
+            "legacy, no escaping", count, lambda: legacy_build_bibtex(refs, output)
+        )
+        escaped = measure(
+            "legacy + escaping",
+            count,
+            lambda: legacy_build_bibtex(refs, output, escape=True),
+        )
+        after = measure(
+            "BibtexEmitter (batched)",
+            count,
+            lambda: emit(refs, [BibtexEmitter(output)]),
+        )
+    print(f"  vs legacy: {after / before:.2f}x")
+    print(f"  vs legacy + escaping: {after / escaped:.2f}x")
+
+
+def bench_decode(count: int):
+    """Compare JSON backends decoding shard lines, then a full parse_shard."""
+    lines = [json.dumps(ref).encode() for ref in synthetic_refs(count)]
+    print(f"JSON decoding, {count:,} records")
+    rates = {}
+    for name in BACKENDS:
+        try:
+            _, loads, _ = select_backend(name)
+        except ImportError:
+            print(f"  {name:<28} (not installed)")
+            continue
+        rates[name] = measure(
+            name, count, lambda loads=loads: [loads(line) for line in lines]
+        )
+    fastest = max(rates, key=rates.get)
+    print(f"  speedup ({fastest} vs json): {rates[fastest] / rates['json']:.2f}x")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shard = Path(tmp) / "refs.jsonl"
+        shard.write_bytes(b"\n".join(lines) + b"\n")
+        measure("parse_shard (default backend)", count, lambda: parse_shard(shard))
+
+
+def bench_schema(count: int):
+    """Measure the compiled reference schema validator."""
+    refs = list(synthetic_refs(count))
+    validate = reference_checker(SCHEMA_FILE)
+    print(f"Schema validation ({SCHEMA_FILE}), {count:,} records")
+    measure("compiled validator", count, lambda: [validate(ref) for ref in refs])
+
+
+BENCHMARKS = {"bibtex": bench_bibtex, "decode": bench_decode, "schema": bench_schema}
+
+
+def main(argv: list[str] | None = None):
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark reference tooling")
+    parser.add_argument(
+        "benchmark", choices=sorted(BENCHMARKS), help="benchmark to run"
+    )
+    parser.add_argument(
+        "-n", "--records", type=int, default=200_000, help="synthetic corpus size"
+    )
+    args = parser.parse_args(argv)
+
+    BENCHMARKS[args.benchmark](args.records)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
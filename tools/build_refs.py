@@ -5,97 +5,385 @@ Reference Database Builder
 Transforms JSONL references to output formats:
 - CSL JSON (data/derived/references.csl.json) for Quarto
 - BibTeX (data/derived/references.bib) for MkDocs
+
+Each format is an Emitter subclass listed in EMITTERS; a single pass over
+the records feeds every emitter, so adding a format adds no traversals.
+
+Builds are incremental: converted output for each shard is cached in
+.cache/build_refs/ keyed on the shard's content hash, so only shards that
+changed since the last run are re-parsed and re-converted.
 """
 
+import argparse
+import functools
 import json
+import re
 import sys
+import textwrap
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from itertools import islice
 from pathlib import Path
 
+from refs_io import REFS_DIR, file_digest, find_shards, iter_shard_results
+from refs_output import OutputFile, WriteStats
+
+CACHE_DIR = Path(".cache/build_refs")
+DERIVED_DIR = Path("data/derived")
+
+
+def convert_csl(ref: dict) -> dict:
+    """Convert a reference record to a CSL JSON item."""
+    # Minimal CSL JSON conversion
+    csl_ref = {
+        "id": ref["id"],
+        "type": ref.get("type", "webpage"),
+        "title": ref["title"],
+        "URL": ref["url"],
+    }
+    if "authors" in ref:
+        csl_ref["author"] = [{"literal": author} for author in ref["authors"]]
+    if "year" in ref:
+        csl_ref["issued"] = {"date-parts": [[ref["year"]]]}
+
+    return csl_ref
+
+
+def render_csl(ref: dict) -> str:
+    """Render one CSL item exactly as json.dump(..., indent=2) nests it in a list."""
+    return textwrap.indent(json.dumps(convert_csl(ref), indent=2), "  ")
+
+
+# Characters with special meaning in BibTeX/LaTeX field values
+LATEX_ESCAPES = {
+    "\\": r"\textbackslash{}",
+    "{": r"\{",
+    "}": r"\}",
+    "%": r"\%",
+    "&": r"\&",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+}
+LATEX_SPECIAL = re.compile(r"[\\{}%&$#_~^]")
+
+# URL fields are verbatim; only braces would unbalance the field delimiters
+URL_ESCAPES = str.maketrans({"{": "%7B", "}": "%7D"})
+
+AND_WORD = re.compile(r"\band\b", re.IGNORECASE)
+
+
+def escape_latex(value: str) -> str:
+    """Escape LaTeX special characters in a BibTeX field value."""
+    if LATEX_SPECIAL.search(value) is None:
+        return value
+    return LATEX_SPECIAL.sub(lambda m: LATEX_ESCAPES[m.group()], value)
+
+
+def escape_url(url: str) -> str:
+    """Percent-encode braces in a URL field value."""
+    if "{" in url or "}" in url:
+        return url.translate(URL_ESCAPES)
+    return url
+
+
+@functools.lru_cache(maxsize=65536)
+def format_bibtex_author(name: str) -> str:
+    """
+    Format one author name for a BibTeX author list.
+
+    "Last, First" names pass through escaped. Names containing the word "and"
+    (e.g. "Johnson and Johnson") are braced so BibTeX does not split them.
+    Results are cached since bookmark corpora repeat authors heavily.
+    """
+    name = escape_latex(" ".join(name.split()))
+    if AND_WORD.search(name):
+        return f"{{{name}}}"
+    return name
+
+
+def render_bibtex(ref: dict) -> str:
+    """Render one reference as a BibTeX entry."""
+    authors = ref.get("authors")
+    year = ref.get("year")
+    author_field = (
+        f"  author = {{{' and '.join(map(format_bibtex_author, authors))}}},\n"
+        if authors is not None
+        else ""
+    )
+    year_field = f"  year = {{{year}}},\n" if year is not None else ""
+
+    return (
+        f"@{ref.get('type', 'misc')}{{{ref['id']},\n"
+        f"  title = {{{escape_latex(ref['title'])}}},\n"
+        f"  url = {{{escape_url(ref['url'])}}},\n"
+        f"{author_field}{year_field}}}\n\n"
+    )
+
+
+class Emitter:
+    """
+    Base class for reference output formats.
+
+    An emitter renders each record to a text fragment and writes fragments to
+    its output file in record order, one joined block per batch rather than
+    one write per field or record. Subclasses set name and filename and
+    implement render(); formats with framing also override write()/close().
+    Output goes through refs_output.OutputFile, so an unchanged file is not
+    rewritten (changed tells whether it was) and a failed build leaves the
+    previous file in place.
+    """
+
+    name = ""
+    filename = ""
+
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+        self.count = 0
+        self.changed = False
+        self._f = None
+
+    def render(self, ref: dict) -> str:
+        raise NotImplementedError
+
+    def render_batch(self, refs: list[dict]) -> list[str]:
+        return list(map(self.render, refs))
+
+    def open(self):
+        self._f = OutputFile(self.output_file)
+        self.count = 0
+
+    def write(self, fragments: list[str]):
+        """Write a batch of rendered fragments as a single block."""
+        self._f.write("".join(fragments))
+        self.count += len(fragments)
+
+    def close(self):
+        self.changed = self._f.commit()
+        self._f = None
 
-def build_csl_json(refs: list[dict], output_file: Path):
-    """Build CSL JSON format."""
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    def __enter__(self):
+        self.open()
+        return self
 
-    csl_refs = []
-    for ref in refs:
-        # Minimal CSL JSON conversion
-        csl_ref = {
-            "id": ref["id"],
-            "type": ref.get("type", "webpage"),
-            "title": ref["title"],
-            "URL": ref["url"],
-        }
-        if "authors" in ref:
-            csl_ref["author"] = [{"literal": author} for author in ref["authors"]]
-        if "year" in ref:
-            csl_ref["issued"] = {"date-parts": [[ref["year"]]]}
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.discard()
+            self._f = None
 
-        csl_refs.append(csl_ref)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(csl_refs, f, indent=2)
+class CslJsonEmitter(Emitter):
+    """CSL JSON array, byte-identical to json.dump(..., indent=2)."""
 
+    name = "csl"
+    filename = "references.csl.json"
 
-def build_bibtex(refs: list[dict], output_file: Path):
+    def render(self, ref: dict) -> str:
+        return render_csl(ref)
+
+    def render_batch(self, refs: list[dict]) -> list[str]:
+        return list(map(render_csl, refs))
+
+    def write(self, fragments: list[str]):
+        if fragments:
+            self._f.write(",\n" if self.count else "[\n")
+            self._f.write(",\n".join(fragments))
+            self.count += len(fragments)
+
+    def close(self):
+        self._f.write("\n]" if self.count else "[]")
+        super().close()
+
+
+class BibtexEmitter(Emitter):
+    """BibTeX database for mkdocs-bibtex."""
+
+    name = "bib"
+    filename = "references.bib"
+
+    def render(self, ref: dict) -> str:
+        return render_bibtex(ref)
+
+    def render_batch(self, refs: list[dict]) -> list[str]:
+        return list(map(render_bibtex, refs))
+
+
+# Output formats built by main(), in the order they are reported
+EMITTERS: list[type[Emitter]] = [CslJsonEmitter, BibtexEmitter]
+
+
+def emit(refs: Iterable[dict], emitters: list[Emitter], batch_size: int = 1000) -> int:
+    """
+    Feed records to every emitter in a single pass; return the record count.
+
+    Records are taken batch_size at a time so each emitter renders and writes
+    a whole chunk at once.
+    """
+    count = 0
+    refs = iter(refs)
+    with ExitStack() as stack:
+        for emitter in emitters:
+            stack.enter_context(emitter)
+        while batch := list(islice(refs, batch_size)):
+            for emitter in emitters:
+                emitter.write(emitter.render_batch(batch))
+            count += len(batch)
+    return count
+
+
+def build_csl_json(refs: Iterable[dict], output_file: Path) -> int:
+    """Build CSL JSON format, converting records one at a time."""
+    return emit(refs, [CslJsonEmitter(output_file)])
+
+
+def build_bibtex(refs: Iterable[dict], output_file: Path) -> int:
     """Build BibTeX format."""
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    return emit(refs, [BibtexEmitter(output_file)])
+
+
+class BuildCache:
+    """
+    Persistent per-shard build cache.
+
+    manifest.json maps each shard path to the hash of its content; converted
+    output lives in one entry file per content hash. The manifest also records
+    a hash of this script so changes to the converters invalidate everything.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.manifest_file = cache_dir / "manifest.json"
+        self.generator = file_digest(Path(__file__))
+        self.shards: dict[str, str] = {}
+
+    def load(self):
+        """Load the manifest, discarding it if it came from another generator."""
+        try:
+            manifest = json.loads(self.manifest_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if manifest.get("generator") == self.generator:
+            self.shards = manifest.get("shards", {})
+
+    def entry_file(self, digest: str) -> Path:
+        return self.cache_dir / "entries" / f"{digest}.json"
+
+    def is_fresh(self, shard: Path, digest: str) -> bool:
+        """Return True if the cached output for shard matches its content."""
+        return (
+            self.shards.get(str(shard)) == digest and self.entry_file(digest).exists()
+        )
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        for ref in refs:
-            ref_type = ref.get("type", "misc")
-            ref_id = ref["id"]
-            title = ref["title"]
-            url = ref["url"]
+    def store(self, shard: Path, digest: str, entry: dict):
+        """Record converted output for a shard."""
+        entry_file = self.entry_file(digest)
+        entry_file.parent.mkdir(parents=True, exist_ok=True)
+        entry_file.write_text(json.dumps(entry), encoding="utf-8")
+        self.shards[str(shard)] = digest
 
-            f.write(f"@{ref_type}{{{ref_id},\n")
-            f.write(f"  title = {{{title}}},\n")
-            f.write(f"  url = {{{url}}},\n")
+    def read(self, digest: str) -> dict:
+        return json.loads(self.entry_file(digest).read_text(encoding="utf-8"))
 
-            if "authors" in ref:
-                authors = " and ".join(ref["authors"])
-                f.write(f"  author = {{{authors}}},\n")
-            if "year" in ref:
-                f.write(f"  year = {{{ref['year']}}},\n")
+    def iter_entries(
+        self, shards: list[Path], digests: dict[Path, str]
+    ) -> Iterator[dict]:
+        """Yield cached entries one shard at a time, in shard order."""
+        for shard in shards:
+            yield self.read(digests[shard])
 
-            f.write("}\n\n")
+    def save(self, shards: list[Path]):
+        """Write the manifest for the given shards and prune unused entries."""
+        live = {str(shard) for shard in shards}
+        self.shards = {path: d for path, d in self.shards.items() if path in live}
+        entries_dir = self.cache_dir / "entries"
+        if entries_dir.exists():
+            used = set(self.shards.values())
+            for entry_file in entries_dir.glob("*.json"):
+                if entry_file.stem not in used:
+                    entry_file.unlink()
 
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {"generator": self.generator, "shards": self.shards}
+        self.manifest_file.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
 
-def main():
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Build reference artifacts")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse shards in N worker processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"ignore and rebuild the incremental cache in {CACHE_DIR}/",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
     """Main builder entry point."""
-    refs_dir = Path("data/refs/shards")
-    csl_output = Path("data/derived/references.csl.json")
-    bib_output = Path("data/derived/references.bib")
+    args = parse_args(argv)
+    refs_dir = REFS_DIR
+    emitters = [cls(DERIVED_DIR / cls.filename) for cls in EMITTERS]
 
     if not refs_dir.exists():
         print(f"✓ No references to build ({refs_dir} not found)")
-        csl_output.parent.mkdir(parents=True, exist_ok=True)
-        csl_output.write_text("[]")
-        bib_output.write_text("")
+        emit([], emitters)
         return 0
 
-    # Load all references
-    refs = []
-    for jsonl_file in refs_dir.rglob("*.jsonl"):
-        with open(jsonl_file, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    refs.append(json.loads(line))
+    shards = find_shards(refs_dir)
+    digests = {shard: file_digest(shard) for shard in shards}
+
+    cache = BuildCache(CACHE_DIR)
+    if not args.no_cache:
+        cache.load()
 
-    if not refs:
+    # Re-parse and re-convert only the shards whose content changed; each
+    # record is visited once and rendered by every emitter
+    stale = [shard for shard in shards if not cache.is_fresh(shard, digests[shard])]
+    for shard in iter_shard_results(stale, jobs=args.jobs):
+        if shard.errors:
+            line_num, error = shard.errors[0]
+            print(f"✗ {shard.path}:{line_num} {error}", file=sys.stderr)
+            return 1
+        refs = [ref for _, ref in shard.records]
+        fragments = {emitter.name: emitter.render_batch(refs) for emitter in emitters}
+        entry = {"count": len(shard.records), "fragments": fragments}
+        cache.store(shard.path, digests[shard.path], entry)
+
+    # Splice cached per-shard output back together in shard order. Entries
+    # are loaded one shard at a time and streamed straight to every output.
+    total = 0
+    with ExitStack() as stack:
+        for emitter in emitters:
+            stack.enter_context(emitter)
+        for entry in cache.iter_entries(shards, digests):
+            for emitter in emitters:
+                emitter.write(entry["fragments"][emitter.name])
+            total += entry["count"]
+
+    cache.save(shards)
+
+    if not total:
         print("✓ No references to build (no records found)")
-        csl_output.parent.mkdir(parents=True, exist_ok=True)
-        csl_output.write_text("[]")
-        bib_output.write_text("")
         return 0
 
-    # Build outputs
-    build_csl_json(refs, csl_output)
-    build_bibtex(refs, bib_output)
-
-    print(f"✓ Built {len(refs)} references")
-    print(f"  → {csl_output}")
-    print(f"  → {bib_output}")
+    stats = WriteStats()
+    for emitter in emitters:
+        stats.record(emitter.changed)
+    print(f"✓ Built {total} references ({len(stale)} of {len(shards)} shards rebuilt)")
+    for emitter in emitters:
+        print(f"  → {emitter.output_file}{'' if emitter.changed else ' (unchanged)'}")
+    print(f"  → {stats}")
     return 0
 
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Reference Duplicate Finder
+
+Finds references that point at the same thing under different IDs:
+- URL duplicates: same URL after normalization (http/https, www., default
+  ports, trailing slashes, fragments, tracking parameters, query order)
+- Title duplicates: same normalized title on the same host
+
+Runs in bounded memory: every key is spilled to one of N partition files
+by hash, and each partition is grouped on its own, so at most one
+partition's keys are held in memory at a time.
+
+Usage: python tools/dedup_refs.py [-j N] [--partitions N] [--spill-dir DIR]
+"""
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import unicodedata
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from refs_io import REFS_DIR, find_shards, iter_shard_results, normalize_url
+
+NON_WORD = re.compile(r"[\W_]+")
+
+# Duplicate groups printed before the summary line
+MAX_REPORTED = 20
+
+
+@dataclass
+class DuplicateGroup:
+    """References sharing a normalized URL or title; members are (shard, line, id)."""
+
+    kind: str
+    key: str
+    members: list[tuple[Path, int, str]] = field(default_factory=list)
+
+
+def normalize_title(title: str) -> str:
+    """Return a comparison key for title: case, punctuation and spacing ignored."""
+    return NON_WORD.sub(" ", unicodedata.normalize("NFKC", title).casefold()).strip()
+
+
+def reference_keys(ref: dict) -> Iterator[tuple[str, str]]:
+    """Yield the (kind, key) pairs a reference is deduplicated on."""
+    url = ref.get("url")
+    host = ""
+    if isinstance(url, str) and url.strip():
+        url_key = normalize_url(url)
+        yield "url", url_key
+        host = url_key.split("/", 1)[0]
+    title = ref.get("title")
+    if isinstance(title, str):
+        title_key = normalize_title(title)
+        if title_key:
+            yield "title", f"{host} {title_key}"
+
+
+def find_duplicates(
+    shards: list[Path],
+    jobs: int = 1,
+    partitions: int = 64,
+    spill_dir: Path | None = None,
+) -> list[DuplicateGroup]:
+    """
+    Return duplicate groups across shards, ordered by their first member.
+
+    Title groups that repeat a URL group's members are dropped.
+
+    Pass one streams every (kind, key, location) to partitions spill files
+    chosen by hash of the key; pass two reads the partitions back one at a
+    time and keeps keys seen on more than one reference.
+    """
+    found: list[tuple[tuple[int, int, str], str, DuplicateGroup]] = []
+    with tempfile.TemporaryDirectory(prefix="dedup-", dir=spill_dir) as tmp:
+        paths = [Path(tmp) / f"{i:03d}.jsonl" for i in range(partitions)]
+        spills = [open(path, "w", encoding="utf-8") for path in paths]
+        try:
+            for shard_index, shard in enumerate(iter_shard_results(shards, jobs=jobs)):
+                for line_num, ref in shard.records:
+                    if not isinstance(ref, dict):
+                        continue
+                    ref_id = ref.get("id")
+                    ref_id = ref_id if isinstance(ref_id, str) else "unknown"
+                    for kind, key in reference_keys(ref):
+                        row = json.dumps([kind, key, shard_index, line_num, ref_id])
+                        spills[hash(key) % partitions].write(row + "\n")
+        finally:
+            for spill in spills:
+                spill.close()
+
+        for path in paths:
+            seen: dict[tuple[str, str], list[tuple[int, int, str]]] = {}
+            with open(path, encoding="utf-8") as f:
+                for row in f:
+                    kind, key, shard_index, line_num, ref_id = json.loads(row)
+                    seen.setdefault((kind, key), []).append(
+                        (shard_index, line_num, ref_id)
+                    )
+            for (kind, key), members in seen.items():
+                if len(members) > 1:
+                    members.sort()
+                    group = DuplicateGroup(kind, key)
+                    group.members = [
+                        (shards[s], line, ref_id) for s, line, ref_id in members
+                    ]
+                    found.append((members[0], kind, group))
+            path.unlink()
+
+    # A title group with exactly the members of a URL group adds nothing
+    url_groups = {frozenset(g.members) for _, kind, g in found if kind == "url"}
+    found = [
+        item
+        for item in found
+        if item[1] == "url" or frozenset(item[2].members) not in url_groups
+    ]
+    return [
+        group
+        for _, _, group in sorted(found, key=lambda item: (item[0], item[1] != "url"))
+    ]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Find duplicate references by URL and title"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse shards in N worker processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        default=64,
+        help="number of spill partitions; more means less memory (default: 64)",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        type=Path,
+        default=None,
+        help="directory for temporary spill files (default: system temp dir)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Main duplicate detection entry point."""
+    args = parse_args(argv)
+    refs_dir = REFS_DIR
+
+    if not refs_dir.exists():
+        print(f"✓ No references to check ({refs_dir} not found)")
+        return 0
+
+    groups = find_duplicates(
+        find_shards(refs_dir),
+        jobs=args.jobs,
+        partitions=max(1, args.partitions),
+        spill_dir=args.spill_dir,
+    )
+    if not groups:
+        print("✓ No duplicate references found")
+        return 0
+
+    by_url = sum(1 for group in groups if group.kind == "url")
+    print(
+        f"✗ Found {len(groups)} duplicate groups "
+        f"({by_url} by URL, {len(groups) - by_url} by title):",
+        file=sys.stderr,
+    )
+    for group in groups[:MAX_REPORTED]:
+        print(f"  {group.kind} {group.key}", file=sys.stderr)
+        for shard, line_num, ref_id in group.members:
+            print(f"    {shard}:{line_num} {ref_id}", file=sys.stderr)
+    if len(groups) > MAX_REPORTED:
+        print(f"  ... and {len(groups) - MAX_REPORTED} more groups", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,35 +3,406 @@
 AI Index Exporter
 
 Exports site structure and content for AI/LLM consumption:
-- Generates ai/site-index.json
-- Includes notes, references, tags, and metadata
+- Generates ai/site-index.json (shape: ai/site-index.schema.json)
+- Notes (docs/**/*.md) with excerpt, word count, wikilinks and citations,
+  parsed in a process pool; entries are cached per note by content hash in
+  .cache/export_ai_index.json, so only changed notes are re-parsed
+- Citations come from refs_citations.scan_notes, the same scan (and note
+  IDs) the backlinks on the reference pages are built from
+- References streamed from the shards, each with the notes citing it
+- All tags, plus content statistics
+
+With --sharded the index is split for consumers that only need part of it:
+ai/site-index/index.json holds the site fields, stats, tags and a list of
+chunks (path, count, bytes, sha256); notes/<h>.ndjson and
+references/<hh>.ndjson hold one entry per line, bucketed by the leading hex
+digits of sha256(id). An entry is found by hashing its ID, and an edit only
+changes the chunk it lives in, so the rest stay cached.
+
+The file is framed by hand and references are written one per line as they
+are read, so the whole library is never held in memory. `generated` is the
+newest input mtime (or SOURCE_DATE_EPOCH), so an unchanged site exports an
+identical file and write-if-changed leaves it alone.
 """
 
+import argparse
+import hashlib
 import json
+import re
 import sys
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import partial
 from pathlib import Path
 
+import refs_citations
+import refs_notes
+from refs_cache import FileCache
+from refs_citations import HEADING, NOTES_DIR, note_id_for, scan_notes
+from refs_io import REFS_DIR, find_shards, resolve_jobs, shard_bucket
+from refs_notes import (
+    DOCS_DIR,
+    FENCE,
+    find_notes,
+    generated_timestamp,
+    iter_references,
+    ndjson_line,
+    parse_front_matter,
+)
+from refs_output import OutputFile, WriteStats, write_if_changed
 
-def main():
-    """Main export entry point."""
-    output_file = Path("ai/site-index.json")
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-
-    # TODO: Implement full site indexing
-    # For now, create a minimal index
-    index = {
-        "version": "0.1.0",
-        "generated": "2025-01-01T00:00:00Z",
-        "site_title": "Tom's Knowledge Base",
-        "notes": [],
-        "references": [],
-        "tags": [],
+SCHEMA_VERSION = "1.0.0"
+OUTPUT_FILE = Path("ai/site-index.json")
+SHARDED_DIR = Path("ai/site-index")
+MANIFEST_NAME = "index.json"
+MKDOCS_FILE = Path("mkdocs.yml")
+CACHE_FILE = Path(".cache/export_ai_index.json")
+
+# Code that note entries are derived from; editing it invalidates the cache
+NOTE_PARSERS = [
+    Path(__file__),
+    Path(refs_citations.__file__),
+    Path(refs_notes.__file__),
+]
+
+# Blog posts live under docs/notes/blog/posts (MkDocs Material blog plugin)
+BLOG_PREFIX = ("notes", "blog", "posts")
+
+EXCERPT_LENGTH = 280
+
+# Hex digits of sha256(id) naming a sharded chunk: 16 note and 256 reference
+# chunks, matching the 00..ff reference shard buckets
+NOTE_BUCKET_CHARS = 1
+REFERENCE_BUCKET_CHARS = 2
+
+WIKILINK = re.compile(r"\[\[([^\[\]|#\n]+)(?:#[^\[\]|\n]*)?(?:\|[^\[\]\n]*)?\]\]")
+WORD = re.compile(r"\w+(?:['’-]\w+)*")
+SITE_SETTING = re.compile(
+    r"^(site_name|site_description|site_url):[ \t]*(.*?)[ \t]*(?:#.*)?$", re.MULTILINE
+)
+# Lines that cannot start an excerpt paragraph
+NON_PROSE = re.compile(r"^(#|>|\||<|[-*+] |\d+[.)] |!\[|\{\{|=+$|-+$)")
+# A date and time YAML left as a string (`2024-05-01 10:00` has no seconds)
+DATE_TIME = re.compile(r"(\d{4}-\d{2}-\d{2})[Tt ]")
+
+
+def as_string_list(value) -> list[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None]
+    return []
+
+
+def excerpt(text: str) -> str:
+    """Return the first prose paragraph of text, shortened to EXCERPT_LENGTH."""
+    paragraph: list[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            if paragraph:
+                break
+        elif paragraph or not NON_PROSE.match(line):
+            paragraph.append(line)
+    text = " ".join(paragraph)
+    if len(text) > EXCERPT_LENGTH:
+        text = text[: EXCERPT_LENGTH - 1].rsplit(" ", 1)[0] + "…"
+    return text
+
+
+def parse_note(path: Path, docs_dir: Path) -> dict:
+    """Extract the site index entry of one note (runs in a worker process)."""
+    text = path.read_text(encoding="utf-8").replace("\r\n", "\n")
+    fields, body = parse_front_matter(text)
+    relpath = path.relative_to(docs_dir)
+
+    title = fields.get("title")
+    if not title:
+        heading = HEADING.search(body)
+        title = heading.group(1) if heading else relpath.stem
+    note = {
+        "id": note_id_for(fields.get("id"), path, docs_dir),
+        "title": str(title),
+        "path": relpath.as_posix(),
+    }
+    # The schema wants a plain date, so any time of day is dropped
+    note_date = fields.get("date")
+    if isinstance(note_date, datetime):
+        note_date = note_date.date()
+    if isinstance(note_date, date):
+        note["date"] = note_date.isoformat()
+    elif note_date:
+        match = DATE_TIME.match(str(note_date))
+        note["date"] = match.group(1) if match else str(note_date)
+    note["tags"] = as_string_list(fields.get("tags"))
+    prose = FENCE.sub("", body)
+    note["excerpt"] = str(fields.get("description") or excerpt(prose))
+    note["word_count"] = len(WORD.findall(prose))
+    note["outbound_links"] = list(
+        dict.fromkeys(link.strip() for link in WIKILINK.findall(prose))
+    )
+    return note
+
+
+def is_blog_post(note: dict) -> bool:
+    return tuple(note["path"].split("/")[: len(BLOG_PREFIX)]) == BLOG_PREFIX
+
+
+def parse_notes(notes: list[Path], docs_dir: Path, jobs: int = 1) -> list[dict]:
+    """Parse notes in input order, in a process pool if jobs > 1."""
+    parse = partial(parse_note, docs_dir=docs_dir)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(notes) < 2:
+        return list(map(parse, notes))
+    chunksize = max(1, len(notes) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=min(jobs, len(notes))) as pool:
+        return list(pool.map(parse, notes, chunksize=chunksize))
+
+
+def site_settings(mkdocs_file: Path = MKDOCS_FILE) -> dict[str, str]:
+    """Read site_title/site_description/site_url from mkdocs.yml."""
+    try:
+        text = mkdocs_file.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return {"site_title": "Knowledge Base"}
+    settings = dict(SITE_SETTING.findall(text))
+    site = {
+        "site_title": settings.get("site_name", "").strip("'\"") or "Knowledge Base"
+    }
+    for name in ("site_description", "site_url"):
+        if settings.get(name):
+            site[name] = settings[name].strip("'\"")
+    return site
+
+
+def write_array(out: OutputFile, name: str, items) -> int:
+    """Write `"name": [...],` with one compact item per line; return the count."""
+    count = 0
+    out.write(f'  "{name}": [')
+    for item in items:
+        out.write(",\n    " if count else "\n    ")
+        out.write(json.dumps(item, ensure_ascii=False))
+        count += 1
+    out.write("\n  ],\n" if count else "],\n")
+    return count
+
+
+@dataclass
+class SiteContent:
+    """Parsed notes plus everything needed to stream the references."""
+
+    header: dict
+    notes: list[dict]
+    shards: list[Path]
+    cited_by: dict[str, list[str]]
+    tags: set[str]
+    jobs: int = 1
+    parsed: int = 0
+
+    def iter_references(self) -> Iterator[dict]:
+        """Yield reference entries, adding their tags to self.tags."""
+        for ref in iter_references(self.shards, self.cited_by, self.jobs):
+            self.tags.update(t for t in ref.get("tags") or () if isinstance(t, str))
+            yield ref
+
+    def stats(self, reference_count: int) -> dict[str, int]:
+        blog_count = sum(map(is_blog_post, self.notes))
+        return {
+            "note_count": len(self.notes) - blog_count,
+            "blog_count": blog_count,
+            "reference_count": reference_count,
+            "tag_count": len(self.tags),
+        }
+
+
+def collect_site(
+    docs_dir: Path = DOCS_DIR,
+    refs_dir: Path = REFS_DIR,
+    jobs: int = 1,
+    mkdocs_file: Path = MKDOCS_FILE,
+    cache_file: Path | None = CACHE_FILE,
+) -> SiteContent:
+    """
+    Parse the notes and find the shards; references are read later.
+
+    Only notes whose content changed since the last run are parsed; the
+    others come from the per-note cache (none is used if cache_file is None).
+    """
+    paths = find_notes(docs_dir)
+    cache = FileCache(cache_file, NOTE_PARSERS)
+    cache.load()
+    stale = cache.stale(paths)
+    for path, note in zip(stale, parse_notes(stale, docs_dir, jobs), strict=True):
+        cache[path] = note
+    cache.save(paths)
+    shards = find_shards(refs_dir) if refs_dir.exists() else []
+
+    # One citation scan for the whole site: mkdocs_pages builds its
+    # backlinks from the same map, so both agree on who cites what
+    citation_cache = cache_file and cache_file.with_name(refs_citations.CACHE_FILE.name)
+    notes_dir = docs_dir / NOTES_DIR.relative_to(DOCS_DIR)
+    citations, _ = scan_notes(notes_dir, jobs, citation_cache)
+    cited = {note.path: list(note.citations) for note in citations.notes.values()}
+    notes = [{**cache[path], "citations": cited.get(path, [])} for path in paths]
+
+    tags: set[str] = set()
+    for note in notes:
+        tags.update(note["tags"])
+
+    header = {
+        "version": SCHEMA_VERSION,
+        "generated": generated_timestamp(
+            [docs_dir / note["path"] for note in notes] + shards
+        ),
+        **site_settings(mkdocs_file),
+    }
+    return SiteContent(
+        header, notes, shards, citations.cited_by, tags, jobs, len(stale)
+    )
+
+
+def export_index(site: SiteContent, output_file: Path) -> tuple[dict, WriteStats]:
+    """Write the site index as one JSON file; return its stats and write counts."""
+    writes = WriteStats()
+    with OutputFile(output_file) as out:
+        # The header object without its closing brace, then the arrays
+        out.write(json.dumps(site.header, indent=2, ensure_ascii=False)[:-2] + ",\n")
+        write_array(out, "notes", site.notes)
+        references = write_array(out, "references", site.iter_references())
+        out.write(f'  "tags": {json.dumps(sorted(site.tags), ensure_ascii=False)},\n')
+        stats = site.stats(references)
+        out.write(f'  "stats": {json.dumps(stats)}\n}}\n')
+    writes.record(out.changed)
+    return stats, writes
+
+
+def export_sharded(site: SiteContent, output_dir: Path) -> tuple[dict, WriteStats]:
+    """
+    Write the site index as a root manifest plus NDJSON chunks.
+
+    Notes and references are bucketed by a hash of their ID, so each chunk
+    only changes when one of its own entries does. Chunk files from earlier
+    runs that are no longer listed are removed. Returns the index stats and
+    the write counts.
+    """
+    writes = WriteStats()
+    sections: dict[str, dict] = {}
+
+    def chunk_entry(section: str, bucket: str, count: int, size: int, digest: str):
+        sections[section]["chunks"].append(
+            {
+                "bucket": bucket,
+                "path": f"{section}/{bucket}.ndjson",
+                "count": count,
+                "bytes": size,
+                "sha256": digest,
+            }
+        )
+
+    # Notes are already in memory: group, then write each chunk whole
+    sections["notes"] = {"key": f"sha256(id)[:{NOTE_BUCKET_CHARS}]", "chunks": []}
+    note_buckets: dict[str, list[dict]] = {}
+    for note in site.notes:
+        bucket = shard_bucket(note["id"])[:NOTE_BUCKET_CHARS]
+        note_buckets.setdefault(bucket, []).append(note)
+    for bucket, notes in sorted(note_buckets.items()):
+        data = "".join(map(ndjson_line, notes)).encode("utf-8")
+        path = output_dir / "notes" / f"{bucket}.ndjson"
+        writes.record(write_if_changed(path, data))
+        digest = hashlib.sha256(data).hexdigest()
+        chunk_entry("notes", bucket, len(notes), len(data), digest)
+
+    # References stream into one open chunk per bucket
+    sections["references"] = {
+        "key": f"sha256(id)[:{REFERENCE_BUCKET_CHARS}]",
+        "chunks": [],
     }
+    counts: dict[str, int] = {}
+    with ExitStack() as stack:
+        chunks: dict[str, OutputFile] = {}
+        for ref in site.iter_references():
+            bucket = shard_bucket(ref["id"])[:REFERENCE_BUCKET_CHARS]
+            if bucket not in chunks:
+                path = output_dir / "references" / f"{bucket}.ndjson"
+                chunks[bucket] = stack.enter_context(OutputFile(path))
+                counts[bucket] = 0
+            chunks[bucket].write(ndjson_line(ref))
+            counts[bucket] += 1
+        for bucket, chunk in sorted(chunks.items()):
+            writes.record(chunk.commit())
+            chunk_entry(
+                "references", bucket, counts[bucket], chunk.size, chunk.hexdigest()
+            )
+        stack.pop_all()
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(index, f, indent=2)
+    stats = site.stats(sum(counts.values()))
+    manifest = {
+        **site.header,
+        "stats": stats,
+        "tags": sorted(site.tags),
+        "sections": sections,
+    }
+    text = json.dumps(manifest, indent=2, ensure_ascii=False) + "\n"
+    writes.record(write_if_changed(output_dir / MANIFEST_NAME, text))
 
-    print(f"✓ Exported AI index to {output_file}")
+    listed = {
+        output_dir / chunk["path"] for s in sections.values() for chunk in s["chunks"]
+    }
+    for section in sections:
+        for path in (output_dir / section).glob("*.ndjson"):
+            if path not in listed:
+                path.unlink()
+                writes.removed += 1
+    return stats, writes
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Export the AI site index")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse notes and shards in N worker processes (0 = one per CPU, "
+        "default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"ignore and rebuild the per-note cache in {CACHE_FILE}",
+    )
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help=f"write a manifest and NDJSON chunks to {SHARDED_DIR}/ instead of "
+        f"{OUTPUT_FILE}",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Main export entry point."""
+    args = parse_args(argv)
+    if args.no_cache:
+        CACHE_FILE.unlink(missing_ok=True)
+    site = collect_site(jobs=args.jobs)
+    if args.sharded:
+        output = SHARDED_DIR / MANIFEST_NAME
+        stats, writes = export_sharded(site, SHARDED_DIR)
+    else:
+        output = OUTPUT_FILE
+        stats, writes = export_index(site, OUTPUT_FILE)
+    print(
+        f"✓ Exported AI index to {output} ({stats['note_count']} notes, "
+        f"{stats['blog_count']} posts, {stats['reference_count']} references, "
+        f"{stats['tag_count']} tags)"
+    )
+    print(f"  → {site.parsed} of {len(site.notes)} notes parsed, the rest cached")
+    print(f"  → {writes}")
     return 0
 
 
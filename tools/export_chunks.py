@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Chunked Note Export
+
+Exports the notes as heading-aware text chunks for embedding pipelines:
+- Each note is split at its #, ## and ### headings (not inside code fences);
+  sections longer than MAX_CHARS are split further between paragraphs
+- A chunk ID is the note ID plus the section's page anchor (as MkDocs
+  generates it) and a ~N suffix for later parts, so it survives edits
+  elsewhere in the note
+- Each chunk carries the sha256 of its record, so consumers can tell which
+  chunks changed
+- Notes are split in a process pool and cached per note by content hash in
+  .cache/export_chunks.json
+
+Output in ai/chunks/:
+- chunks.ndjson  every chunk, in note path and document order
+- changes.ndjson what changed since the previous export: one
+                 {"op": "upsert", ...chunk} or {"op": "delete", "id"} per line
+- index.json     counts, the sha256 of chunks.ndjson (`state`) and of the
+                 chunks.ndjson the changes apply to (`base`)
+
+A consumer that has applied state S only needs changes.ndjson when `base`
+is S; otherwise it re-reads chunks.ndjson. An export that changes nothing
+writes nothing, so the last delta stays available. The previous snapshot is
+read from the output directory, so a build from a clean checkout has to put
+the published files there first (the Pages workflow fetches them).
+
+Usage: python tools/export_chunks.py [-j N] [--no-cache]
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import refs_citations
+import refs_notes
+from refs_cache import FileCache
+from refs_citations import HEADING, note_id_for
+from refs_io import resolve_jobs
+from refs_notes import (
+    DOCS_DIR,
+    find_notes,
+    generated_timestamp,
+    ndjson_line,
+    parse_front_matter,
+)
+from refs_output import WriteStats, file_sha256, write_if_changed
+
+SCHEMA_VERSION = "1.0.0"
+OUTPUT_DIR = Path("ai/chunks")
+CHUNKS_NAME = "chunks.ndjson"
+CHANGES_NAME = "changes.ndjson"
+INDEX_NAME = "index.json"
+CACHE_FILE = Path(".cache/export_chunks.json")
+
+# Code that chunks are derived from; editing it invalidates the cache
+CHUNKERS = [
+    Path(__file__),
+    Path(refs_citations.__file__),
+    Path(refs_notes.__file__),
+]
+
+# Headings up to this level start a new chunk (the MkDocs toc_depth)
+SPLIT_LEVEL = 3
+# Sections longer than this are split between paragraphs (~500 tokens)
+MAX_CHARS = 2000
+
+ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$")
+FENCE_OPEN = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+INLINE_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+
+
+def heading_anchor(heading: str) -> str:
+    """Return the anchor MkDocs (Python-Markdown toc) gives a heading."""
+    text = INLINE_LINK.sub(r"\1", heading).replace("`", "").replace("*", "")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = re.sub(r"[^\w\s-]", "", text).strip().lower()
+    return re.sub(r"[-\s]+", "-", text)
+
+
+def unique_anchor(anchor: str, used: set[str]) -> str:
+    """Deduplicate an anchor the way the toc extension does (_1, _2, ...)."""
+    if anchor and anchor not in used:
+        return anchor
+    n = 1
+    while f"{anchor}_{n}" in used:
+        n += 1
+    return f"{anchor}_{n}"
+
+
+def split_sections(body: str) -> list[tuple[list[str], str, list[str]]]:
+    """
+    Split a note body at its headings up to SPLIT_LEVEL.
+
+    Returns (heading path, anchor, paragraphs) per section; text before the
+    first heading has an empty path and anchor. Paragraphs are separated by
+    blank lines, and a fenced code block always stays in one paragraph.
+    """
+    sections: list[tuple[list[str], str, list[str]]] = [([], "", [])]
+    path: list[tuple[int, str]] = []
+    used: set[str] = set()
+    paragraph: list[str] = []
+    fence = ""
+
+    def end_paragraph():
+        if paragraph:
+            sections[-1][2].append("\n".join(paragraph))
+            paragraph.clear()
+
+    for line in body.split("\n"):
+        if fence:
+            paragraph.append(line)
+            if line.strip().startswith(fence) and not line.strip().strip(fence[0]):
+                fence = ""
+            continue
+        opening = FENCE_OPEN.match(line)
+        if opening:
+            fence = opening.group(1)
+            paragraph.append(line)
+            continue
+        heading = ATX_HEADING.match(line)
+        if heading:
+            level, text = len(heading.group(1)), heading.group(2)
+            anchor = unique_anchor(heading_anchor(text), used)
+            used.add(anchor)
+            if level <= SPLIT_LEVEL:
+                end_paragraph()
+                path = [(n, t) for n, t in path if n < level] + [(level, text)]
+                sections.append(([t for _, t in path], anchor, []))
+            paragraph.append(line)
+            end_paragraph()
+        elif line.strip():
+            paragraph.append(line)
+        else:
+            end_paragraph()
+    end_paragraph()
+    return sections
+
+
+def pack_paragraphs(paragraphs: list[str], max_chars: int = MAX_CHARS) -> list[str]:
+    """Join paragraphs into parts of at most max_chars (longer ones stand alone)."""
+    parts: list[list[str]] = []
+    size = 0
+    for paragraph in paragraphs:
+        if not parts or size + len(paragraph) > max_chars:
+            parts.append([])
+            size = 0
+        parts[-1].append(paragraph)
+        size += len(paragraph) + 2
+    return ["\n\n".join(part) for part in parts]
+
+
+def chunk_note(path: Path, docs_dir: Path) -> list[dict]:
+    """Return the chunks of one note in document order (runs in a worker)."""
+    text = path.read_text(encoding="utf-8").replace("\r\n", "\n")
+    fields, body = parse_front_matter(text)
+    relpath = path.relative_to(docs_dir)
+    note_id = note_id_for(fields.get("id"), path, docs_dir)
+    title = fields.get("title")
+    if not title:
+        heading = HEADING.search(body)
+        title = heading.group(1) if heading else relpath.stem
+
+    chunks = []
+    for headings, anchor, paragraphs in split_sections(body):
+        # A heading directly followed by a subheading has nothing to embed
+        if not paragraphs or (headings and len(paragraphs) == 1):
+            continue
+        base_id = f"{note_id}#{anchor}" if anchor else note_id
+        for part, chunk_text in enumerate(pack_paragraphs(paragraphs), 1):
+            chunk = {
+                "id": base_id if part == 1 else f"{base_id}~{part}",
+                "note_id": note_id,
+                "title": str(title),
+                "path": relpath.as_posix(),
+                "anchor": anchor,
+                "headings": headings,
+                "text": chunk_text,
+            }
+            record = json.dumps(chunk, ensure_ascii=False).encode("utf-8")
+            chunk["sha256"] = hashlib.sha256(record).hexdigest()
+            chunks.append(chunk)
+    return chunks
+
+
+def chunk_notes(notes: list[Path], docs_dir: Path, jobs: int = 1) -> list[list[dict]]:
+    """Chunk notes in input order, in a process pool if jobs > 1."""
+    chunk = partial(chunk_note, docs_dir=docs_dir)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(notes) < 2:
+        return list(map(chunk, notes))
+    chunksize = max(1, len(notes) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=min(jobs, len(notes))) as pool:
+        return list(pool.map(chunk, notes, chunksize=chunksize))
+
+
+def collect_chunks(
+    docs_dir: Path = DOCS_DIR,
+    jobs: int = 1,
+    cache_file: Path | None = CACHE_FILE,
+) -> tuple[list[Path], list[dict], int]:
+    """
+    Return the notes, all their chunks and the number of notes re-split.
+
+    Only notes whose content changed since the last run are read; the
+    others come from the per-note cache (none is used if cache_file is None).
+    """
+    paths = find_notes(docs_dir)
+    cache = FileCache(cache_file, CHUNKERS)
+    cache.load()
+    stale = cache.stale(paths)
+    for path, chunks in zip(stale, chunk_notes(stale, docs_dir, jobs), strict=True):
+        cache[path] = chunks
+    cache.save(paths)
+    chunks = [chunk for path in paths for chunk in cache[path]]
+    return paths, chunks, len(stale)
+
+
+def read_chunk_hashes(path: Path) -> dict[str, str]:
+    """Map chunk ID to sha256 for a previous chunks.ndjson (empty if missing)."""
+    hashes = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                chunk = json.loads(line)
+                hashes[chunk["id"]] = chunk["sha256"]
+    except FileNotFoundError:
+        pass
+    return hashes
+
+
+def export_chunks(
+    chunks: list[dict], output_dir: Path, generated: str
+) -> tuple[dict, WriteStats]:
+    """
+    Write the chunk snapshot, the changes since the previous one and the
+    index; return the index and the write counts.
+
+    Chunk IDs must be unique: for duplicates (from duplicate note IDs) the
+    first chunk wins. If the snapshot is unchanged nothing is written.
+    """
+    writes = WriteStats()
+    unique: dict[str, dict] = {}
+    for chunk in chunks:
+        unique.setdefault(chunk["id"], chunk)
+    snapshot = "".join(map(ndjson_line, unique.values())).encode("utf-8")
+    state = hashlib.sha256(snapshot).hexdigest()
+    chunks_file = output_dir / CHUNKS_NAME
+    index_file = output_dir / INDEX_NAME
+
+    base = file_sha256(chunks_file)
+    if base == state and index_file.exists():
+        writes.unchanged += 3
+        return json.loads(index_file.read_text(encoding="utf-8")), writes
+
+    previous = read_chunk_hashes(chunks_file)
+    upserts = [c for c in unique.values() if previous.get(c["id"]) != c["sha256"]]
+    deletes = sorted(previous.keys() - unique.keys())
+    changes = [ndjson_line({"op": "upsert", **chunk}) for chunk in upserts]
+    changes += [ndjson_line({"op": "delete", "id": chunk_id}) for chunk_id in deletes]
+
+    index = {
+        "version": SCHEMA_VERSION,
+        "generated": generated,
+        "max_chars": MAX_CHARS,
+        "note_count": len({chunk["note_id"] for chunk in unique.values()}),
+        "chunk_count": len(unique),
+        "state": state,
+        "base": base,
+        "changes": {"upserted": len(upserts), "deleted": len(deletes)},
+    }
+    # The index goes last: it only describes files that are already in place
+    writes.record(write_if_changed(chunks_file, snapshot))
+    writes.record(write_if_changed(output_dir / CHANGES_NAME, "".join(changes)))
+    text = json.dumps(index, indent=2) + "\n"
+    writes.record(write_if_changed(index_file, text))
+    return index, writes
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Export notes as text chunks")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="split notes in N worker processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"ignore and rebuild the per-note cache in {CACHE_FILE}",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Export the note chunks and the changes since the last export."""
+    args = parse_args(argv)
+    if args.no_cache:
+        CACHE_FILE.unlink(missing_ok=True)
+    paths, chunks, split = collect_chunks(jobs=args.jobs)
+    index, writes = export_chunks(chunks, OUTPUT_DIR, generated_timestamp(paths))
+    changes = index["changes"]
+    print(
+        f"✓ Exported {index['chunk_count']} chunks of {index['note_count']} notes "
+        f"to {OUTPUT_DIR}/"
+    )
+    if writes.written:
+        print(
+            f"  → {changes['upserted']} upserted, {changes['deleted']} deleted "
+            f"since the previous export"
+        )
+    else:
+        print("  → no changes since the previous export")
+    print(f"  → {split} of {len(paths)} notes split, the rest cached")
+    print(f"  → {writes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
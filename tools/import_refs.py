@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+Bookmark Importer
+
+Streams bookmark exports into the reference shards:
+- Firefox places.sqlite, Chrome Bookmarks JSON, Zotero CSL JSON exports and
+  Netscape bookmark HTML (also written by Pocket, Pinboard, browsers, ...)
+- Deterministic kebab-case IDs, prefixed with author and year when known
+  (as in SPEC §5.2: smith2021-sql-injection)
+- Duplicates skipped by normalized URL, using the reference store's URL index
+- New records appended to their canonical 00..ff bucket in batches; an
+  import that fails part-way is rolled back, so it writes all or nothing
+- Tags slugified and checked against data/refs/tags.yaml (--tag included)
+
+Records are read one at a time and the URLs and IDs seen during an import
+are tracked in SQLite temp tables, so memory stays flat however large the
+export is. Chrome's format is a single nested JSON document and is the one
+exception: it is loaded whole.
+
+Appending leaves buckets unsorted; run rebalance_refs afterwards to restore
+ID order.
+
+Usage: python tools/import_refs.py EXPORT [--format F] [--tag TAG] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+import sys
+import unicodedata
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import IO, Any
+
+from refs_io import REFS_DIR, normalize_url, shard_bucket
+from refs_store import ReferenceStore, open_store
+from refs_tags import TAGS_FILE, TagVocabulary, load_vocabulary
+
+CHUNK_SIZE = 1 << 16
+
+# Title words kept in generated IDs
+ID_WORDS = 6
+
+# CSL item types (Zotero exports) mapped to reference types
+CSL_TYPES = {
+    "article": "paper",
+    "article-journal": "paper",
+    "article-magazine": "paper",
+    "article-newspaper": "paper",
+    "paper-conference": "paper",
+    "report": "paper",
+    "thesis": "paper",
+    "book": "book",
+    "chapter": "book",
+    "webpage": "web",
+    "post": "web",
+    "post-weblog": "web",
+    "motion_picture": "video",
+    "broadcast": "video",
+}
+
+FIREFOX_QUERY = """
+WITH tag_folders AS (
+    SELECT id, title FROM moz_bookmarks
+    WHERE parent = (SELECT id FROM moz_bookmarks WHERE guid = 'tags________')
+),
+place_tags AS (
+    SELECT e.fk, group_concat(t.title, char(31)) AS tags
+    FROM moz_bookmarks e JOIN tag_folders t ON e.parent = t.id
+    GROUP BY e.fk
+)
+SELECT p.url, COALESCE(b.title, p.title), b.dateAdded, pt.tags
+FROM moz_bookmarks b
+JOIN moz_places p ON p.id = b.fk
+LEFT JOIN place_tags pt ON pt.fk = b.fk
+WHERE b.type = 1 AND b.parent NOT IN (SELECT id FROM tag_folders)
+ORDER BY b.id
+"""
+
+CHROME_EPOCH = datetime(1601, 1, 1, tzinfo=UTC)
+
+SEPARATORS = re.compile(r"[\s,]*")
+
+# Netscape bookmark anchors and their attributes (quoted values). A title
+# never contains another anchor, so an unclosed <a> cannot swallow the next
+ANCHOR = re.compile(
+    r"<a\s(?P<attrs>[^>]*)>(?P<title>(?:(?!<a\s).)*?)</a\s*>", re.I | re.S
+)
+ANCHOR_START = re.compile(r"<a\s", re.I)
+# Longest unfinished anchor carried between chunks (icons are inline data:
+# URIs); anything longer is dropped rather than re-scanned forever
+MAX_ANCHOR = 1 << 20
+ATTRIBUTE = re.compile(r'([\w-]+)\s*=\s*"([^"]*)"')
+TAG = re.compile(r"<[^>]*>")
+
+
+@dataclass
+class Bookmark:
+    """One entry read from an export, before it becomes a reference record."""
+
+    url: str
+    title: str = ""
+    tags: list[str] = field(default_factory=list)
+    added: date | None = None
+    authors: list[str] = field(default_factory=list)
+    year: int | None = None
+    type: str = "web"
+
+
+def from_timestamp(seconds: float | str | None) -> date | None:
+    """Return the UTC date of a Unix timestamp, or None if it is missing/bad."""
+    try:
+        return datetime.fromtimestamp(float(seconds), tz=UTC).date()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def read_firefox(path: Path) -> Iterator[Bookmark]:
+    """Yield bookmarks from a Firefox places.sqlite, with their tags."""
+    # immutable=1 reads the file even while Firefox holds its lock
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro&immutable=1", uri=True)
+    try:
+        for url, title, added, tags in conn.execute(FIREFOX_QUERY):
+            yield Bookmark(
+                url,
+                title or "",
+                tags.split("\x1f") if tags else [],
+                from_timestamp(added / 1_000_000 if added else None),
+            )
+    finally:
+        conn.close()
+
+
+def read_chrome(path: Path) -> Iterator[Bookmark]:
+    """Yield bookmarks from a Chrome/Chromium Bookmarks file (folders flattened)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    stack = list(reversed(list(data.get("roots", {}).values())))
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if node.get("type") == "url":
+            added = None
+            try:
+                # A missing or zero timestamp is unknown, not 1601-01-01
+                micros = int(node.get("date_added") or 0)
+                if micros > 0:
+                    added = (CHROME_EPOCH + timedelta(microseconds=micros)).date()
+            except (TypeError, ValueError, OverflowError):
+                pass
+            yield Bookmark(node.get("url", ""), node.get("name", ""), added=added)
+        else:
+            stack.extend(reversed(node.get("children", [])))
+
+
+def iter_json_array(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array, reading f chunk by chunk."""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip("\ufeff \t\r\n")
+    if not buf.startswith("["):
+        raise ValueError("expected a JSON array")
+    pos, eof = 1, False
+    while True:
+        pos = SEPARATORS.match(buf, pos).end()
+        if buf.startswith("]", pos):
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+            # An item ending exactly at the buffer end may be cut short
+            complete = eof or end < len(buf)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield item
+        pos = end
+
+
+def csl_author(author: dict) -> str:
+    """Format a CSL name as 'Family, G.' (the SPEC §5.2 author style)."""
+    if "literal" in author:
+        return str(author["literal"])
+    family = str(author.get("family", "")).strip()
+    initials = " ".join(f"{part[0]}." for part in str(author.get("given", "")).split())
+    return f"{family}, {initials}" if family and initials else family or initials
+
+
+def csl_date(value: Any) -> tuple[int, ...]:
+    """Return the date parts of a CSL date ({"date-parts": [[2021, 5]]})."""
+    try:
+        return tuple(int(part) for part in value["date-parts"][0])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return ()
+
+
+def read_zotero(path: Path) -> Iterator[Bookmark]:
+    """Yield items from a Zotero CSL JSON export (streamed item by item)."""
+    with open(path, encoding="utf-8") as f:
+        for item in iter_json_array(f):
+            if not isinstance(item, dict):
+                continue
+            url = item.get("URL") or ""
+            if not url and item.get("DOI"):
+                url = f"https://doi.org/{item['DOI']}"
+            keywords = item.get("keyword")
+            accessed = csl_date(item.get("accessed"))
+            added = None
+            if len(accessed) == 3:
+                try:
+                    added = date(*accessed)
+                except ValueError:
+                    pass
+            issued = csl_date(item.get("issued"))
+            authors = item.get("author")
+            yield Bookmark(
+                url,
+                str(item.get("title", "")),
+                keywords.split(",") if isinstance(keywords, str) else [],
+                added,
+                [csl_author(a) for a in authors if isinstance(a, dict)]
+                if isinstance(authors, list)
+                else [],
+                issued[0] if issued else None,
+                CSL_TYPES.get(item.get("type", ""), "misc"),
+            )
+
+
+def read_netscape(path: Path) -> Iterator[Bookmark]:
+    """
+    Yield bookmarks from a Netscape bookmark HTML file (streamed).
+
+    The format is one <DT><A HREF=...>title</A> per bookmark, so anchors
+    are matched directly rather than through a full HTML parser. Only the
+    last unfinished anchor is carried into the next chunk, and only up to
+    MAX_ANCHOR characters, so memory stays flat.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        buf = ""
+        while chunk := f.read(CHUNK_SIZE):
+            buf += chunk
+            end = 0
+            for match in ANCHOR.finditer(buf):
+                end = match.end()
+                attrs = {
+                    name.lower(): html.unescape(value)
+                    for name, value in ATTRIBUTE.findall(match["attrs"])
+                }
+                if attrs.get("href"):
+                    yield Bookmark(
+                        attrs["href"],
+                        html.unescape(TAG.sub("", match["title"])).strip(),
+                        attrs.get("tags", "").split(","),
+                        from_timestamp(
+                            attrs.get("add_date") or attrs.get("time_added")
+                        ),
+                    )
+            # Only the last anchor start can still complete; keep it (or a
+            # split "<a") for the next chunk
+            start = len(buf)
+            for opening in ANCHOR_START.finditer(buf, end):
+                start = opening.start()
+            if len(buf) - start > MAX_ANCHOR:
+                start = len(buf)
+            if start == len(buf) and buf[-2:].lower() == "<a":
+                start -= 2
+            elif start == len(buf) and buf.endswith("<"):
+                start -= 1
+            buf = buf[start:]
+
+
+READERS: dict[str, Callable[[Path], Iterator[Bookmark]]] = {
+    "firefox": read_firefox,
+    "chrome": read_chrome,
+    "zotero": read_zotero,
+    "netscape": read_netscape,
+}
+
+
+def detect_format(path: Path) -> str:
+    """Guess the export format from the file's first bytes."""
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if head.startswith(b"SQLite format 3\x00"):
+        return "firefox"
+    head = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith(b"["):
+        return "zotero"
+    if head.startswith(b"{"):
+        return "chrome"
+    if head.startswith(b"<"):
+        return "netscape"
+    raise ValueError(f"{path}: unrecognized bookmark export format")
+
+
+def slugify(text: str, max_words: int | None = None) -> str:
+    """Lowercase ASCII kebab-case of text, keeping at most max_words words."""
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return "-".join(re.findall(r"[a-z0-9]+", ascii_text.lower())[:max_words])
+
+
+def base_id(bookmark: Bookmark, url_key: str) -> str:
+    """Return the preferred ID for a bookmark: [family+year-]title-words."""
+    slug = slugify(bookmark.title, ID_WORDS) or slugify(url_key, ID_WORDS) or "ref"
+    if bookmark.authors and bookmark.year:
+        family = slugify(bookmark.authors[0].split(",")[0], 1)
+        if family:
+            slug = f"{family}{bookmark.year}-{slug}"
+    return slug
+
+
+class Importer:
+    """
+    Turns bookmarks into reference records and appends them to the shards.
+
+    Duplicate URLs (after normalization) of the existing corpus are found
+    through the store's ref_urls index; those of the current import through
+    a temp table, so neither is held in Python memory.
+
+    extra_tags are slugified like imported tags; one that is not in the
+    vocabulary raises ValueError, since it would be added to every record.
+    Appends can be undone with rollback() until the import is done.
+    """
+
+    def __init__(
+        self,
+        store: ReferenceStore,
+        refs_dir: Path = REFS_DIR,
+        vocabulary: TagVocabulary | None = None,
+        extra_tags: list[str] | None = None,
+        batch_size: int = 5000,
+        dry_run: bool = False,
+    ):
+        self.conn = store.conn
+        self.refs_dir = refs_dir
+        self.vocabulary = vocabulary
+        self.extra_tags = self._extra_tags(extra_tags or [])
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.imported = self.duplicates = self.skipped = self.dropped_tags = 0
+        self._pending: dict[Path, list[str]] = {}
+        self._pending_count = 0
+        self._targets: dict[str, Path] = {}
+        # Size of each shard before its first append (None: it did not exist)
+        self._original_sizes: dict[Path, int | None] = {}
+        self.conn.executescript(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS import_urls (url TEXT PRIMARY KEY)
+                WITHOUT ROWID;
+            CREATE TEMP TABLE IF NOT EXISTS import_ids (id TEXT PRIMARY KEY)
+                WITHOUT ROWID;
+            """
+        )
+
+    def _is_duplicate(self, url_key: str) -> bool:
+        if self.conn.execute(
+            "SELECT 1 FROM ref_urls WHERE url = ? LIMIT 1", (url_key,)
+        ).fetchone():
+            return True
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO import_urls VALUES (?)", (url_key,)
+        )
+        return cursor.rowcount == 0
+
+    def _id_taken(self, ref_id: str) -> bool:
+        return bool(
+            self.conn.execute(
+                "SELECT 1 FROM refs WHERE id = ? LIMIT 1", (ref_id,)
+            ).fetchone()
+            or self.conn.execute(
+                "SELECT 1 FROM import_ids WHERE id = ?", (ref_id,)
+            ).fetchone()
+        )
+
+    def _assign_id(self, bookmark: Bookmark, url_key: str) -> str:
+        """First free ID of: base, base-<url hash>, base-<url hash>-2, ..."""
+        ref_id = base_id(bookmark, url_key)
+        if self._id_taken(ref_id):
+            ref_id += "-" + hashlib.sha256(url_key.encode()).hexdigest()[:6]
+            candidate, n = ref_id, 1
+            while self._id_taken(candidate):
+                n += 1
+                candidate = f"{ref_id}-{n}"
+            ref_id = candidate
+        self.conn.execute("INSERT INTO import_ids VALUES (?)", (ref_id,))
+        return ref_id
+
+    def _extra_tags(self, tags: list[str]) -> list[str]:
+        slugs = list(dict.fromkeys(filter(None, map(slugify, tags))))
+        if self.vocabulary is None:
+            return slugs
+        unknown = [tag for tag in slugs if tag not in self.vocabulary]
+        if unknown:
+            described = []
+            for tag in unknown:
+                suggestions = self.vocabulary.suggest(tag)
+                hint = f" (did you mean '{suggestions[0]}'?)" if suggestions else ""
+                described.append(f"'{tag}'{hint}")
+            raise ValueError(f"Tags not in {TAGS_FILE}: {', '.join(described)}")
+        return slugs
+
+    def _tags(self, bookmark: Bookmark) -> list[str]:
+        tags = []
+        for tag in bookmark.tags:
+            tag = slugify(tag)
+            if not tag:
+                continue
+            if self.vocabulary is not None and tag not in self.vocabulary:
+                self.dropped_tags += 1
+            else:
+                tags.append(tag)
+        return list(dict.fromkeys(tags + self.extra_tags))
+
+    def record(self, bookmark: Bookmark) -> dict | None:
+        """Return the reference record for a bookmark, or None to skip it."""
+        url = bookmark.url.strip()
+        if not url.lower().startswith(("http://", "https://")):
+            self.skipped += 1
+            return None
+        url_key = normalize_url(url)
+        if self._is_duplicate(url_key):
+            self.duplicates += 1
+            return None
+
+        ref = {
+            "id": self._assign_id(bookmark, url_key),
+            "type": bookmark.type,
+            "title": " ".join(bookmark.title.split()) or url,
+            "url": url,
+        }
+        if bookmark.authors:
+            ref["authors"] = bookmark.authors
+        if bookmark.year:
+            ref["year"] = bookmark.year
+        tags = self._tags(bookmark)
+        if tags:
+            ref["tags"] = tags
+        if bookmark.added:
+            ref["accessed"] = bookmark.added.isoformat()
+        return ref
+
+    def target(self, ref_id: str) -> Path:
+        """Shard a new record is appended to: the last part of its bucket."""
+        bucket = shard_bucket(ref_id)
+        if bucket not in self._targets:
+            parts = sorted((self.refs_dir / bucket).glob("*.jsonl"))
+            self._targets[bucket] = (
+                parts[-1] if parts else self.refs_dir / bucket / "refs.jsonl"
+            )
+        return self._targets[bucket]
+
+    def add(self, bookmark: Bookmark):
+        ref = self.record(bookmark)
+        if ref is None:
+            return
+        line = json.dumps(ref, ensure_ascii=False, separators=(",", ":"))
+        self._pending.setdefault(self.target(ref["id"]), []).append(line)
+        self.imported += 1
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Append all buffered records, one write per shard."""
+        for path, lines in sorted(self._pending.items()):
+            if self.dry_run:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            existed = path.exists()
+            with open(path, "a+b") as f:
+                prefix = b""
+                if path not in self._original_sizes:
+                    self._original_sizes[path] = f.tell() if existed else None
+                    # Never glue a new record onto an unterminated last line
+                    if f.tell() > 0:
+                        f.seek(-1, 2)
+                        prefix = b"" if f.read(1) == b"\n" else b"\n"
+                f.write(prefix + ("\n".join(lines) + "\n").encode("utf-8"))
+        self._pending.clear()
+        self._pending_count = 0
+
+    def rollback(self):
+        """Drop buffered records and undo every append made so far."""
+        self._pending.clear()
+        self._pending_count = 0
+        for path, size in self._original_sizes.items():
+            if size is None:
+                path.unlink(missing_ok=True)
+            else:
+                os.truncate(path, size)
+        self._original_sizes.clear()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Import bookmarks as references")
+    parser.add_argument("export", type=Path, help="bookmark export file")
+    parser.add_argument(
+        "--format",
+        choices=sorted(READERS),
+        help="export format (default: detected from the file)",
+    )
+    parser.add_argument(
+        "--tag",
+        action="append",
+        default=[],
+        help="add TAG to every imported reference (repeatable)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        metavar="N",
+        help="append to the shards every N records (default: 5000)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="report counts without writing"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Main import entry point."""
+    args = parse_args(argv)
+    try:
+        fmt = args.format or detect_format(args.export)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+
+    vocabulary = load_vocabulary(TAGS_FILE) if TAGS_FILE.exists() else None
+    with open_store() as store:
+        try:
+            importer = Importer(
+                store,
+                vocabulary=vocabulary,
+                extra_tags=args.tag,
+                batch_size=max(1, args.batch_size),
+                dry_run=args.dry_run,
+            )
+        except ValueError as e:
+            print(f"✗ {e}", file=sys.stderr)
+            return 1
+        try:
+            for bookmark in READERS[fmt](args.export):
+                importer.add(bookmark)
+            importer.flush()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            # All or nothing: undo the batches already appended
+            importer.rollback()
+            print(f"✗ Failed to import {args.export}: {e}", file=sys.stderr)
+            print("  → the shards were left unchanged", file=sys.stderr)
+            return 1
+        except BaseException:
+            # A malformed export can fail in other ways (or the user hits
+            # Ctrl-C); the import is still all or nothing
+            importer.rollback()
+            raise
+
+    verb = "Would import" if args.dry_run else "Imported"
+    print(
+        f"✓ {verb} {importer.imported} references from {args.export} ({fmt}; "
+        f"{importer.duplicates} duplicates, {importer.skipped} non-web URLs skipped)"
+    )
+    if importer.dropped_tags:
+        print(f"  → {importer.dropped_tags} tags not in {TAGS_FILE} were dropped")
+    if importer.imported and not args.dry_run:
+        print("  → run tools/rebalance_refs.py to restore ID order in the shards")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,38 +2,431 @@
 """
 MkDocs Page Generator
 
-Generates reference pages:
-- Master reference index
-- Per-tag reference pages
-- Per-reference detail pages with backlinks
+Generates reference pages under docs/references/ (SPEC §7):
+- Master reference index: a compact summary of the listings below
+- Per-tag listings (tags/<tag>.md)
+- Listings by title initial (by-title/a.md) and by year (by-year/2024.md)
+- Per-reference detail pages (<id>.md) with backlinks to the citing notes
+
+IDs and tags that are not already safe lowercase file names get a short
+hash suffix (see file_name), so no two of them ever share a page.
+
+Listings are paginated at --page-size references: page 1 is <name>.md and
+page N is <name>-pN.md, so links to a listing never change as it grows.
+
+Built for large libraries: shards are parsed and their reference pages
+rendered in a process pool, and each page is only written when its content
+changes, so MkDocs' file watcher and build cache see untouched pages as
+untouched. A manifest of the pages each run produced lets the next run
+delete its own stale pages (and nothing else).
 """
 
+import argparse
+import hashlib
+import math
+import os
+import re
 import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import NamedTuple
 
+from refs_citations import NOTES_DIR, CitationMap, scan_notes
+from refs_io import REFS_DIR, find_shards, parse_shard, resolve_jobs
+from refs_notes import PAGES_DIR
+from refs_output import WriteStats, write_if_changed
 
-def main():
-    """Main page generation entry point."""
-    refs_dir = Path("references")
-    refs_dir.mkdir(parents=True, exist_ok=True)
+# Lists the pages of the last run, so pages no longer produced can be removed
+MANIFEST_NAME = ".manifest"
+
+# References per listing page; keeps every page a few hundred KB at most
+DEFAULT_PAGE_SIZE = 500
+
+# Page names the generator uses itself; references with these IDs get a hash
+RESERVED_NAMES = {"index", "tags", "by-title", "by-year"}
+
+MARKDOWN_SPECIAL = re.compile(r"([\\`*_{}\[\]<>#|!])")
+UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]+")
+# Later pages of a listing: <name>-p2.md, <name>-p3.md, ...
+PAGE_SUFFIX = re.compile(r"-p\d+$")
+
+
+# Reference ID → (note title, link to the note) for every note citing it
+Backlinks = dict[str, list[tuple[str, str]]]
+
+
+class RefSummary(NamedTuple):
+    """What the index and tag pages need to know about a reference."""
+
+    id: str
+    title: str
+    year: int | None
+    tags: tuple[str, ...]
+
+
+def escape_markdown(text: str) -> str:
+    """Escape characters that Markdown would otherwise interpret."""
+    return MARKDOWN_SPECIAL.sub(r"\\\1", " ".join(text.split()))
+
+
+def file_name(key: str, fallback: str, reserved: bool = False) -> str:
+    """
+    Return a file name (without .md) for key that no other key maps to.
+
+    Making a key filename-safe is lossy ("doe/2020 a" and "doe-2020-a", or
+    "Rust" and "rust" on case-insensitive file systems), so a key is used
+    as-is only if it already is a safe lowercase name and not reserved. Any
+    other key gets the first 8 hex digits of its SHA-256 appended.
+    """
+    name = UNSAFE_FILENAME.sub("-", key).strip(".-").lower()
+    if name == key and not reserved:
+        return name
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+    return f"{name or fallback}-{digest}"
+
+
+def page_name(ref_id: str) -> str:
+    """Return the file name (without .md) of a reference's page."""
+    return file_name(ref_id, "ref", ref_id in RESERVED_NAMES)
+
+
+def tag_page_name(tag: str) -> str:
+    """Return the file name (without .md) of a tag's page."""
+    # A tag named like a later page of another tag's listing must not replace it
+    return file_name(tag, "tag", bool(PAGE_SUFFIX.search(tag)))
+
+
+def render_reference_page(ref: dict, backlinks: Backlinks) -> str:
+    """Render the detail page of one reference, with the notes citing it."""
+    lines = [f"# {escape_markdown(str(ref.get('title') or ref['id']))}", ""]
+    lines.append(f"- **ID:** `{ref['id']}`")
+    if ref.get("type"):
+        lines.append(f"- **Type:** {escape_markdown(str(ref['type']))}")
+    authors = [a for a in ref.get("authors") or () if isinstance(a, str)]
+    if authors:
+        lines.append(f"- **Authors:** {escape_markdown('; '.join(authors))}")
+    if isinstance(ref.get("year"), int):
+        lines.append(f"- **Year:** {ref['year']}")
+    if isinstance(ref.get("url"), str):
+        lines.append(f"- **URL:** <{ref['url']}>")
+    if isinstance(ref.get("archived_url"), str):
+        lines.append(f"- **Archived:** <{ref['archived_url']}>")
+    if isinstance(ref.get("accessed"), str):
+        lines.append(f"- **Accessed:** {escape_markdown(ref['accessed'])}")
+    tags = [t for t in ref.get("tags") or () if isinstance(t, str)]
+    if tags:
+        links = ", ".join(
+            f"[{escape_markdown(tag)}](tags/{tag_page_name(tag)}.md)" for tag in tags
+        )
+        lines.append(f"- **Tags:** {links}")
+    citing = backlinks.get(ref["id"])
+    if citing:
+        lines += ["", "## Cited By", ""]
+        lines += [f"- [{escape_markdown(title)}]({link})" for title, link in citing]
+    return "\n".join(lines) + "\n"
+
+
+def render_shard_pages(
+    shard: Path, pages_dir: Path, backlinks: Backlinks
+) -> tuple[list[RefSummary], WriteStats]:
+    """
+    Write the reference pages of one shard (runs in a worker process).
+
+    Returns the shard's summaries in line order and its write counts.
+    """
+    summaries = []
+    stats = WriteStats()
+    for _, ref in parse_shard(shard).records:
+        if not isinstance(ref, dict) or not isinstance(ref.get("id"), str):
+            continue
+        page = pages_dir / f"{page_name(ref['id'])}.md"
+        stats.record(write_if_changed(page, render_reference_page(ref, backlinks)))
+        summaries.append(summarize(ref))
+    return summaries, stats
+
+
+def summarize(ref: dict) -> RefSummary:
+    year = ref.get("year")
+    return RefSummary(
+        ref["id"],
+        " ".join(str(ref.get("title") or ref["id"]).split()),
+        year if isinstance(year, int) else None,
+        tuple(dict.fromkeys(t for t in ref.get("tags") or () if isinstance(t, str))),
+    )
+
+
+def sort_key(summary: RefSummary) -> tuple[str, str]:
+    return summary.title.casefold(), summary.id
 
-    # TODO: Implement page generation
-    # For now, create a placeholder index
-    index_file = refs_dir / "index.md"
-    index_file.write_text("""# References
 
-Reference library index (to be generated).
+def title_bucket(title: str) -> str:
+    """Return the by-title bucket of a title: a..z, 0-9 or other."""
+    first = unicodedata.normalize("NFKD", title[:1].casefold())[:1]
+    if "a" <= first <= "z":
+        return first
+    return "0-9" if first.isdigit() else "other"
 
-## By Tag
 
-- [sample](tags/sample.md)
+def paged_name(base: str, page: int) -> str:
+    """Return the file name (without .md) of page N of a listing."""
+    return base if page == 1 else f"{base}-p{page}"
 
-## All References
 
-- (References will be listed here)
-""")
+def reference_item(summary: RefSummary, prefix: str = "") -> str:
+    """Render a list item linking to a reference page."""
+    year = f" ({summary.year})" if summary.year else ""
+    link = f"{prefix}{page_name(summary.id)}.md"
+    return f"- [{escape_markdown(summary.title)}]({link}){year}"
 
-    print(f"✓ Generated reference pages in {refs_dir}/")
+
+def render_listing_page(
+    heading: str, base: str, items: list[RefSummary], page: int, pages: int
+) -> str:
+    """Render page N of a listing of references one directory below the index."""
+    lines = [f"# {escape_markdown(heading)}", ""]
+    if pages > 1:
+        pager = [f"Page {page} of {pages}"]
+        if page > 1:
+            pager.insert(0, f"[← Previous]({paged_name(base, page - 1)}.md)")
+        if page < pages:
+            pager.append(f"[Next →]({paged_name(base, page + 1)}.md)")
+        lines += [" · ".join(pager), ""]
+    lines += [reference_item(s, "../") for s in items]
+    lines += ["", "[All references](../index.md)"]
+    return "\n".join(lines) + "\n"
+
+
+class PageWriter:
+    """Writes pages under pages_dir, recording every page the run produces."""
+
+    def __init__(self, pages_dir: Path):
+        self.pages_dir = pages_dir
+        self.stats = WriteStats()
+        self.produced: set[str] = set()
+
+    def write(self, name: str, content: str):
+        """Write the page at name (relative to pages_dir) if it changed."""
+        self.produced.add(name)
+        self.stats.record(write_if_changed(self.pages_dir / name, content))
+
+    def remove_stale(self) -> int:
+        """
+        Delete pages listed in the previous run's manifest that this run did
+        not produce, then save the new manifest. Returns the number removed.
+
+        Only manifest entries are ever deleted, so hand-written files next to
+        the generated pages are safe.
+        """
+        manifest = self.pages_dir / MANIFEST_NAME
+        try:
+            previous = manifest.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            previous = []
+        removed = 0
+        for name in sorted(set(previous) - self.produced):
+            path = Path(name)
+            if not name or path.is_absolute() or ".." in path.parts:
+                continue
+            try:
+                (self.pages_dir / path).unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            # Drop directories the removal emptied (tags/, by-year/, ...)
+            for parent in (self.pages_dir / path).parents:
+                if parent == self.pages_dir or any(parent.iterdir()):
+                    break
+                parent.rmdir()
+        self.stats.removed += removed
+        write_if_changed(manifest, "".join(f"{n}\n" for n in sorted(self.produced)))
+        return removed
+
+
+def write_listing(
+    writer: PageWriter,
+    directory: str,
+    base: str,
+    heading: str,
+    refs: list[RefSummary],
+    page_size: int,
+):
+    """
+    Write a listing sorted by title, page_size references per page.
+
+    The first page is always <base>.md, so links to a listing stay stable
+    however large it grows.
+    """
+    refs = sorted(refs, key=sort_key)
+    pages = max(1, math.ceil(len(refs) / page_size))
+    for page in range(1, pages + 1):
+        items = refs[(page - 1) * page_size : page * page_size]
+        content = render_listing_page(heading, base, items, page, pages)
+        writer.write(f"{directory}/{paged_name(base, page)}.md", content)
+
+
+def bucket_links(buckets: dict, directory: str) -> str:
+    """Render one line of `name (count)` links to bucket listings."""
+    return " · ".join(
+        f"[{name}]({directory}/{name}.md) ({len(refs)})" for name, refs in buckets
+    )
+
+
+def render_index(
+    refs: list[RefSummary],
+    tags: dict[str, list[RefSummary]],
+    by_title: dict[str, list[RefSummary]],
+    by_year: dict[str, list[RefSummary]],
+) -> str:
+    """Render the master index: a compact summary linking to every listing."""
+    lines = ["# References", "", f"{len(refs)} references, {len(tags)} tags.", ""]
+    lines += ["## By Title", "", bucket_links(sorted(by_title.items()), "by-title")]
+    lines += ["", "## By Year", ""]
+    # Newest first, undated last
+    years = sorted(
+        by_year.items(),
+        key=lambda item: (item[0].isdigit(), item[0].zfill(8)),
+        reverse=True,
+    )
+    lines += [bucket_links(years, "by-year")]
+    lines += ["", "## By Tag", ""]
+    lines += [
+        f"- [{escape_markdown(tag)}](tags/{tag_page_name(tag)}.md) ({len(tags[tag])})"
+        for tag in sorted(tags, key=str.casefold)
+    ] or ["No tags yet."]
+    return "\n".join(lines) + "\n"
+
+
+def collect_backlinks(citations: CitationMap, pages_dir: Path) -> Backlinks:
+    """Map each cited reference ID to (note title, link from pages_dir) pairs."""
+    return {
+        ref_id: [
+            (note.title, Path(os.path.relpath(note.path, pages_dir)).as_posix())
+            for note in citations.backlinks(ref_id)
+        ]
+        for ref_id in citations.cited_by
+    }
+
+
+def iter_rendered_shards(
+    shards: list[Path], pages_dir: Path, backlinks: Backlinks, jobs: int = 1
+):
+    """Yield (summaries, write stats) per shard, in shard order."""
+    # Backlinks travel with every task; they cover cited references only
+    render = partial(render_shard_pages, pages_dir=pages_dir, backlinks=backlinks)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(shards) < 2:
+        yield from map(render, shards)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(shards))) as pool:
+        yield from pool.map(render, shards)
+
+
+def generate_pages(
+    refs_dir: Path,
+    pages_dir: Path,
+    jobs: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    citations: CitationMap | None = None,
+) -> tuple[int, WriteStats, list[str]]:
+    """
+    Generate all reference pages.
+
+    Pages produced by an earlier run but not by this one (deleted references,
+    retired tags, shrunken listings) are removed. Returns the number of
+    references, the page write counts and the cited IDs that match no
+    reference.
+    """
+    shards = find_shards(refs_dir) if refs_dir.exists() else []
+    backlinks = collect_backlinks(citations or CitationMap(), pages_dir)
+    refs: list[RefSummary] = []
+    by_tag: dict[str, list[RefSummary]] = {}
+    seen: dict[str, Path] = {}
+    duplicates: set[str] = set()
+    writer = PageWriter(pages_dir)
+
+    for shard, (summaries, shard_stats) in zip(
+        shards, iter_rendered_shards(shards, pages_dir, backlinks, jobs), strict=True
+    ):
+        writer.stats.merge(shard_stats)
+        for summary in summaries:
+            writer.produced.add(f"{page_name(summary.id)}.md")
+            if summary.id in seen:
+                duplicates.add(summary.id)
+                continue
+            seen[summary.id] = shard
+            refs.append(summary)
+            for tag in summary.tags:
+                by_tag.setdefault(tag, []).append(summary)
+
+    # Workers may have written a later duplicate last; the first one wins
+    for ref_id in sorted(duplicates):
+        for _, ref in parse_shard(seen[ref_id]).records:
+            if isinstance(ref, dict) and ref.get("id") == ref_id:
+                page = f"{page_name(ref_id)}.md"
+                writer.write(page, render_reference_page(ref, backlinks))
+                break
+
+    by_title: dict[str, list[RefSummary]] = {}
+    by_year: dict[str, list[RefSummary]] = {}
+    for summary in refs:
+        by_title.setdefault(title_bucket(summary.title), []).append(summary)
+        by_year.setdefault(str(summary.year or "undated"), []).append(summary)
+
+    for tag, tagged in by_tag.items():
+        write_listing(
+            writer, "tags", tag_page_name(tag), f"Tag: {tag}", tagged, page_size
+        )
+    for bucket, bucketed in by_title.items():
+        heading = f"Titles: {bucket.upper() if len(bucket) == 1 else bucket}"
+        write_listing(writer, "by-title", bucket, heading, bucketed, page_size)
+    for year, dated in by_year.items():
+        write_listing(writer, "by-year", year, f"Year: {year}", dated, page_size)
+    index = render_index(refs, by_tag, by_title, by_year)
+    writer.write("index.md", index)
+    # Keep 10^5 reference pages out of the awesome-pages navigation
+    writer.write(".pages", "nav:\n  - index.md\n")
+    writer.remove_stale()
+    return len(refs), writer.stats, sorted(backlinks.keys() - seen.keys())
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Generate reference pages")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render shards in N worker processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        metavar="N",
+        help=f"references per listing page (default: {DEFAULT_PAGE_SIZE})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Main page generation entry point."""
+    args = parse_args(argv)
+    citations, _ = scan_notes(NOTES_DIR, jobs=args.jobs)
+    total, stats, missing = generate_pages(
+        REFS_DIR,
+        PAGES_DIR,
+        jobs=args.jobs,
+        page_size=max(1, args.page_size),
+        citations=citations,
+    )
+    if missing:
+        shown = ", ".join(missing[:10]) + (" ..." if len(missing) > 10 else "")
+        print(f"⚠ Warning: {len(missing)} cited IDs match no reference: {shown}")
+    print(f"✓ Generated pages for {total} references in {PAGES_DIR}/")
+    print(f"  → {stats}")
     return 0
 
 
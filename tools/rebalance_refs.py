@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Reference Shard Rebalancer
+
+Rewrites data/refs/shards into the canonical layout (SPEC §4):
+- Each reference lives in the 00..ff bucket given by a hash of its ID
+- A bucket holds refs.jsonl, or refs-00.jsonl, refs-01.jsonl, ... when it
+  exceeds --max-records (parts are split evenly, so tiny shards merge back)
+- Records are sorted by ID within a bucket; record lines are kept byte-for-byte
+
+The new tree is staged next to the shards directory and swapped in with
+renames, so readers never see a half-written layout. Shards whose content
+does not change are hard-linked into the new tree and keep their mtimes,
+which keeps the incremental caches of the other ref tools warm. Files that
+are not shards (READMEs, .gitkeep, ...) are carried over unchanged.
+
+Usage: python tools/rebalance_refs.py [--check] [--max-records N] [-j N]
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sys
+from pathlib import Path
+
+from refs_io import REFS_DIR, find_shards, iter_shard_results, shard_bucket
+
+DEFAULT_MAX_RECORDS = 5000
+
+
+def plan_layout(
+    shards: list[Path], max_records: int, jobs: int = 1
+) -> dict[Path, bytes]:
+    """
+    Return the canonical layout as relative shard path → file content.
+
+    Raises ValueError with a file:line location if a shard has invalid JSON
+    or a record without a string ID, since such records have no bucket.
+    """
+    buckets: dict[str, list[tuple[str, bytes]]] = {}
+    for shard in iter_shard_results(shards, jobs=jobs):
+        if shard.errors:
+            line_num, error = shard.errors[0]
+            raise ValueError(f"{shard.path}:{line_num} {error}")
+        data = shard.path.read_bytes()
+        for (line_num, ref), (offset, length) in zip(
+            shard.records, shard.spans, strict=True
+        ):
+            ref_id = ref.get("id") if isinstance(ref, dict) else None
+            if not isinstance(ref_id, str):
+                raise ValueError(f"{shard.path}:{line_num} Record has no string 'id'")
+            line = data[offset : offset + length]
+            buckets.setdefault(shard_bucket(ref_id), []).append((ref_id, line))
+
+    layout: dict[Path, bytes] = {}
+    for bucket, records in sorted(buckets.items()):
+        # Stable sort: records sharing an ID keep their corpus order
+        records.sort(key=lambda item: item[0])
+        parts = math.ceil(len(records) / max_records)
+        size = math.ceil(len(records) / parts)
+        for part in range(parts):
+            name = "refs.jsonl" if parts == 1 else f"refs-{part:02d}.jsonl"
+            chunk = records[part * size : (part + 1) * size]
+            layout[Path(bucket) / name] = b"".join(line + b"\n" for _, line in chunk)
+    return layout
+
+
+def changed_paths(layout: dict[Path, bytes], shards: list[Path], refs_dir: Path):
+    """Return (paths to write, paths to remove) relative to refs_dir."""
+    current = {shard.relative_to(refs_dir) for shard in shards}
+    write = sorted(
+        path
+        for path, content in layout.items()
+        if path not in current or (refs_dir / path).read_bytes() != content
+    )
+    remove = sorted(current - layout.keys())
+    return write, remove
+
+
+def other_files(refs_dir: Path) -> list[Path]:
+    """Return the files under refs_dir that are not shards, relative to it."""
+    return sorted(
+        path.relative_to(refs_dir)
+        for path in refs_dir.rglob("*")
+        if path.suffix != ".jsonl" and path.is_file()
+    )
+
+
+def link_or_copy(source: Path, target: Path):
+    """Hard-link source to target, copying it if links are not supported."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def recover(refs_dir: Path):
+    """Finish or roll back a swap interrupted by a crash."""
+    staged = refs_dir.with_name(f".{refs_dir.name}.new")
+    old = refs_dir.with_name(f".{refs_dir.name}.old")
+    if old.exists() and not refs_dir.exists():
+        os.replace(old, refs_dir)
+    shutil.rmtree(staged, ignore_errors=True)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_layout(layout: dict[Path, bytes], refs_dir: Path, changed: list[Path]):
+    """
+    Replace refs_dir with layout, reusing shard files not listed in changed.
+
+    Files in refs_dir that are not shards are carried over into the new tree,
+    so swapping it in only ever replaces shards.
+    """
+    staged = refs_dir.with_name(f".{refs_dir.name}.new")
+    old = refs_dir.with_name(f".{refs_dir.name}.old")
+    changed = set(changed)
+    for path in other_files(refs_dir):
+        link_or_copy(refs_dir / path, staged / path)
+    for path, content in layout.items():
+        target = staged / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if path not in changed:
+            try:
+                os.link(refs_dir / path, target)
+                continue
+            except OSError:
+                pass
+        with open(target, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+    os.replace(refs_dir, old)
+    os.replace(staged, refs_dir)
+    shutil.rmtree(old)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Rehash references into canonical 00..ff shards"
+    )
+    parser.add_argument(
+        "--max-records",
+        type=int,
+        default=DEFAULT_MAX_RECORDS,
+        metavar="N",
+        help=f"split buckets above N records (default: {DEFAULT_MAX_RECORDS})",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report whether the shards are balanced (exit 1 if not)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse shards in N worker processes (0 = one per CPU, default: 1)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Main rebalancing entry point."""
+    args = parse_args(argv)
+    refs_dir = REFS_DIR
+
+    recover(refs_dir)
+    if not refs_dir.exists():
+        print(f"✓ No references to rebalance ({refs_dir} not found)")
+        return 0
+
+    shards = find_shards(refs_dir)
+    try:
+        layout = plan_layout(shards, max(1, args.max_records), args.jobs)
+    except ValueError as e:
+        print(f"✗ Cannot rebalance: {e}", file=sys.stderr)
+        return 1
+
+    write, remove = changed_paths(layout, shards, refs_dir)
+    if not write and not remove:
+        print(f"✓ {len(layout)} shards already balanced")
+        return 0
+
+    if args.check:
+        print(
+            f"✗ Shards need rebalancing: "
+            f"{len(write)} to write, {len(remove)} to remove",
+            file=sys.stderr,
+        )
+        for path in write[:10]:
+            print(f"  write {path}", file=sys.stderr)
+        for path in remove[:10]:
+            print(f"  remove {path}", file=sys.stderr)
+        return 1
+
+    write_layout(layout, refs_dir, write)
+    print(
+        f"✓ Rebalanced into {len(layout)} shards "
+        f"({len(write)} written, {len(remove)} removed)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Per-File Result Cache
+
+Persistent cache of results derived from individual files (notes):
+- A file whose mtime and size are unchanged is reused without reading it
+- Otherwise its content hash decides: same content, same result
+- Entries for files that no longer exist are dropped on save
+- The cache records a hash of the code that produced the results, so
+  changing that code invalidates every entry
+
+Results must be JSON-serializable. Used by refs_citations and
+export_ai_index.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from refs_io import file_digest
+
+
+class FileCache:
+    """Results keyed by file path, validated by mtime/size then content hash."""
+
+    def __init__(self, cache_file: Path | None, generators: Iterable[Path]):
+        self.cache_file = cache_file
+        self.generator = hashlib.sha256(
+            "".join(file_digest(path) for path in generators).encode()
+        ).hexdigest()
+        # path -> [mtime_ns, size, sha256, result]
+        self.entries: dict[str, list] = {}
+
+    def load(self):
+        """Load the cache, discarding it if another generator produced it."""
+        if self.cache_file is None:
+            return
+        try:
+            cache = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if cache.get("generator") == self.generator:
+            self.entries = cache.get("files", {})
+
+    def stale(self, paths: Iterable[Path]) -> list[Path]:
+        """Return the paths whose cached result is missing or out of date."""
+        stale = []
+        for path in paths:
+            stat = path.stat()
+            entry = self.entries.get(str(path))
+            if entry and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+                continue
+            digest = file_digest(path)
+            if entry and entry[2] == digest:
+                entry[:2] = [stat.st_mtime_ns, stat.st_size]
+                continue
+            self.entries[str(path)] = [stat.st_mtime_ns, stat.st_size, digest, None]
+            stale.append(path)
+        return stale
+
+    def __getitem__(self, path: Path) -> Any:
+        return self.entries[str(path)][3]
+
+    def __setitem__(self, path: Path, result: Any):
+        self.entries[str(path)][3] = result
+
+    def save(self, paths: Iterable[Path]):
+        """Write the cache for the given paths, dropping entries for other files."""
+        live = {str(path) for path in paths}
+        self.entries = {k: v for k, v in self.entries.items() if k in live}
+        if self.cache_file is None:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache = {"generator": self.generator, "files": self.entries}
+        self.cache_file.write_text(json.dumps(cache), encoding="utf-8")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Citation Scanner
+
+Finds Pandoc-style citations ([@id], [see @a; @b, p. 3]) in the notes:
+- One compiled regex pass per note; code spans and fenced code are skipped
+- Notes are scanned in a process pool
+- Per-note results are cached in .cache/citations.json, keyed on mtime/size
+  and then content hash, so unchanged notes are never re-read
+- Produces the note → references and reference → notes maps used by
+  mkdocs_pages (backlinks) and export_ai_index (citations/cited_by)
+- Owns the note ID rule (note_id_for) shared by every tool that names notes
+
+Usage: python tools/refs_citations.py [-j N] [--no-cache]
+"""
+
+import argparse
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from refs_cache import FileCache
+from refs_io import resolve_jobs
+
+NOTES_DIR = Path("docs/notes")
+CACHE_FILE = Path(".cache/citations.json")
+
+# Code first, so citation-like text inside code is consumed without a match.
+# A citation group is a bracketed span on one line containing @key; keys
+# follow Pandoc: a word character, then word characters and internal
+# punctuation, never ending in punctuation.
+CITATION = re.compile(
+    r"(?P<fence>^(?P<ticks>`{3,}|~{3,})[^\n]*\n.*?(?:^(?P=ticks)[^\n]*$|\Z))"
+    r"|(?P<code>`+)[^`]*?(?P=code)"
+    r"|\[(?P<group>[^\[\]\n]*?(?<![\w.])-?@[^\[\]\n]*)\]",
+    re.MULTILINE | re.DOTALL,
+)
+CITATION_KEY = re.compile(r"(?<![\w.])-?@(\w(?:[\w:.#$%&+?<>~/-]*\w)?)")
+
+FRONT_MATTER = re.compile(r"\A---\n(.*?)\n---\n", re.DOTALL)
+FRONT_MATTER_FIELD = re.compile(r"^(id|title):[ \t]*(.*?)[ \t]*$", re.MULTILINE)
+HEADING = re.compile(r"^#[ \t]+(.+?)[ \t]*#*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class NoteCitations:
+    """The citations of one note, in order of first appearance."""
+
+    path: Path
+    note_id: str
+    title: str
+    citations: tuple[str, ...]
+
+
+@dataclass
+class CitationMap:
+    """Bidirectional note ↔ reference citation map."""
+
+    notes: dict[str, NoteCitations] = field(default_factory=dict)
+    cited_by: dict[str, list[str]] = field(default_factory=dict)
+
+    def citations(self, note_id: str) -> tuple[str, ...]:
+        note = self.notes.get(note_id)
+        return note.citations if note else ()
+
+    def backlinks(self, ref_id: str) -> list[NoteCitations]:
+        """Return the notes citing ref_id, sorted by note ID."""
+        return [self.notes[note_id] for note_id in self.cited_by.get(ref_id, ())]
+
+
+def unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def scan_text(text: str) -> list[str]:
+    """Return the citation keys in text, deduplicated in order of appearance."""
+    keys: dict[str, None] = {}
+    for match in CITATION.finditer(text):
+        group = match.group("group")
+        if group is not None:
+            keys.update(dict.fromkeys(CITATION_KEY.findall(group)))
+    return list(keys)
+
+
+def note_id_for(front_matter_id: object, path: Path, docs_dir: Path) -> str:
+    """
+    Return a note's ID: its front matter id, falling back to its path under
+    docs_dir without the suffix (blog posts have no id: notes/blog/posts/x).
+    """
+    return str(front_matter_id or path.relative_to(docs_dir).with_suffix("").as_posix())
+
+
+def scan_note(path: Path, notes_dir: Path) -> tuple[str, str, list[str]]:
+    """
+    Return (note ID, title, citation keys) of one note.
+
+    notes_dir is the notes folder of the docs dir (docs/notes); IDs are
+    relative to the docs dir, as in every other note export.
+    """
+    text = path.read_text(encoding="utf-8").replace("\r\n", "\n")
+    fields = {}
+    front_matter = FRONT_MATTER.match(text)
+    if front_matter:
+        for name, value in FRONT_MATTER_FIELD.findall(front_matter.group(1)):
+            fields.setdefault(name, unquote(value))
+        body = text[front_matter.end() :]
+    else:
+        body = text
+    note_id = note_id_for(fields.get("id"), path, notes_dir.parent)
+    title = fields.get("title")
+    if not title:
+        heading = HEADING.search(body)
+        title = heading.group(1) if heading else note_id
+    return note_id, title, scan_text(body)
+
+
+def iter_scans(notes: list[Path], notes_dir: Path, jobs: int = 1):
+    """Yield scan_note() results in input order, in a process pool if jobs > 1."""
+    scan = partial(scan_note, notes_dir=notes_dir)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(notes) < 2:
+        yield from map(scan, notes)
+        return
+    chunksize = max(1, len(notes) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=min(jobs, len(notes))) as pool:
+        yield from pool.map(scan, notes, chunksize=chunksize)
+
+
+def scan_notes(
+    notes_dir: Path = NOTES_DIR,
+    jobs: int = 1,
+    cache_file: Path | None = CACHE_FILE,
+) -> tuple[CitationMap, int]:
+    """
+    Scan every note under notes_dir; return the citation map and the number
+    of notes actually scanned (the rest came from the cache).
+
+    With cache_file=None nothing is read from or written to the cache.
+    """
+    notes = sorted(notes_dir.rglob("*.md")) if notes_dir.exists() else []
+    cache = FileCache(cache_file, [Path(__file__)])
+    cache.load()
+    stale = cache.stale(notes)
+    for note, result in zip(stale, iter_scans(stale, notes_dir, jobs), strict=True):
+        cache[note] = list(result)
+    cache.save(notes)
+
+    citation_map = CitationMap()
+    for note in notes:
+        note_id, title, keys = cache[note]
+        if note_id in citation_map.notes:
+            continue  # duplicate note IDs are check_front_matter's concern
+        citation_map.notes[note_id] = NoteCitations(note, note_id, title, tuple(keys))
+        for key in keys:
+            citation_map.cited_by.setdefault(key, []).append(note_id)
+    for note_ids in citation_map.cited_by.values():
+        note_ids.sort()
+    return citation_map, len(stale)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Scan notes for [@id] citations")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="scan notes in N worker processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"ignore and rebuild the scan cache in {CACHE_FILE}",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Scan the notes and summarize their citations."""
+    args = parse_args(argv)
+    if args.no_cache:
+        CACHE_FILE.unlink(missing_ok=True)
+    citation_map, scanned = scan_notes(NOTES_DIR, jobs=args.jobs)
+
+    total = sum(len(note.citations) for note in citation_map.notes.values())
+    print(
+        f"✓ Found {total} citations of {len(citation_map.cited_by)} references "
+        f"in {len(citation_map.notes)} notes"
+    )
+    print(f"  → {scanned} notes scanned, the rest cached in {CACHE_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
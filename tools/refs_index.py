@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Reference Lookup Index
+
+Inverted indexes over the compiled reference store:
+- tag → ids, year → ids, author → ids, normalized URL → ids
+- id → shard location
+
+Index rows are written by refs_store whenever a shard is (re)loaded, so
+queries never rescan the corpus.
+
+Usage: python tools/refs_index.py [--id ID | --tag TAG | --year YEAR | --author NAME |
+                                   --url URL]
+"""
+
+import argparse
+import sys
+
+from refs_io import normalize_url
+from refs_store import ReferenceStore, open_store
+
+
+class ReferenceIndex:
+    """Query API over the inverted indexes of a ReferenceStore."""
+
+    def __init__(self, store: ReferenceStore):
+        self.conn = store.conn
+
+    def _ids(self, table: str, column: str, value) -> list[str]:
+        rows = self.conn.execute(
+            f"SELECT id FROM {table} WHERE {column} = ? ORDER BY shard, line",  # noqa: S608
+            (value,),
+        )
+        return list(dict.fromkeys(ref_id for (ref_id,) in rows))
+
+    def locate(self, ref_id: str) -> tuple[str, int] | None:
+        """Return (shard path, line number) of a reference, or None."""
+        return self.conn.execute(
+            "SELECT shard, line FROM refs WHERE id = ? ORDER BY shard, line LIMIT 1",
+            (ref_id,),
+        ).fetchone()
+
+    def by_tag(self, tag: str) -> list[str]:
+        """IDs of references carrying tag, in corpus order."""
+        return self._ids("ref_tags", "tag", tag)
+
+    def by_year(self, year: int) -> list[str]:
+        """IDs of references published in year, in corpus order."""
+        return self._ids("ref_years", "year", year)
+
+    def by_author(self, author: str) -> list[str]:
+        """IDs of references listing author (exact name, case-insensitive)."""
+        return self._ids("ref_authors", "author", author)
+
+    def by_url(self, url: str) -> list[str]:
+        """IDs of references whose URL normalizes to the same key as url."""
+        return self._ids("ref_urls", "url", normalize_url(url))
+
+    def tag_counts(self) -> dict[str, int]:
+        """Number of references per tag, sorted by tag."""
+        rows = self.conn.execute(
+            "SELECT tag, COUNT(DISTINCT id) FROM ref_tags GROUP BY tag ORDER BY tag"
+        )
+        return dict(rows.fetchall())
+
+    def year_counts(self) -> dict[int, int]:
+        """Number of references per year, sorted by year."""
+        rows = self.conn.execute(
+            "SELECT year, COUNT(DISTINCT id) FROM ref_years GROUP BY year ORDER BY year"
+        )
+        return dict(rows.fetchall())
+
+
+def main(argv: list[str] | None = None):
+    """Query the reference index from the command line."""
+    parser = argparse.ArgumentParser(description="Query the reference index")
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument("--id", help="print the shard location of a reference")
+    query.add_argument("--tag", help="list references with a tag")
+    query.add_argument("--year", type=int, help="list references from a year")
+    query.add_argument("--author", help="list references by an author")
+    query.add_argument("--url", help="list references with an equivalent URL")
+    query.add_argument("--tags", action="store_true", help="list tags with counts")
+    args = parser.parse_args(argv)
+
+    with open_store() as store:
+        index = ReferenceIndex(store)
+        if args.id:
+            location = index.locate(args.id)
+            if location is None:
+                print(f"✗ Unknown reference: {args.id}", file=sys.stderr)
+                return 1
+            print(f"{location[0]}:{location[1]}")
+        elif args.tags:
+            for tag, count in index.tag_counts().items():
+                print(f"{tag}\t{count}")
+        else:
+            if args.tag:
+                ids = index.by_tag(args.tag)
+            elif args.year is not None:
+                ids = index.by_year(args.year)
+            elif args.url:
+                ids = index.by_url(args.url)
+            else:
+                ids = index.by_author(args.author)
+            print("\n".join(ids))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Reference Shard Reader
+
+Shared shard discovery and parsing for the reference tools:
+- Deterministic shard ordering (sorted by path)
+- Serial or process-pool parsing of JSONL shards (decoded by refs_json)
+- Per-line records and errors for file:line reporting
+- Byte spans of each record for copying it verbatim (see rebalance_refs)
+- Canonical 00..ff bucket of a reference ID (see rebalance_refs)
+- URL comparison keys shared by dedup_refs, refs_store and import_refs
+"""
+
+import hashlib
+import os
+import re
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from refs_json import DECODE_ERRORS, loads
+
+REFS_DIR = Path("data/refs/shards")
+
+# Query parameters that only track where a link was shared from. Only
+# vendor-specific names: generic ones like ref or si also select content
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_hsenc",
+    "_hsmi",
+    "ref_src",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# scheme://[userinfo@]host[:port]path[?query][#fragment], http(s) only
+WEB_URL = re.compile(
+    r"https?://(?:[^@/?#]*@)?(?P<host>\[[^\]]*\]|[^/?#:]*)(?::(?P<port>\d*))?"
+    r"(?P<path>[^?#]*)(?:\?(?P<query>[^#]*))?",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ShardResult:
+    """
+    Parsed contents of a single shard file.
+
+    spans[i] is the (byte offset, byte length) of records[i] in the file.
+    """
+
+    path: Path
+    records: list[tuple[int, dict]] = field(default_factory=list)
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    spans: list[tuple[int, int]] = field(default_factory=list)
+
+
+def find_shards(refs_dir: Path) -> list[Path]:
+    """Return all shard files under refs_dir in stable path order."""
+    return sorted(refs_dir.rglob("*.jsonl"))
+
+
+def shard_bucket(ref_id: str) -> str:
+    """Return the canonical shard directory (00..ff) for a reference ID."""
+    return hashlib.sha256(ref_id.encode("utf-8")).hexdigest()[:2]
+
+
+def is_tracking(name: str) -> bool:
+    """Return True for a (lowercased) query parameter that only tracks clicks."""
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Return a comparison key for url.
+
+    http and https are treated as the same resource, so web URLs are keyed
+    without their scheme; other schemes (doi:, mailto:, ...) keep it.
+    """
+    url = url.strip()
+    match = WEB_URL.match(url)
+    if match is None or not match["host"]:
+        return url.split("#", 1)[0]
+
+    host = match["host"].lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = match["port"]
+    if port and int(port) not in DEFAULT_PORTS.values():
+        host = f"{host}:{int(port)}"
+
+    key = host + match["path"].rstrip("/")
+    if match["query"]:
+        query = sorted(
+            param
+            for param in match["query"].split("&")
+            if param and not is_tracking(param.split("=", 1)[0].lower())
+        )
+        if query:
+            key += "?" + "&".join(query)
+    return key
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def parse_shard(path: Path) -> ShardResult:
+    """Parse one shard into (line_num, record) pairs and (line_num, error) pairs."""
+    result = ShardResult(path)
+    with open(path, "rb") as f:
+        offset = 0
+        for line_num, raw in enumerate(f, 1):
+            start, offset = offset, offset + len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+
+            try:
+                ref = loads(line)
+            except DECODE_ERRORS as e:
+                result.errors.append((line_num, f"Invalid JSON: {e}"))
+                continue
+            result.records.append((line_num, ref))
+            result.spans.append((start, len(raw.rstrip())))
+
+    return result
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Map a --jobs value to a worker count (0 means one per CPU)."""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def iter_shard_results(shards: list[Path], jobs: int = 1) -> Iterator[ShardResult]:
+    """
+    Yield parsed shards in the order given.
+
+    With jobs > 1 shards are parsed in a process pool; results are still
+    yielded in input order, so output is identical to the serial path. At
+    most 2 * jobs shards are in flight, so a slow consumer never causes the
+    whole corpus to pile up in memory.
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(shards) < 2:
+        for shard in shards:
+            yield parse_shard(shard)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(shards))) as pool:
+        pending = deque()
+        try:
+            for shard in shards:
+                pending.append(pool.submit(parse_shard, shard))
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # A consumer that stops early should not wait for unused shards
+            for future in pending:
+                future.cancel()
+
+
+def iter_records(shards: list[Path], jobs: int = 1) -> Iterator[dict]:
+    """
+    Yield reference records one at a time in shard and line order.
+
+    Raises ValueError with a file:line location on the first invalid line.
+    """
+    for shard in iter_shard_results(shards, jobs=jobs):
+        if shard.errors:
+            line_num, error = shard.errors[0]
+            raise ValueError(f"{shard.path}:{line_num} {error}")
+        for _, ref in shard.records:
+            yield ref
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Reference JSON Decoding
+
+Single JSON loader for reference records, shared by every tool that parses
+shards (through refs_io.parse_shard):
+- msgspec or orjson when installed (decode straight from bytes)
+- stdlib json fallback, so the tools keep working with no extra packages
+
+Set REFS_JSON_BACKEND=json|orjson|msgspec to force a backend.
+"""
+
+import json
+import os
+from collections.abc import Callable
+from typing import Any
+
+
+def _msgspec_backend() -> tuple[Callable[[bytes], Any], tuple[type[Exception], ...]]:
+    import msgspec
+
+    return msgspec.json.Decoder().decode, (msgspec.DecodeError,)
+
+
+def _orjson_backend() -> tuple[Callable[[bytes], Any], tuple[type[Exception], ...]]:
+    import orjson
+
+    return orjson.loads, (orjson.JSONDecodeError,)
+
+
+def _json_backend() -> tuple[Callable[[bytes], Any], tuple[type[Exception], ...]]:
+    return json.loads, (json.JSONDecodeError, UnicodeDecodeError)
+
+
+BACKENDS = {
+    "msgspec": _msgspec_backend,
+    "orjson": _orjson_backend,
+    "json": _json_backend,
+}
+
+
+def select_backend(name: str | None = None):
+    """
+    Return (name, loads, decode_errors) for the requested or fastest backend.
+
+    Without a name, msgspec, orjson and json are tried in that order. An
+    unknown name raises ValueError; a known one that is not installed raises
+    ImportError.
+    """
+    if name and name not in BACKENDS:
+        valid = ", ".join(BACKENDS)
+        raise ValueError(f"Unknown JSON backend {name!r} (expected one of: {valid})")
+    for candidate in [name] if name else list(BACKENDS):
+        try:
+            loads, errors = BACKENDS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        return candidate, loads, errors
+    raise AssertionError("stdlib json backend is always available")
+
+
+BACKEND, loads, DECODE_ERRORS = select_backend(os.environ.get("REFS_JSON_BACKEND"))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Note and Site Reader
+
+Shared note discovery and parsing for the site exporters (export_ai_index,
+export_chunks and search_index):
+- Hand-written notes under docs/, with the generated reference pages pruned
+- Front matter parsing (PyYAML when installed, otherwise a small parser)
+- The fenced code block pattern prose statistics skip
+- Site index reference entries streamed from the shards
+- Reproducible `generated` timestamps and NDJSON lines for the outputs
+"""
+
+import json
+import os
+import re
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+
+from refs_citations import FRONT_MATTER
+from refs_io import iter_shard_results
+
+try:
+    import yaml
+
+    # libyaml's loader is several times faster; both are safe loaders
+    YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:  # pragma: no cover - depends on the environment
+    yaml = None
+
+DOCS_DIR = Path("docs")
+PAGES_DIR = Path("docs/references")
+
+# Reference fields exported as-is, in schema order (cited_by is added)
+REFERENCE_FIELDS = (
+    "id",
+    "type",
+    "title",
+    "url",
+    "authors",
+    "year",
+    "tags",
+    "accessed",
+    "archived_url",
+)
+
+FENCE = re.compile(r"^(`{3,}|~{3,}).*?(?:^\1[^\n]*$|\Z)", re.MULTILINE | re.DOTALL)
+
+
+def parse_front_matter(text: str) -> tuple[dict, str]:
+    """Split a note into (front matter fields, body)."""
+    match = FRONT_MATTER.match(text)
+    if not match:
+        return {}, text
+    body = text[match.end() :]
+    if yaml is not None:
+        try:
+            fields = yaml.load(match.group(1), Loader=YAML_LOADER)  # noqa: S506
+        except yaml.YAMLError:
+            fields = None
+        return (fields if isinstance(fields, dict) else {}), body
+
+    # Fallback: `key: value`, `key: [a, b]` and block lists of `- item`
+    fields: dict = {}
+    key = None
+    for line in match.group(1).splitlines():
+        if key and line.lstrip().startswith("- "):
+            fields.setdefault(key, []).append(line.lstrip()[2:].strip().strip("'\""))
+            continue
+        name, sep, value = line.partition(":")
+        if not sep or line[:1].isspace():
+            continue
+        key, value = name.strip(), value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            fields[key] = [v.strip().strip("'\"") for v in value[1:-1].split(",")]
+        elif value:
+            fields[key] = value.strip("'\"")
+    return fields, body
+
+
+def find_notes(docs_dir: Path) -> list[Path]:
+    """
+    Return the hand-written Markdown files under docs_dir, in path order.
+
+    The generated reference pages are pruned from the walk rather than
+    filtered out, since there is one per reference.
+    """
+    pages_dir = docs_dir / PAGES_DIR.relative_to(DOCS_DIR)
+    notes = []
+    for root, dirs, files in os.walk(docs_dir):
+        dirs[:] = [d for d in dirs if Path(root, d) != pages_dir]
+        notes.extend(Path(root, name) for name in files if name.endswith(".md"))
+    return sorted(notes)
+
+
+def iter_references(
+    shards: list[Path], cited_by: dict[str, list[str]], jobs: int = 1
+) -> Iterator[dict]:
+    """
+    Yield site index entries for every reference, in shard and line order.
+
+    Invalid lines are skipped (validate_refs reports them); for duplicate
+    IDs the first record wins, as in the reference store.
+    """
+    seen: set[str] = set()
+    for shard in iter_shard_results(shards, jobs=jobs):
+        for _, ref in shard.records:
+            ref_id = ref.get("id") if isinstance(ref, dict) else None
+            if not isinstance(ref_id, str) or ref_id in seen:
+                continue
+            seen.add(ref_id)
+            entry = {name: ref[name] for name in REFERENCE_FIELDS if name in ref}
+            if ref_id in cited_by:
+                entry["cited_by"] = cited_by[ref_id]
+            yield entry
+
+
+def generated_timestamp(inputs: list[Path]) -> str:
+    """Return SOURCE_DATE_EPOCH, or the newest input mtime, as ISO 8601 UTC."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch and epoch.isdigit():
+        seconds = int(epoch)
+    else:
+        seconds = max((int(path.stat().st_mtime) for path in inputs), default=0)
+    return datetime.fromtimestamp(seconds, UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def ndjson_line(item: dict) -> str:
+    return json.dumps(item, ensure_ascii=False) + "\n"
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Generated Output Writer
+
+Atomic, write-if-changed output shared by the generators:
+- Content is compared with what is on disk; identical files are left alone,
+  so their mtimes (and MkDocs/Quarto/Pages caches) stay valid
+- Changed files are written to a temp file and renamed into place, so
+  readers never see a partial file
+- WriteStats counts written vs unchanged files for the summary line
+
+write_if_changed() suits content built in memory; OutputFile streams large
+outputs (build_refs' emitters) and hashes them as they are written.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class WriteStats:
+    """Counts of output files written, left unchanged and removed."""
+
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def record(self, changed: bool):
+        if changed:
+            self.written += 1
+        else:
+            self.unchanged += 1
+
+    def merge(self, other: "WriteStats"):
+        self.written += other.written
+        self.unchanged += other.unchanged
+        self.removed += other.removed
+
+    def __str__(self) -> str:
+        text = f"{self.written} written, {self.unchanged} unchanged"
+        return f"{text}, {self.removed} removed" if self.removed else text
+
+
+def file_sha256(path: Path) -> str | None:
+    """Return the SHA-256 hex digest of a file, or None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _temp_file(path: Path):
+    """Create a new temp file next to path, with the permissions open() gives."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        temp = path.with_name(f".{path.name}.{os.urandom(4).hex()}.tmp")
+        try:
+            # Unlike tempfile (0600), mode "x" creates the file 0666 minus the
+            # umask, which the kernel applies; the umask is never read or set
+            return open(temp, "xb")
+        except FileExistsError:
+            continue
+
+
+def write_if_changed(path: Path, content: str | bytes) -> bool:
+    """Atomically write content to path unless it already holds it; True if written."""
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    with _temp_file(path) as f:
+        f.write(data)
+    os.replace(f.name, path)
+    return True
+
+
+class OutputFile:
+    """
+    Text file that is written to a temp file and only replaces path on
+    commit() if its content differs.
+
+    Used as a context manager, the file is committed on success and discarded
+    if the block raises; `changed` then tells whether path was replaced.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.changed = False
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._f = _temp_file(path)
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self._hash.update(data)
+        self._f.write(data)
+        self.size += len(data)
+
+    def hexdigest(self) -> str:
+        """SHA-256 of everything written so far."""
+        return self._hash.hexdigest()
+
+    def commit(self) -> bool:
+        """Close the temp file and move it into place if the content changed."""
+        self._f.close()
+        if file_sha256(self.path) == self.hexdigest():
+            os.unlink(self._f.name)
+        else:
+            os.replace(self._f.name, self.path)
+            self.changed = True
+        return self.changed
+
+    def discard(self):
+        self._f.close()
+        os.unlink(self._f.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Validation Reporters
+
+Streaming output for validation findings:
+- Findings are written as they are found, never collected into a list
+- Text summary on stderr (first few findings plus a count)
+- JSON Lines for scripts, SARIF 2.1.0 for CI code-scanning annotations
+
+Each format is a Reporter subclass; validate_refs feeds every finding to all
+active reporters in a single pass.
+"""
+
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+
+@dataclass(frozen=True)
+class Finding:
+    """One problem at a file:line location; rule is a stable identifier."""
+
+    path: Path
+    line: int
+    rule: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line} {self.message}"
+
+
+class Reporter:
+    """
+    Base class for finding output formats.
+
+    Subclasses implement report(); formats with framing also override
+    open()/close(). An output path of "-" means stdout.
+    """
+
+    name = ""
+
+    def __init__(self, output: Path | str = "-"):
+        self.output = output
+        self.count = 0
+        self._f = None
+
+    def open(self):
+        if str(self.output) == "-":
+            self._f = sys.stdout
+        else:
+            Path(self.output).parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.output, "w", encoding="utf-8")
+        self.count = 0
+
+    def report(self, finding: Finding):
+        raise NotImplementedError
+
+    def close(self):
+        if self._f is not sys.stdout:
+            self._f.close()
+        else:
+            self._f.flush()
+        self._f = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TextReporter(Reporter):
+    """Human-readable list on stderr, truncated after the first `shown` findings."""
+
+    name = "text"
+
+    def __init__(self, shown: int = 10):
+        super().__init__()
+        self.shown = shown
+
+    def open(self):
+        self._f = sys.stderr
+        self.count = 0
+
+    def report(self, finding: Finding):
+        if self.count == 0:
+            print("✗ Validation errors:", file=self._f)
+        if self.count < self.shown:
+            print(f"  {finding}", file=self._f)
+        self.count += 1
+
+    def close(self):
+        if self.count > self.shown:
+            print(f"  ... and {self.count - self.shown} more errors", file=self._f)
+        self._f = None
+
+
+class JsonLinesReporter(Reporter):
+    """One JSON object per finding: {"path", "line", "rule", "message"}."""
+
+    name = "jsonl"
+
+    def report(self, finding: Finding):
+        record = {
+            "path": finding.path.as_posix(),
+            "line": finding.line,
+            "rule": finding.rule,
+            "message": finding.message,
+        }
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+
+class SarifReporter(Reporter):
+    """
+    SARIF 2.1.0 log with a single run.
+
+    The log is framed by hand so results stream straight to the file; rules
+    maps each rule id to its one-line description.
+    """
+
+    name = "sarif"
+
+    def __init__(self, output: Path | str, tool: str, rules: dict[str, str]):
+        super().__init__(output)
+        self.tool = tool
+        self.rules = rules
+
+    def open(self):
+        super().open()
+        driver = {
+            "name": self.tool,
+            "rules": [
+                {"id": rule, "shortDescription": {"text": text}}
+                for rule, text in self.rules.items()
+            ],
+        }
+        header = json.dumps({"version": "2.1.0", "$schema": SARIF_SCHEMA})[:-1]
+        run = json.dumps({"tool": {"driver": driver}})[:-1]
+        self._f.write(f'{header}, "runs": [{run}, "results": [')
+
+    def report(self, finding: Finding):
+        result = {
+            "ruleId": finding.rule,
+            "level": "error",
+            "message": {"text": finding.message},
+            "locations": [
+                {
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": finding.path.as_posix()},
+                        "region": {"startLine": finding.line},
+                    }
+                }
+            ],
+        }
+        self._f.write((",\n" if self.count else "\n") + json.dumps(result))
+        self.count += 1
+
+    def close(self):
+        self._f.write("\n]}]}\n")
+        super().close()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Compiled JSON Schema Checks
+
+Compiles a JSON Schema (the draft-07 subset used by ai/site-index.schema.json)
+once, so validating a record does no schema interpretation:
+- a generated Python predicate answers "is this record valid?" fast
+- only records that fail it go through closures that collect every violation
+
+Supported keywords:
+- type, enum, required, properties, items, pattern
+- format: uri, date, date-time
+- $ref to local definitions (#/$defs/...)
+
+Unsupported keywords raise ValueError at compile time rather than being
+silently ignored.
+"""
+
+import json
+import re
+from collections.abc import Callable
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+SCHEMA_FILE = Path("ai/site-index.schema.json")
+
+# A check appends human-readable violations for value (at path) to errors
+Check = Callable[[Any, str, list[str]], None]
+
+# Keywords that only annotate a schema and never affect validation
+ANNOTATIONS = {
+    "$schema",
+    "$id",
+    "$comment",
+    "title",
+    "description",
+    "default",
+    "examples",
+}
+
+FORMATS = {
+    "uri": re.compile(r"^[A-Za-z][A-Za-z0-9+.\-]*:[^\s]+$"),
+    "date": re.compile(r"^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$"),
+    "date-time": re.compile(
+        r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:\d{2})$"
+    ),
+}
+
+
+def _type_test(name: str) -> Callable[[Any], bool]:
+    if name == "object":
+        return lambda v: type(v) is dict
+    if name == "array":
+        return lambda v: type(v) is list
+    if name == "string":
+        return lambda v: type(v) is str
+    if name == "integer":
+        return lambda v: type(v) is int or (type(v) is float and v.is_integer())
+    if name == "number":
+        return lambda v: type(v) in (int, float)
+    if name == "boolean":
+        return lambda v: type(v) is bool
+    if name == "null":
+        return lambda v: v is None
+    raise ValueError(f"Unsupported JSON Schema type: {name}")
+
+
+def _json_type(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+def _field(path: str) -> str:
+    return f"Field '{path}'" if path else "Record"
+
+
+def compile_schema(schema: dict, root: dict | None = None) -> Check:
+    """Compile schema (resolving $ref against root) into a single check."""
+    root = schema if root is None else root
+    if "$ref" in schema:
+        ref = schema["$ref"]
+        if not ref.startswith("#/"):
+            raise ValueError(f"Only local $ref is supported: {ref}")
+        target = root
+        for part in ref[2:].split("/"):
+            target = target[part]
+        return compile_schema(target, root)
+
+    unknown = (
+        set(schema)
+        - ANNOTATIONS
+        - {
+            "type",
+            "enum",
+            "required",
+            "properties",
+            "items",
+            "pattern",
+            "format",
+            "$defs",
+        }
+    )
+    if unknown:
+        raise ValueError(
+            f"Unsupported JSON Schema keywords: {', '.join(sorted(unknown))}"
+        )
+
+    checks: list[Check] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        tests = [_type_test(name) for name in names]
+        expected = " or ".join(names)
+
+        def check_type(value, path, errors):
+            if not any(test(value) for test in tests):
+                errors.append(
+                    f"{_field(path)}: expected {expected}, got {_json_type(value)}"
+                )
+                return False
+            return True
+
+        # A value of the wrong type skips the remaining checks for it
+        type_check = check_type
+    else:
+        type_check = None
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+        allowed_text = ", ".join(json.dumps(v) for v in allowed)
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(
+                    f"{_field(path)}: {json.dumps(value)} is not one of {allowed_text}"
+                )
+
+        checks.append(check_enum)
+
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value, path, errors):
+            if type(value) is str and not pattern.search(value):
+                errors.append(
+                    f"{_field(path)}: does not match pattern {pattern.pattern}"
+                )
+
+        checks.append(check_pattern)
+
+    if "format" in schema:
+        fmt = schema["format"]
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported JSON Schema format: {fmt}")
+        format_re = FORMATS[fmt]
+
+        def check_format(value, path, errors):
+            if type(value) is str and not format_re.match(value):
+                errors.append(f"{_field(path)}: {value!r} is not a valid {fmt}")
+
+        checks.append(check_format)
+
+    if "required" in schema:
+        required = tuple(schema["required"])
+
+        def check_required(value, path, errors):
+            if type(value) is dict:
+                for name in required:
+                    if name not in value:
+                        where = f" in '{path}'" if path else ""
+                        errors.append(f"Missing required field '{name}'{where}")
+
+        checks.append(check_required)
+
+    if "properties" in schema:
+        properties = {
+            name: compile_schema(subschema, root)
+            for name, subschema in schema["properties"].items()
+        }
+
+        def check_properties(value, path, errors):
+            if type(value) is dict:
+                for name, item in value.items():
+                    check = properties.get(name)
+                    if check is not None:
+                        check(item, f"{path}.{name}" if path else name, errors)
+
+        checks.append(check_properties)
+
+    if "items" in schema:
+        item_check = compile_schema(schema["items"], root)
+
+        def check_items(value, path, errors):
+            if type(value) is list:
+                for i, item in enumerate(value):
+                    item_check(item, f"{path}[{i}]", errors)
+
+        checks.append(check_items)
+
+    def check(value, path, errors):
+        if type_check is not None and not type_check(value, path, errors):
+            return
+        for sub in checks:
+            sub(value, path, errors)
+
+    return check
+
+
+TYPE_CONDITIONS = {
+    "object": "type({v}) is dict",
+    "array": "type({v}) is list",
+    "string": "type({v}) is str",
+    "integer": "(type({v}) is int or (type({v}) is float and {v}.is_integer()))",
+    "number": "type({v}) in (int, float)",
+    "boolean": "type({v}) is bool",
+    "null": "{v} is None",
+}
+
+
+class _PredicateBuilder:
+    """Generates the source of a boolean is_valid(value) function for a schema."""
+
+    def __init__(self, root: dict):
+        self.root = root
+        self.lines = ["def is_valid(v0):"]
+        self.namespace: dict[str, Any] = {"_MISSING": object()}
+        self.counter = 0
+
+    def name(self, prefix: str, value: Any = None) -> str:
+        self.counter += 1
+        name = f"{prefix}{self.counter}"
+        if value is not None:
+            self.namespace[name] = value
+        return name
+
+    def emit(self, schema: dict, var: str, depth: int):
+        pad = "    " * depth
+        out = self.lines.append
+        while "$ref" in schema:
+            target = self.root
+            for part in schema["$ref"][2:].split("/"):
+                target = target[part]
+            schema = target
+
+        types = schema.get("type")
+        if types is not None:
+            types = types if isinstance(types, list) else [types]
+            cond = " or ".join(TYPE_CONDITIONS[t].format(v=var) for t in types)
+            out(f"{pad}if not ({cond}): return False")
+        is_dict = types == ["object"]
+        is_list = types == ["array"]
+        is_str = types == ["string"]
+
+        if "enum" in schema:
+            allowed = self.name("ENUM", tuple(schema["enum"]))
+            out(f"{pad}if {var} not in {allowed}: return False")
+
+        guard = "" if is_str else f"type({var}) is str and "
+        if "pattern" in schema:
+            regex = self.name("RE", re.compile(schema["pattern"]))
+            out(f"{pad}if {guard}not {regex}.search({var}): return False")
+        if "format" in schema:
+            regex = self.name("RE", FORMATS[schema["format"]])
+            out(f"{pad}if {guard}not {regex}.match({var}): return False")
+
+        if "required" in schema or "properties" in schema:
+            if not is_dict:
+                out(f"{pad}if type({var}) is dict:")
+                pad, depth = pad + "    ", depth + 1
+            if schema.get("required"):
+                required = self.name("REQ", frozenset(schema["required"]))
+                out(f"{pad}if not {required} <= {var}.keys(): return False")
+            for prop, subschema in schema.get("properties", {}).items():
+                item = self.name("x")
+                out(f"{pad}{item} = {var}.get({prop!r}, _MISSING)")
+                out(f"{pad}if {item} is not _MISSING:")
+                start = len(self.lines)
+                self.emit(subschema, item, depth + 1)
+                if len(self.lines) == start:
+                    out(f"{pad}    pass")
+            if not is_dict:
+                pad, depth = pad[:-4], depth - 1
+
+        if "items" in schema:
+            item = self.name("i")
+            if not is_list:
+                out(f"{pad}if type({var}) is list:")
+                pad, depth = pad + "    ", depth + 1
+            out(f"{pad}for {item} in {var}:")
+            start = len(self.lines)
+            self.emit(schema["items"], item, depth + 1)
+            if len(self.lines) == start:
+                out(f"{pad}    pass")
+
+    def build(self, schema: dict) -> Callable[[Any], bool]:
+        self.emit(schema, "v0", 1)
+        self.lines.append("    return True")
+        exec("\n".join(self.lines), self.namespace)  # noqa: S102
+        return self.namespace["is_valid"]
+
+
+def compile_predicate(schema: dict, root: dict | None = None) -> Callable[[Any], bool]:
+    """Compile schema into generated code returning True for valid values."""
+    compile_schema(schema, root)  # rejects unsupported keywords
+    return _PredicateBuilder(schema if root is None else root).build(schema)
+
+
+def compile_validator(
+    schema: dict, root: dict | None = None
+) -> Callable[[Any], list[str]]:
+    """
+    Compile schema into a function that returns all violations for a value.
+
+    Valid values cost one call to the generated predicate; the slower
+    error-collecting checks run only for values that fail it.
+    """
+    is_valid = compile_predicate(schema, root)
+    check = compile_schema(schema, root)
+
+    def validate(value: Any) -> list[str]:
+        if is_valid(value):
+            return []
+        errors: list[str] = []
+        check(value, "", errors)
+        return errors
+
+    return validate
+
+
+@cache
+def reference_checker(schema_file: Path = SCHEMA_FILE) -> Callable[[Any], list[str]]:
+    """Return a compiled validator for $defs.reference in the site index schema."""
+    schema = json.loads(schema_file.read_text(encoding="utf-8"))
+    return compile_validator(schema["$defs"]["reference"], schema)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Reference Store
+
+Compiled SQLite store of the JSONL reference shards:
+- Built once from data/refs/shards into data/derived/refs.sqlite
+- Refreshed per shard when a shard's mtime/size and content hash change
+- Opens in milliseconds; records and single fields are read lazily by ID
+- Maintains the tag/year/author/URL indexes queried through refs_index
+
+Usage: python tools/refs_store.py [--rebuild]
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from refs_io import REFS_DIR, file_digest, find_shards, normalize_url, parse_shard
+
+STORE_FILE = Path("data/derived/refs.sqlite")
+
+# Bump when the table layout or the stored URL keys (refs_io.normalize_url)
+# change; older stores are rebuilt from scratch
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    shard TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (shard, line)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS refs_id ON refs (id);
+"""
+
+# Inverted indexes queried through refs_index.ReferenceIndex
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ref_tags (
+    tag TEXT NOT NULL COLLATE NOCASE,
+    shard TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ref_tags_tag ON ref_tags (tag, shard, line);
+CREATE INDEX IF NOT EXISTS ref_tags_shard ON ref_tags (shard);
+CREATE TABLE IF NOT EXISTS ref_authors (
+    author TEXT NOT NULL COLLATE NOCASE,
+    shard TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ref_authors_author ON ref_authors (author, shard, line);
+CREATE INDEX IF NOT EXISTS ref_authors_shard ON ref_authors (shard);
+CREATE TABLE IF NOT EXISTS ref_years (
+    year INTEGER NOT NULL,
+    shard TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ref_years_year ON ref_years (year, shard, line);
+CREATE INDEX IF NOT EXISTS ref_years_shard ON ref_years (shard);
+CREATE TABLE IF NOT EXISTS ref_urls (
+    url TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ref_urls_url ON ref_urls (url, shard, line);
+CREATE INDEX IF NOT EXISTS ref_urls_shard ON ref_urls (shard);
+"""
+
+INDEX_TABLES = ("ref_tags", "ref_authors", "ref_years", "ref_urls")
+
+
+def drop_index_rows(conn: sqlite3.Connection, shard: str):
+    """Remove all index rows for a shard."""
+    for table in INDEX_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE shard = ?", (shard,))  # noqa: S608
+
+
+def index_records(
+    conn: sqlite3.Connection, shard: str, records: Iterable[tuple[int, dict]]
+):
+    """Add index rows for (line_num, record) pairs from one shard."""
+    tags, authors, years, urls = [], [], [], []
+    for line_num, ref in records:
+        ref_id = ref["id"]
+        for tag in ref.get("tags") or ():
+            if isinstance(tag, str):
+                tags.append((tag, shard, line_num, ref_id))
+        for author in ref.get("authors") or ():
+            if isinstance(author, str):
+                authors.append((author, shard, line_num, ref_id))
+        if isinstance(ref.get("year"), int):
+            years.append((ref["year"], shard, line_num, ref_id))
+        if isinstance(ref.get("url"), str):
+            # Stored normalized (see refs_io) so lookups ignore URL noise
+            urls.append((normalize_url(ref["url"]), shard, line_num, ref_id))
+
+    conn.executemany("INSERT INTO ref_tags VALUES (?, ?, ?, ?)", tags)
+    conn.executemany("INSERT INTO ref_authors VALUES (?, ?, ?, ?)", authors)
+    conn.executemany("INSERT INTO ref_years VALUES (?, ?, ?, ?)", years)
+    conn.executemany("INSERT INTO ref_urls VALUES (?, ?, ?, ?)", urls)
+
+
+class ReferenceStore:
+    """
+    Read API over the compiled reference store.
+
+    Use open_store() rather than constructing this directly, so the store is
+    brought up to date with the shards before it is read.
+    """
+
+    def __init__(self, store_file: Path, refs_dir: Path):
+        self.store_file = store_file
+        self.refs_dir = refs_dir
+        store_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(store_file)
+        self.conn.execute("PRAGMA mmap_size = 268435456")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._reset()
+
+    def _reset(self):
+        """Drop all tables and recreate them for the current schema."""
+        with self.conn:
+            for (table,) in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall():
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")  # noqa: S608
+            self.conn.executescript(SCHEMA)
+            self.conn.executescript(INDEX_SCHEMA)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def refresh(self) -> int:
+        """
+        Bring the store up to date with the shards on disk.
+
+        Shards whose mtime and size are unchanged are skipped without reading
+        them; otherwise the content hash decides whether rows are rebuilt.
+        Returns the number of shards that were (re)loaded.
+        """
+        known = {
+            path: (mtime_ns, size, digest)
+            for path, mtime_ns, size, digest in self.conn.execute(
+                "SELECT path, mtime_ns, size, digest FROM shards"
+            )
+        }
+        shards = find_shards(self.refs_dir) if self.refs_dir.exists() else []
+        reloaded = 0
+
+        with self.conn:
+            for shard in shards:
+                key = str(shard)
+                stat = shard.stat()
+                previous = known.pop(key, None)
+                if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+
+                digest = file_digest(shard)
+                if previous is None or previous[2] != digest:
+                    self._load_shard(shard)
+                    reloaded += 1
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?)",
+                    (key, stat.st_mtime_ns, stat.st_size, digest),
+                )
+
+            # Shards that no longer exist on disk
+            for key in known:
+                self.conn.execute("DELETE FROM refs WHERE shard = ?", (key,))
+                self.conn.execute("DELETE FROM shards WHERE path = ?", (key,))
+                drop_index_rows(self.conn, key)
+
+        return reloaded
+
+    def _load_shard(self, shard: Path):
+        """Replace the rows for one shard. Invalid lines are left to validate_refs."""
+        key = str(shard)
+        records = [
+            (line_num, ref)
+            for line_num, ref in parse_shard(shard).records
+            if isinstance(ref, dict) and isinstance(ref.get("id"), str)
+        ]
+        self.conn.execute("DELETE FROM refs WHERE shard = ?", (key,))
+        drop_index_rows(self.conn, key)
+        self.conn.executemany(
+            "INSERT INTO refs (shard, line, id, data) VALUES (?, ?, ?, ?)",
+            ((key, line_num, ref["id"], json.dumps(ref)) for line_num, ref in records),
+        )
+        index_records(self.conn, key, records)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+
+    def __contains__(self, ref_id: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM refs WHERE id = ? LIMIT 1", (ref_id,))
+        return row.fetchone() is not None
+
+    def get(self, ref_id: str) -> dict | None:
+        """Return the record for ref_id, or None if it is not in the store."""
+        row = self.conn.execute(
+            "SELECT data FROM refs WHERE id = ? ORDER BY shard, line LIMIT 1", (ref_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_field(self, ref_id: str, field: str, default: Any = None) -> Any:
+        """Return one field of a record without decoding the rest of it."""
+        row = self.conn.execute(
+            "SELECT json_extract(data, ?), json_type(data, ?) FROM refs"
+            " WHERE id = ? ORDER BY shard, line LIMIT 1",
+            (f"$.{field}", f"$.{field}", ref_id),
+        ).fetchone()
+        if row is None or row[1] is None:
+            return default
+        value, value_type = row
+        if value_type in ("array", "object"):
+            return json.loads(value)
+        return value
+
+    def ids(self) -> Iterator[str]:
+        """Yield all reference IDs in shard and line order."""
+        for (ref_id,) in self.conn.execute("SELECT id FROM refs ORDER BY shard, line"):
+            yield ref_id
+
+    def iter_records(self) -> Iterator[dict]:
+        """Yield all records in shard and line order."""
+        for (data,) in self.conn.execute("SELECT data FROM refs ORDER BY shard, line"):
+            yield json.loads(data)
+
+
+def open_store(
+    refs_dir: Path = REFS_DIR, store_file: Path = STORE_FILE, refresh: bool = True
+) -> ReferenceStore:
+    """Open the reference store, refreshing it from changed shards first."""
+    store = ReferenceStore(store_file, refs_dir)
+    if refresh:
+        store.refresh()
+    return store
+
+
+def main(argv: list[str] | None = None):
+    """Build or refresh the reference store."""
+    parser = argparse.ArgumentParser(description="Compile the reference store")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="discard the store and rebuild it"
+    )
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        STORE_FILE.unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    with ReferenceStore(STORE_FILE, REFS_DIR) as store:
+        reloaded = store.refresh()
+        total = len(store)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ Reference store has {total} references ({reloaded} shards reloaded)")
+    print(f"  → {STORE_FILE} ({elapsed:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
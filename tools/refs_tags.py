@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tag Vocabulary
+
+Loads the controlled tag vocabulary (data/refs/tags.yaml):
+- Parsed once per file version (cached on path + mtime)
+- O(1) membership checks for validation
+- "Did you mean" suggestions for unknown tags: a trigram index narrows the
+  vocabulary to candidates, which are then ranked by edit similarity
+
+PyYAML is used when installed; otherwise a small parser handles the
+`allowed_tags:` list format used by tags.yaml.
+"""
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - depends on the environment
+    yaml = None
+
+TAGS_FILE = Path("data/refs/tags.yaml")
+
+# Minimum similarity (difflib ratio) for a tag to be offered as a suggestion
+SUGGESTION_THRESHOLD = 0.6
+
+
+def parse_tags_yaml(text: str) -> list[str]:
+    """Return the allowed_tags list from tags.yaml content."""
+    if yaml is not None:
+        data = yaml.safe_load(text)
+        tags = data.get("allowed_tags") if isinstance(data, dict) else None
+        return [str(tag) for tag in tags or []]
+
+    # Fallback: `allowed_tags: [a, b]` or a block list of `- tag` items
+    tags: list[str] = []
+    in_list = False
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].rstrip()
+        if not line.strip():
+            continue
+        if line.startswith("allowed_tags:"):
+            inline = line.split(":", 1)[1].strip()
+            if inline.startswith("["):
+                tags.extend(
+                    t.strip().strip("'\"") for t in inline.strip("[]").split(",")
+                )
+                in_list = False
+            else:
+                in_list = True
+        elif in_list and line.lstrip().startswith("- "):
+            tags.append(line.lstrip()[2:].strip().strip("'\""))
+        elif not raw[0].isspace():
+            in_list = False
+    return [tag for tag in tags if tag]
+
+
+def trigrams(word: str) -> set[str]:
+    """Character trigrams of a word, padded so short words still have some."""
+    padded = f"  {word.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TagVocabulary:
+    """Set of allowed tags with trigram-based suggestions for unknown ones."""
+
+    def __init__(self, tags: list[str]):
+        self.tags = frozenset(tags)
+        self._index: dict[str, set[str]] = defaultdict(set)
+        for tag in self.tags:
+            for gram in trigrams(tag):
+                self._index[gram].add(tag)
+        self.suggest = lru_cache(maxsize=4096)(self._suggest)
+
+    def __contains__(self, tag: str) -> bool:
+        return tag in self.tags
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def _suggest(self, tag: str, limit: int = 3) -> tuple[str, ...]:
+        """Return up to limit allowed tags most similar to tag, best first."""
+        candidates = set()
+        for gram in trigrams(tag):
+            candidates.update(self._index.get(gram, ()))
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(tag.lower())
+        scored = []
+        for candidate in candidates:
+            matcher.set_seq1(candidate.lower())
+            if matcher.quick_ratio() < SUGGESTION_THRESHOLD:
+                continue
+            similarity = matcher.ratio()
+            if similarity >= SUGGESTION_THRESHOLD:
+                scored.append((-similarity, candidate))
+        return tuple(candidate for _, candidate in sorted(scored)[:limit])
+
+
+@lru_cache(maxsize=8)
+def _load(path: Path, mtime_ns: int) -> TagVocabulary:
+    return TagVocabulary(parse_tags_yaml(path.read_text(encoding="utf-8")))
+
+
+def load_vocabulary(tags_file: Path = TAGS_FILE) -> TagVocabulary:
+    """Load the tag vocabulary, reusing the parsed result until the file changes."""
+    path = tags_file.resolve()
+    return _load(path, path.stat().st_mtime_ns)
@@ -0,0 +1,757 @@
+#!/usr/bin/env python3
+"""
+Full-Text Search Index
+
+Offline inverted index over the notes and reference titles, emitted next to
+ai/site-index.json as ai/search-index.bin:
+- Text is case-folded, stripped of diacritics, split into words and stemmed
+  (Porter steps 1 and 5a: plurals, -ed/-ing, -y, final -e); common stop
+  words are not indexed but still count towards word positions, so phrases
+  match across them
+- Each term has a posting list of documents with term frequencies and
+  BM25 weights (computed at build time and stored as 16-bit integers), plus
+  the word positions used for "quoted phrase" queries
+- Postings are delta-encoded and zlib-compressed (all but tiny ones); the
+  term table is sorted and fixed-width, so a term is found by binary search
+  without loading it
+- Notes are tokenized in a process pool and cached per note by content hash
+  in .cache/search_index.json
+
+SearchIndex memory-maps the file and ranks matches with BM25. A query only
+touches the term table entries and postings of its own terms. Long posting
+lists also keep their highest-weighted entries in a champion list. A
+one-word query reads only that list; with more words the threshold
+algorithm walks the champion lists but looks each candidate up in the
+other words' full lists, so those are decoded (once per query), and the
+saving is in the documents scored rather than in decoding.
+
+File layout (little-endian): MAGIC, a u32 header length, a JSON header with
+the document count, weight scale and section offsets, then the sections.
+A static host can serve the file as-is; clients range-request what they need.
+
+Usage: python tools/search_index.py [-j N] [--no-cache]
+       python tools/search_index.py --query TEXT [-n N]
+"""
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import re
+import struct
+import sys
+import time
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import accumulate
+from pathlib import Path
+from typing import NamedTuple
+
+import refs_citations
+import refs_notes
+from refs_cache import FileCache
+from refs_citations import HEADING, note_id_for
+from refs_io import REFS_DIR, find_shards, resolve_jobs
+from refs_notes import (
+    DOCS_DIR,
+    FENCE,
+    find_notes,
+    iter_references,
+    parse_front_matter,
+)
+from refs_output import write_if_changed
+
+INDEX_FILE = Path("ai/search-index.bin")
+CACHE_FILE = Path(".cache/search_index.json")
+
+MAGIC = b"NOTESIX\x00"
+FORMAT_VERSION = 1
+
+# Code that note terms are derived from; editing it invalidates the cache
+TOKENIZERS = [
+    Path(__file__),
+    Path(refs_citations.__file__),
+    Path(refs_notes.__file__),
+]
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+# Term weights are stored as integers up to IMPACT_MAX, and the CHAMPIONS
+# highest-weighted postings of each long list are stored again, best first,
+# so the top results for a single common term are found without decoding
+# its list
+IMPACT_MAX = 65535
+CHAMPIONS = 1024
+
+# Term table row: text offset, text length, document frequency, postings,
+# positions and champions offset/length (offsets are within their section)
+TERM = struct.Struct("<IIIIIIIII")
+U32 = struct.Struct("<I")
+ENTRY_SPAN = struct.Struct("<II")
+
+# Blocks smaller than this are stored raw: zlib saves nothing on them and
+# most terms are rare. The reader knows each block's raw size, so no flag.
+COMPRESS_MIN_BYTES = 64
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the "
+    "this to was were with".split()
+)
+
+WORD = re.compile(r"[^\W_]+")
+COMBINING = re.compile(r"[\u0300-\u036f]")
+VOWELS = frozenset("aeiou")
+
+
+def _consonant(word: str, i: int) -> bool:
+    if word[i] in VOWELS:
+        return False
+    if word[i] == "y":
+        return i == 0 or not _consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Porter's m: the number of vowel-consonant sequences in stem."""
+    m, vowel = 0, False
+    for i in range(len(stem)):
+        if not _consonant(stem, i):
+            vowel = True
+        elif vowel:
+            m, vowel = m + 1, False
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _consonant(stem, i) for i in range(len(stem)))
+
+
+def _cvc(stem: str) -> bool:
+    return (
+        len(stem) >= 3
+        and _consonant(stem, len(stem) - 3)
+        and not _consonant(stem, len(stem) - 2)
+        and _consonant(stem, len(stem) - 1)
+        and stem[-1] not in "wxy"
+    )
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Reduce a lower-case word with Porter's steps 1 and 5a (-s, -ed/-ing, -y, -e)."""
+    if len(word) <= 3 or not word.isascii() or not word.isalpha():
+        return word
+    if word.endswith("sses") or word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            base = word[: -len(suffix)]
+            if word.endswith(suffix) and _has_vowel(base):
+                word = base
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif (
+                    len(word) >= 2
+                    and word[-1] == word[-2]
+                    and _consonant(word, len(word) - 1)
+                    and word[-1] not in "lsz"
+                ):
+                    word = word[:-1]
+                elif _measure(word) == 1 and _cvc(word):
+                    word += "e"
+                break
+
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+    elif word.endswith("e"):
+        m = _measure(word[:-1])
+        if m > 1 or (m == 1 and not _cvc(word[:-1])):
+            word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> list[str]:
+    """
+    Return the index terms of text, one per word.
+
+    Stop words become "" so that the list index is still the word position.
+    """
+    text = text.casefold()
+    if not text.isascii():
+        text = COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return ["" if word in STOP_WORDS else stem(word) for word in WORD.findall(text)]
+
+
+def _deltas(values: list[int]) -> list[int]:
+    return [b - a for a, b in zip([0, *values], values, strict=False)]
+
+
+def document_terms(title: str, body: str = "") -> dict[str, list[int]]:
+    """
+    Map each term of a document to its delta-coded word positions.
+
+    The title comes first, then a gap so that phrases cannot span into the body.
+    """
+    words = analyze(title)
+    if body:
+        words.append("")
+        words.extend(analyze(body))
+    positions: dict[str, list[int]] = {}
+    for position, term in enumerate(words):
+        if term:
+            positions.setdefault(term, []).append(position)
+    return {term: _deltas(p) for term, p in positions.items()}
+
+
+def tokenize_note(path: Path, docs_dir: Path) -> dict:
+    """Return the document entry and terms of one note (runs in a worker)."""
+    text = path.read_text(encoding="utf-8").replace("\r\n", "\n")
+    fields, body = parse_front_matter(text)
+    relpath = path.relative_to(docs_dir)
+    title = fields.get("title")
+    if not title:
+        heading = HEADING.search(body)
+        title = heading.group(1) if heading else relpath.stem
+    return {
+        "kind": "note",
+        "id": note_id_for(fields.get("id"), path, docs_dir),
+        "title": str(title),
+        "path": relpath.as_posix(),
+        "terms": document_terms(str(title), FENCE.sub("", body)),
+    }
+
+
+def tokenize_notes(notes: list[Path], docs_dir: Path, jobs: int = 1) -> list[dict]:
+    """Tokenize notes in input order, in a process pool if jobs > 1."""
+    tokenize = partial(tokenize_note, docs_dir=docs_dir)
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(notes) < 2:
+        return list(map(tokenize, notes))
+    chunksize = max(1, len(notes) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=min(jobs, len(notes))) as pool:
+        return list(pool.map(tokenize, notes, chunksize=chunksize))
+
+
+def iter_documents(
+    docs_dir: Path = DOCS_DIR,
+    refs_dir: Path = REFS_DIR,
+    jobs: int = 1,
+    cache_file: Path | None = CACHE_FILE,
+) -> Iterator[tuple[dict, dict[str, list[int]]]]:
+    """
+    Yield (document entry, terms) for every note, then every reference.
+
+    Notes are read through the per-note cache; references are indexed by
+    title and streamed from the shards (first record wins for duplicate IDs).
+    """
+    paths = find_notes(docs_dir)
+    cache = FileCache(cache_file, TOKENIZERS)
+    cache.load()
+    stale = cache.stale(paths)
+    for path, note in zip(stale, tokenize_notes(stale, docs_dir, jobs), strict=True):
+        cache[path] = note
+    cache.save(paths)
+    for path in paths:
+        note = dict(cache[path])
+        yield note, note.pop("terms")
+
+    shards = find_shards(refs_dir) if refs_dir.exists() else []
+    for ref in iter_references(shards, {}, jobs):
+        title = str(ref.get("title") or "")
+        entry = {"kind": "reference", "id": ref["id"], "title": title}
+        if ref.get("url"):
+            entry["url"] = ref["url"]
+        yield entry, document_terms(title)
+
+
+def _u32_bytes(values: Iterable[int]) -> bytes:
+    data = array("I", values)
+    if sys.byteorder == "big":  # pragma: no cover - the file is little-endian
+        data.byteswap()
+    return data.tobytes()
+
+
+def _u32_array(data: bytes) -> array:
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":  # pragma: no cover
+        values.byteswap()
+    return values
+
+
+def _pack_block(values: list[int]) -> bytes:
+    data = _u32_bytes(values)
+    return zlib.compress(data) if len(data) >= COMPRESS_MIN_BYTES else data
+
+
+def _unpack_block(data: bytes, count: int) -> array:
+    if 4 * count >= COMPRESS_MIN_BYTES:
+        data = zlib.decompress(data)
+    return _u32_array(data)
+
+
+def _impact_order(docs: list[int], impacts: list[int]) -> list[int]:
+    """Posting indexes by descending impact, then ascending document."""
+    return sorted(range(len(docs)), key=lambda i: (-impacts[i], docs[i]))
+
+
+def build_index(
+    documents: Iterable[tuple[dict, dict[str, list[int]]]],
+) -> tuple[bytes, int]:
+    """Build the index file from (entry, terms) pairs; return it and its size."""
+    # term -> ([doc numbers], [term frequencies], [delta-coded positions])
+    postings: dict[str, tuple[list[int], list[int], list[int]]] = {}
+    lengths: list[int] = []
+    entries = bytearray()
+    entry_offsets = [0]
+
+    for doc, (entry, terms) in enumerate(documents):
+        entries += json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+        entry_offsets.append(len(entries))
+        length = 0
+        for term, deltas in terms.items():
+            docs, freqs, positions = postings.setdefault(term, ([], [], []))
+            docs.append(doc)
+            freqs.append(len(deltas))
+            positions.extend(deltas)
+            length += len(deltas)
+        lengths.append(length)
+
+    # BM25 term weights, computed once here and quantized to IMPACT_MAX
+    count = len(lengths)
+    average_length = sum(lengths) / count if count else 0.0
+    norms = [K1 * (1 - B + B * length / (average_length or 1)) for length in lengths]
+    weights: dict[str, list[float]] = {}
+    for term, (docs, freqs, _) in postings.items():
+        idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+        weights[term] = [
+            idf * (K1 + 1) * tf / (tf + norms[doc])
+            for doc, tf in zip(docs, freqs, strict=True)
+        ]
+    top = max((max(w) for w in weights.values()), default=1.0)
+    scale = IMPACT_MAX / top
+
+    term_table = bytearray()
+    term_text = bytearray()
+    posting_data = bytearray()
+    position_data = bytearray()
+    champion_data = bytearray()
+    for term in sorted(postings, key=lambda t: t.encode("utf-8")):
+        docs, freqs, positions = postings[term]
+        impacts = [max(1, round(w * scale)) for w in weights[term]]
+        text = term.encode("utf-8")
+        block = _pack_block(_deltas(docs) + freqs + impacts)
+        position_block = _pack_block(positions)
+        champions = b""
+        if len(docs) > CHAMPIONS:
+            order = _impact_order(docs, impacts)[:CHAMPIONS]
+            champions = _pack_block(
+                [docs[i] for i in order] + [impacts[i] for i in order]
+            )
+        term_table += TERM.pack(
+            len(term_text),
+            len(text),
+            len(docs),
+            len(posting_data),
+            len(block),
+            len(position_data),
+            len(position_block),
+            len(champion_data),
+            len(champions),
+        )
+        term_text += text
+        posting_data += block
+        position_data += position_block
+        champion_data += champions
+
+    sections = {
+        "terms": bytes(term_table),
+        "term_text": bytes(term_text),
+        "postings": bytes(posting_data),
+        "positions": bytes(position_data),
+        "champions": bytes(champion_data),
+        "entry_offsets": _u32_bytes(entry_offsets),
+        "entries": bytes(entries),
+    }
+    offset = 0
+    layout = {}
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset += len(data)
+    header = {
+        "version": FORMAT_VERSION,
+        "document_count": count,
+        "average_length": average_length,
+        "term_count": len(postings),
+        "bm25": {"k1": K1, "b": B},
+        "impact_scale": scale,
+        "champions": CHAMPIONS,
+        "sections": layout,
+    }
+    header_data = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data = b"".join(
+        [MAGIC, U32.pack(len(header_data)), header_data, *sections.values()]
+    )
+    return data, count
+
+
+class SearchHit(NamedTuple):
+    """A ranked match: its BM25 score and document entry."""
+
+    score: float
+    document: dict
+
+
+def _rank(item: tuple[int, int]) -> tuple[int, int]:
+    """Sort key of (doc, score): higher score first, then earlier document."""
+    doc, score = item
+    return score, -doc
+
+
+class _Postings:
+    """Posting list of one term, decoded on first use."""
+
+    def __init__(self, index: "SearchIndex", row: tuple):
+        self.df = row[2]
+        self._index = index
+        self._row = row
+        self._docs: list[int] | None = None
+        self._champions: list[tuple[int, int]] | None = None
+        self._starts: dict[int, tuple[int, int]] | None = None
+        self._positions: array | None = None
+
+    def _decode(self):
+        df, offset, size = self._row[2:5]
+        values = _unpack_block(self._index._section("postings", offset, size), 3 * df)
+        self._docs = list(accumulate(values[:df]))
+        self.freqs = values[df : 2 * df]
+        self.impacts = values[2 * df :]
+
+    @property
+    def docs(self) -> list[int]:
+        if self._docs is None:
+            self._decode()
+        return self._docs
+
+    def impact(self, doc: int) -> int:
+        """Quantized BM25 weight of the term in doc (0 if it does not occur)."""
+        docs = self.docs
+        i = bisect_left(docs, doc)
+        return self.impacts[i] if i < self.df and docs[i] == doc else 0
+
+    def champions(self) -> list[tuple[int, int]]:
+        """
+        The (doc, impact) postings of highest impact, best first.
+
+        Long lists store only their first CHAMPIONS entries in this order;
+        short lists are decoded and sorted whole.
+        """
+        if self._champions is None:
+            offset, size = self._row[7:9]
+            if size:
+                count = min(self.df, self._index.champion_count)
+                block = self._index._section("champions", offset, size)
+                values = _unpack_block(block, 2 * count)
+                self._champions = list(zip(values[:count], values[count:], strict=True))
+            else:
+                docs, impacts = self.docs, self.impacts
+                order = _impact_order(docs, impacts)
+                self._champions = [(docs[i], impacts[i]) for i in order]
+        return self._champions
+
+    @property
+    def max_impact(self) -> int:
+        return self.champions()[0][1]
+
+    def positions(self, doc: int) -> set[int]:
+        """Word positions of the term in doc (which must be in self.docs)."""
+        if self._starts is None:
+            docs, freqs = self.docs, self.freqs
+            starts = accumulate(freqs, initial=0)
+            self._starts = {
+                d: (start, tf)
+                for d, start, tf in zip(docs, starts, freqs, strict=False)
+            }
+            offset, size = self._row[5:7]
+            block = self._index._section("positions", offset, size)
+            self._positions = _unpack_block(block, sum(freqs))
+        start, tf = self._starts[doc]
+        return set(accumulate(self._positions[start : start + tf]))
+
+
+class SearchIndex:
+    """BM25 query API over a memory-mapped search index file."""
+
+    def __init__(self, index_file: Path = INDEX_FILE):
+        with open(index_file, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{index_file} is not a search index")
+        (size,) = U32.unpack_from(self._map, len(MAGIC))
+        start = len(MAGIC) + U32.size
+        header = json.loads(self._map[start : start + size])
+        if header["version"] != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(
+                f"{index_file} has format version {header['version']}, "
+                f"expected {FORMAT_VERSION}; rebuild it"
+            )
+        self._base = start + size
+        self._sections = header["sections"]
+        self.document_count: int = header["document_count"]
+        self.term_count: int = header["term_count"]
+        self.impact_scale: float = header["impact_scale"]
+        self.champion_count: int = header["champions"]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _section(self, name: str, offset: int = 0, size: int | None = None) -> bytes:
+        start, length = self._sections[name]
+        start += self._base + offset
+        return self._map[start : start + (length if size is None else size)]
+
+    def _term(self, term: str) -> tuple | None:
+        """Binary-search the term table; return the term's row or None."""
+        key = term.encode("utf-8")
+        table = self._sections["terms"][0] + self._base
+        text = self._sections["term_text"][0] + self._base
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = TERM.unpack_from(self._map, table + mid * TERM.size)
+            found = self._map[text + row[0] : text + row[0] + row[1]]
+            if found == key:
+                return row
+            if found < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def postings(self, term: str) -> _Postings | None:
+        """Posting list of an analyzed term, or None if it is not indexed."""
+        row = self._term(term)
+        return _Postings(self, row) if row else None
+
+    def document(self, doc: int) -> dict:
+        """Return the entry of document number doc."""
+        start, end = ENTRY_SPAN.unpack(self._section("entry_offsets", 4 * doc, 8))
+        return json.loads(self._section("entries", start, end - start))
+
+    def _phrase_docs(self, terms: list[str], postings: dict) -> set[int]:
+        """Documents in which the analyzed phrase terms occur in sequence."""
+        words = [(i, term) for i, term in enumerate(terms) if term]
+        lists = [postings[term] for _, term in words]
+        docs = set(lists[0].docs).intersection(*(p.docs for p in lists[1:]))
+        if len(words) == 1:
+            return docs
+        matches = set()
+        for doc in docs:
+            first = lists[0].positions(doc)
+            for (offset, _), plist in zip(words[1:], lists[1:], strict=True):
+                first &= {p - offset + words[0][0] for p in plist.positions(doc)}
+                if not first:
+                    break
+            else:
+                matches.add(doc)
+        return matches
+
+    def _top_by_threshold(
+        self, lists: list[_Postings], limit: int
+    ) -> list[tuple[int, int]] | None:
+        """
+        Fagin's threshold algorithm over the champion lists.
+
+        Walks the lists in impact order, scoring each new document in full
+        (which decodes the other lists on first use). No unseen document can
+        score more than the sum of the impacts at the current depth, so the
+        walk stops once the top `limit` reach it.
+        Returns None if a truncated champion list runs out first. Equal scores
+        rank the earlier document first among the documents examined.
+        """
+        heads = [plist.champions() for plist in lists]
+        top: list[tuple[int, int]] = []  # min-heap of (score, -doc)
+        seen: set[int] = set()
+        for depth in range(max(map(len, heads))):
+            threshold = 0
+            for plist, head in zip(lists, heads, strict=True):
+                if depth >= len(head):
+                    if len(head) < plist.df:
+                        return None
+                    continue
+                doc, impact = head[depth]
+                threshold += impact
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                score = impact + sum(p.impact(doc) for p in lists if p is not plist)
+                item = (score, -doc)
+                if len(top) < limit:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+            if len(top) == limit and top[0][0] >= threshold:
+                break
+        else:
+            if any(
+                len(head) < plist.df for plist, head in zip(lists, heads, strict=True)
+            ):
+                return None
+        return sorted(((-doc, score) for score, doc in top), key=_rank, reverse=True)
+
+    def _top_by_max_score(
+        self, lists: list[_Postings], limit: int
+    ) -> list[tuple[int, int]]:
+        """
+        MaxScore: score the documents of the lists with the highest weights.
+
+        Lists are taken in decreasing order of their maximum weight (rare
+        terms first) and each new document is scored in full. A document
+        only found in the remaining lists scores at most the sum of their
+        maximum weights, so they are skipped once the top `limit` reach it.
+        """
+        lists = sorted(lists, key=lambda plist: plist.max_impact)
+        bounds = [0, *accumulate(plist.max_impact for plist in lists)]
+        scores: dict[int, int] = {}
+        for rest in range(len(lists) - 1, -1, -1):
+            for doc in lists[rest].docs:
+                if doc not in scores:
+                    scores[doc] = sum(plist.impact(doc) for plist in lists)
+            best = heapq.nlargest(limit, scores.items(), key=_rank)
+            if len(best) == limit and best[-1][1] >= bounds[rest]:
+                break
+        return best
+
+    def search(self, query: str, limit: int = 10) -> list[SearchHit]:
+        """
+        Return the best matches for query, highest BM25 score first.
+
+        Words match any document containing one of them; "quoted phrases"
+        restrict the matches to documents containing the exact phrase.
+        """
+        parts = query.split('"')
+        loose = [t for part in parts[::2] for t in analyze(part) if t]
+        phrases = [terms for part in parts[1::2] if any(terms := analyze(part))]
+        if limit < 1:
+            return []
+
+        postings: dict[str, _Postings] = {}
+        for term in dict.fromkeys(loose + [t for p in phrases for t in p if t]):
+            plist = self.postings(term)
+            if plist:
+                postings[term] = plist
+            elif any(term in phrase for phrase in phrases):
+                return []  # a phrase word that is not indexed cannot match
+        if not postings:
+            return []
+        lists = list(postings.values())
+
+        allowed = None
+        for phrase in phrases:
+            docs = self._phrase_docs(phrase, postings)
+            allowed = docs if allowed is None else allowed & docs
+            if not allowed:
+                return []
+
+        if allowed is not None:
+            scored = ((doc, sum(p.impact(doc) for p in lists)) for doc in allowed)
+            best = heapq.nlargest(limit, scored, key=_rank)
+        else:
+            best = self._top_by_threshold(lists, limit)
+            if best is None:
+                best = self._top_by_max_score(lists, limit)
+        return [
+            SearchHit(score / self.impact_scale, self.document(doc))
+            for doc, score in best
+        ]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Build or query the search index")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="tokenize notes and shards in N worker processes (0 = one per CPU, "
+        "default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"ignore and rebuild the per-note cache in {CACHE_FILE}",
+    )
+    parser.add_argument(
+        "--query",
+        metavar="TEXT",
+        help=f'search {INDEX_FILE} instead of building it ("quote" phrases)',
+    )
+    parser.add_argument(
+        "-n",
+        "--limit",
+        type=int,
+        default=10,
+        help="number of results to show for --query (default: 10)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    """Build the search index, or query it with --query."""
+    args = parse_args(argv)
+    if args.query is not None:
+        if not INDEX_FILE.exists():
+            print(
+                f"✗ {INDEX_FILE} not found; run without --query first", file=sys.stderr
+            )
+            return 1
+        start = time.perf_counter()
+        with SearchIndex(INDEX_FILE) as index:
+            hits = index.search(args.query, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for hit in hits:
+            where = hit.document.get("path") or hit.document.get("url", "")
+            print(f"{hit.score:7.3f}  {hit.document['title']}")
+            print(f"         {hit.document['kind']}: {hit.document['id']}  {where}")
+        print(f"✓ {len(hits)} results in {elapsed:.1f} ms")
+        return 0
+
+    if args.no_cache:
+        CACHE_FILE.unlink(missing_ok=True)
+    start = time.perf_counter()
+    data, count = build_index(iter_documents(jobs=args.jobs))
+    changed = write_if_changed(INDEX_FILE, data)
+    elapsed = time.perf_counter() - start
+    print(
+        f"✓ Indexed {count} documents into {INDEX_FILE} "
+        f"({len(data) / 1024:.0f} KB, {elapsed:.1f}s)"
+    )
+    print(f"  → {'written' if changed else 'unchanged'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,96 +7,217 @@ Validates JSONL reference records against schema:
 - Unique ID enforcement
 - Tag vocabulary validation
 - Required fields present
+
+Errors stream to stderr as they are found (first 10 shown); --jsonl and
+--sarif also write every error in machine-readable form for CI.
 """
 
-import json
+import argparse
 import sys
+from collections.abc import Callable
+from contextlib import ExitStack
+from functools import cache
 from pathlib import Path
-from typing import Set
-
-
-def load_allowed_tags(tags_file: Path) -> Set[str]:
-    """Load allowed tags from tags.yaml."""
-    # TODO: Implement YAML parsing
-    # For now, return a permissive set
-    return {"sample", "blog", "test", "web", "security", "python"}
-
-
-def validate_reference(ref: dict, allowed_tags: Set[str], seen_ids: Set[str]) -> list[str]:
-    """Validate a single reference record."""
-    errors = []
-
-    # Check required fields
-    if "id" not in ref:
-        errors.append("Missing required field: id")
-    elif ref["id"] in seen_ids:
-        errors.append(f"Duplicate ID: {ref['id']}")
-    else:
-        seen_ids.add(ref["id"])
-
-    if "title" not in ref:
-        errors.append(f"Missing required field 'title' in {ref.get('id', 'unknown')}")
-
-    if "url" not in ref:
-        errors.append(f"Missing required field 'url' in {ref.get('id', 'unknown')}")
-
-    # Check tags
-    if "tags" in ref:
+from typing import Any
+
+from refs_io import REFS_DIR, find_shards, iter_shard_results
+from refs_report import Finding, JsonLinesReporter, SarifReporter, TextReporter
+from refs_schema import SCHEMA_FILE, compile_validator, reference_checker
+from refs_tags import TAGS_FILE, TagVocabulary, load_vocabulary
+
+# Used when the site index schema is missing: SPEC §5.2 required fields only
+FALLBACK_SCHEMA = {"type": "object", "required": ["id", "title", "url"]}
+
+# Rule ids attached to each error in --jsonl / --sarif output
+RULES = {
+    "invalid-json": "Shard line is not valid JSON",
+    "schema": "Reference does not match the site index schema",
+    "duplicate-id": "Reference ID is used more than once",
+    "unknown-tag": "Tag is not listed in data/refs/tags.yaml",
+}
+
+
+def load_allowed_tags(tags_file: Path) -> TagVocabulary:
+    """Load allowed tags from tags.yaml (cached until the file changes)."""
+    return load_vocabulary(tags_file)
+
+
+def unknown_tag_error(tag: str, ref_id: str, allowed_tags: TagVocabulary) -> str:
+    """Describe an unknown tag, with the closest allowed tags if any."""
+    message = f"Unknown tag '{tag}' in {ref_id}"
+    suggestions = allowed_tags.suggest(tag)
+    if suggestions:
+        message += " (did you mean " + " or ".join(f"'{s}'" for s in suggestions) + "?)"
+    return message
+
+
+@cache
+def required_fields_checker() -> Callable[[Any], list[str]]:
+    """Return the compiled FALLBACK_SCHEMA validator (required fields only)."""
+    return compile_validator(FALLBACK_SCHEMA)
+
+
+def check_reference(
+    ref: dict,
+    allowed_tags: TagVocabulary | None,
+    seen_ids: set[str],
+    check_schema: Callable[[Any], list[str]] | None = None,
+) -> list[tuple[str, str]]:
+    """
+    Validate a single reference record; return (rule, message) pairs.
+
+    Without check_schema only the required fields are checked.
+    """
+    if check_schema is None:
+        check_schema = required_fields_checker()
+    ref_id = ref.get("id", "unknown") if isinstance(ref, dict) else "unknown"
+
+    # JSON Schema ($defs.reference): required fields, types, enums, formats
+    errors = [("schema", f"{error} in {ref_id}") for error in check_schema(ref)]
+    if not isinstance(ref, dict):
+        return errors
+
+    # Check unique IDs
+    if isinstance(ref.get("id"), str):
+        if ref["id"] in seen_ids:
+            errors.append(("duplicate-id", f"Duplicate ID: {ref['id']}"))
+        else:
+            seen_ids.add(ref["id"])
+
+    # Check tags (None means no vocabulary, so tag validation is skipped)
+    if allowed_tags is not None and isinstance(ref.get("tags"), list):
         for tag in ref["tags"]:
-            if tag not in allowed_tags:
-                errors.append(f"Unknown tag '{tag}' in {ref.get('id', 'unknown')}")
+            if isinstance(tag, str) and tag not in allowed_tags:
+                errors.append(
+                    ("unknown-tag", unknown_tag_error(tag, ref_id, allowed_tags))
+                )
 
     return errors
 
 
-def main():
+def validate_reference(
+    ref: dict,
+    allowed_tags: TagVocabulary | None,
+    seen_ids: set[str],
+    check_schema: Callable[[Any], list[str]] | None = None,
+) -> list[str]:
+    """Validate a single reference record (required fields only by default)."""
+    return [
+        message
+        for _, message in check_reference(ref, allowed_tags, seen_ids, check_schema)
+    ]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Validate the reference database")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse shards in N worker processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        default=0,
+        metavar="N",
+        help="stop after N errors (default: 0, report all)",
+    )
+    parser.add_argument(
+        "--jsonl",
+        type=Path,
+        metavar="FILE",
+        help="also write errors as JSON Lines to FILE ('-' for stdout)",
+    )
+    parser.add_argument(
+        "--sarif",
+        type=Path,
+        metavar="FILE",
+        help="also write errors as a SARIF 2.1.0 log to FILE",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
     """Main validation entry point."""
-    refs_dir = Path("data/refs/shards")
-    tags_file = Path("data/refs/tags.yaml")
+    args = parse_args(argv)
+    refs_dir = REFS_DIR
+    tags_file = TAGS_FILE
+    # Keep stdout machine-readable when a report is streamed to it
+    to_stdout = any(str(path) == "-" for path in (args.jsonl, args.sarif))
+    status = sys.stderr if to_stdout else sys.stdout
 
     if not refs_dir.exists():
-        print(f"✓ No references to validate ({refs_dir} not found)")
+        print(f"✓ No references to validate ({refs_dir} not found)", file=status)
         return 0
 
     # Load allowed tags
     if tags_file.exists():
         allowed_tags = load_allowed_tags(tags_file)
     else:
-        print("⚠ Warning: tags.yaml not found, skipping tag validation")
-        allowed_tags = set()
+        print("⚠ Warning: tags.yaml not found, skipping tag validation", file=status)
+        allowed_tags = None
 
-    # Validate all JSONL files
-    all_errors = []
-    seen_ids: Set[str] = set()
+    # Compile the reference schema once for all records
+    if SCHEMA_FILE.exists():
+        check_schema = reference_checker(SCHEMA_FILE)
+    else:
+        print(
+            f"⚠ Warning: {SCHEMA_FILE} not found, checking required fields only",
+            file=status,
+        )
+        check_schema = required_fields_checker()
+
+    reporters = [TextReporter()]
+    if args.jsonl:
+        reporters.append(JsonLinesReporter(args.jsonl))
+    if args.sarif:
+        reporters.append(SarifReporter(args.sarif, "validate_refs", RULES))
+
+    # Validate all JSONL files (parsing may fan out; checks stay in shard order)
+    error_count = 0
+    stopped = False
+    seen_ids: set[str] = set()
     total_refs = 0
 
-    for jsonl_file in refs_dir.rglob("*.jsonl"):
-        with open(jsonl_file, "r", encoding="utf-8") as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
-
-                try:
-                    ref = json.loads(line)
-                    total_refs += 1
-                    errors = validate_reference(ref, allowed_tags, seen_ids)
-                    if errors:
-                        for error in errors:
-                            all_errors.append(f"{jsonl_file}:{line_num} {error}")
-                except json.JSONDecodeError as e:
-                    all_errors.append(f"{jsonl_file}:{line_num} Invalid JSON: {e}")
-
-    # Report results
-    if all_errors:
-        print(f"✗ Validation failed with {len(all_errors)} errors:", file=sys.stderr)
-        for error in all_errors[:10]:  # Show first 10
-            print(f"  {error}", file=sys.stderr)
-        if len(all_errors) > 10:
-            print(f"  ... and {len(all_errors) - 10} more errors", file=sys.stderr)
+    with ExitStack() as stack:
+        for reporter in reporters:
+            stack.enter_context(reporter)
+        for shard in iter_shard_results(find_shards(refs_dir), jobs=args.jobs):
+            errors = [(line, "invalid-json", error) for line, error in shard.errors]
+            for line_num, ref in shard.records:
+                total_refs += 1
+                for rule, error in check_reference(
+                    ref, allowed_tags, seen_ids, check_schema
+                ):
+                    errors.append((line_num, rule, error))
+            errors.sort(key=lambda item: item[0])
+
+            # Report this shard's errors before parsing the next one
+            for line_num, rule, error in errors:
+                finding = Finding(shard.path, line_num, rule, error)
+                for reporter in reporters:
+                    reporter.report(finding)
+                error_count += 1
+                if error_count == args.max_errors:
+                    stopped = True
+                    break
+            if stopped:
+                break
+
+    if stopped:
+        print(f"✗ Validation stopped after {error_count} errors", file=sys.stderr)
+        return 1
+    if error_count:
+        print(f"✗ Validation failed with {error_count} errors", file=sys.stderr)
         return 1
 
-    print(f"✓ Validated {total_refs} references across {len(seen_ids)} unique IDs")
+    print(
+        f"✓ Validated {total_refs} references across {len(seen_ids)} unique IDs",
+        file=status,
+    )
     return 0
 
 